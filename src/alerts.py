@@ -0,0 +1,347 @@
+"""
+Alertas automáticos e detecção de anomalias para o projeto de Análise de Vendas
+"""
+
+import math
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from config import ALERT_CONFIG
+from utils import format_currency
+
+# Dias sem pedidos incorporados como receita zero ao fechar um intervalo
+_MAX_GAP_DAYS = 365
+
+
+class _KeyState:
+    """Dia aberto e médias/variâncias móveis de uma região, categoria ou do total."""
+    __slots__ = ('day', 'revenue', 'profit', 'orders', 'revenue_mean', 'revenue_var',
+                 'margin_mean', 'margin_var', 'ticket_mean', 'days', 'margin_days')
+
+    def __init__(self, day: int):
+        self.day = day
+        self.revenue = 0.0
+        self.profit = 0.0
+        self.orders = 0
+        self.revenue_mean = 0.0
+        self.revenue_var = 0.0
+        self.margin_mean = 0.0
+        self.margin_var = 0.0
+        self.ticket_mean = 0.0
+        self.days = 0
+        self.margin_days = 0
+
+
+class StreamingAlertEngine:
+    """
+    Estatísticas diárias móveis por região e categoria, atualizadas por pedido
+
+    Cada chave (total, região ou categoria) acumula o dia em aberto; quando
+    chega um pedido de um dia posterior, o dia fechado é comparado com a
+    média e a variância exponenciais (EWMA) do histórico e então incorporado
+    a elas. Cada pedido custa O(1) e a avaliação dos alertas apenas lê as
+    anomalias já detectadas, sem percorrer os dados.
+    """
+
+    DIMENSIONS = ('region', 'category')
+
+    def __init__(self, halflife_days: float = 7, z_threshold: float = 3.0,
+                 min_history_days: int = 14, history_size: int = 1000):
+        """
+        Args:
+            halflife_days (float): Meia-vida das médias móveis, em dias
+            z_threshold (float): Desvios-padrão que caracterizam uma anomalia
+            min_history_days (int): Dias de histórico antes de sinalizar
+            history_size (int): Anomalias mantidas no histórico
+        """
+        self.alpha = 1 - 0.5 ** (1 / halflife_days)
+        self.z_threshold = z_threshold
+        self.min_history_days = min_history_days
+        self.anomalies: deque = deque(maxlen=history_size)
+        self.orders_seen = 0
+        self._states: Dict[Tuple[str, Any], _KeyState] = {}
+        self._open_day = 0
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, **kwargs) -> 'StreamingAlertEngine':
+        """
+        Cria o motor e incorpora o histórico de pedidos
+
+        Args:
+            df (pd.DataFrame): DataFrame preparado
+            **kwargs: Parâmetros do construtor
+
+        Returns:
+            StreamingAlertEngine: Motor com o último dia ainda em aberto
+        """
+        engine = cls(**kwargs)
+        engine.update_frame(df)
+        return engine
+
+    def update(self, order: Dict) -> None:
+        """
+        Incorpora um novo pedido em O(1)
+
+        Pedidos com data anterior ao dia em aberto entram no dia em aberto.
+
+        Args:
+            order (Dict): Pedido com order_date, region, category, revenue e profit
+        """
+        day = pd.Timestamp(order['order_date']).toordinal()
+        revenue, profit = float(order['revenue']), float(order['profit'])
+        self._advance(day)
+        self._add(('all', None), day, revenue, profit, 1)
+        for dimension in self.DIMENSIONS:
+            self._add((dimension, order[dimension]), day, revenue, profit, 1)
+        self.orders_seen += 1
+
+    def update_frame(self, df: pd.DataFrame) -> None:
+        """
+        Incorpora um lote de pedidos, agregado por dia antes da atualização
+
+        Equivale a chamar update pedido a pedido, com custo proporcional ao
+        número de pares chave × dia em vez do número de linhas.
+
+        Args:
+            df (pd.DataFrame): Pedidos do lote
+        """
+        if df.empty:
+            return
+        day = df['order_date'].dt.normalize().rename('day')
+        totals = dict(revenue=('revenue', 'sum'), profit=('profit', 'sum'), orders=('revenue', 'size'))
+        parts = [df.groupby(day).agg(**totals).reset_index().assign(dimension='all', key=None)]
+        for dimension in self.DIMENSIONS:
+            grouped = df.groupby([df[dimension].rename('key'), day], observed=True)
+            parts.append(grouped.agg(**totals).reset_index().assign(dimension=dimension))
+        daily = pd.concat(parts, ignore_index=True).sort_values('day', kind='stable')
+
+        for day_value, dimension, key, revenue, profit, orders in zip(
+                daily['day'], daily['dimension'], daily['key'], daily['revenue'],
+                daily['profit'], daily['orders']):
+            day_number = day_value.toordinal()
+            self._advance(day_number)
+            self._add((dimension, key), day_number, revenue, profit, int(orders))
+        self.orders_seen += len(df)
+
+    def _advance(self, day: int) -> None:
+        """Fecha o dia em aberto de todas as chaves quando a data avança.
+
+        Custa O(chaves) uma vez por dia, não por pedido; assim chaves sem
+        pedidos também registram dias de receita zero e suas anomalias.
+        """
+        if day <= self._open_day:
+            return
+        for key, state in self._states.items():
+            if state.day < day:
+                self._close_day(key, state, day)
+        self._open_day = day
+
+    def _add(self, key: Tuple[str, Any], day: int, revenue: float, profit: float, orders: int) -> None:
+        """Soma ao dia em aberto da chave, fechando os dias anteriores se necessário."""
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState(day)
+        elif day > state.day:
+            self._close_day(key, state, day)
+        state.revenue += revenue
+        state.profit += profit
+        state.orders += orders
+
+    def _close_day(self, key: Tuple[str, Any], state: _KeyState, next_day: int) -> None:
+        """Avalia e incorpora o dia fechado e os dias sem pedidos até next_day."""
+        margin = state.profit / state.revenue * 100 if state.revenue > 0 else None
+        self._fold(key, state, state.day, state.revenue, margin)
+        if state.orders:
+            ticket = state.revenue / state.orders
+            state.ticket_mean += self.alpha * (ticket - state.ticket_mean) if state.ticket_mean else ticket
+        for gap_day in range(state.day + 1, min(next_day, state.day + 1 + _MAX_GAP_DAYS)):
+            self._fold(key, state, gap_day, 0.0, None)
+        state.day = next_day
+        state.revenue = state.profit = 0.0
+        state.orders = 0
+
+    def _fold(self, key: Tuple[str, Any], state: _KeyState, day: int, revenue: float,
+              margin: Optional[float]) -> None:
+        """Compara um dia com o histórico e atualiza média e variância exponenciais."""
+        flags = []
+        if state.days >= self.min_history_days:
+            # Piso de um ticket médio: um único pedido não caracteriza um pico
+            z = _zscore(revenue, state.revenue_mean, max(state.revenue_var, state.ticket_mean ** 2))
+            if z is not None and abs(z) > self.z_threshold:
+                kind = 'revenue_spike' if z > 0 else 'revenue_drop'
+                flags.append(self._anomaly(key, day, kind, revenue, state.revenue_mean, z))
+        if margin is not None and state.margin_days >= self.min_history_days:
+            # Piso de 1 p.p. de desvio-padrão para margens históricas constantes
+            z = _zscore(margin, state.margin_mean, max(state.margin_var, 1.0))
+            if z is not None and z < -self.z_threshold:
+                flags.append(self._anomaly(key, day, 'margin_drop', margin, state.margin_mean, z))
+
+        state.revenue_mean, state.revenue_var = self._ewma(
+            revenue, state.revenue_mean, state.revenue_var, state.days)
+        state.days += 1
+        if margin is not None:
+            state.margin_mean, state.margin_var = self._ewma(
+                margin, state.margin_mean, state.margin_var, state.margin_days)
+            state.margin_days += 1
+        self.anomalies.extend(flags)
+
+    def _ewma(self, value: float, mean: float, var: float, count: int) -> Tuple[float, float]:
+        """Atualização incremental da média e variância exponenciais."""
+        if count == 0:
+            return value, 0.0
+        diff = value - mean
+        increment = self.alpha * diff
+        return mean + increment, (1 - self.alpha) * (var + diff * increment)
+
+    @staticmethod
+    def _anomaly(key: Tuple[str, Any], day: int, kind: str, value: float,
+                 expected: float, zscore: float) -> Dict:
+        return {'date': pd.Timestamp.fromordinal(day), 'dimension': key[0], 'key': key[1],
+                'kind': kind, 'value': value, 'expected': expected, 'zscore': zscore}
+
+    @property
+    def last_closed_day(self) -> Optional[pd.Timestamp]:
+        """Último dia fechado considerando todos os pedidos."""
+        state = self._states.get(('all', None))
+        if state is None or state.days == 0:
+            return None
+        return pd.Timestamp.fromordinal(state.day - 1)
+
+    def current_anomalies(self, regions: Optional[Iterable] = None,
+                          categories: Optional[Iterable] = None,
+                          window_days: int = 7,
+                          date_range: Optional[Tuple[Any, Any]] = None) -> List[Dict]:
+        """
+        Anomalias recentes das chaves selecionadas, da mais forte à mais fraca
+
+        Args:
+            regions (Optional[Iterable]): Regiões consideradas (None = todas)
+            categories (Optional[Iterable]): Categorias consideradas (None = todas)
+            window_days (int): Dias considerados antes do fim da janela
+            date_range (Optional[Tuple[Any, Any]]): Período do filtro; a janela
+                termina no menor entre o fim do período e o último dia fechado
+                e não começa antes do início do período
+
+        Returns:
+            List[Dict]: Anomalias com date, dimension, key, kind, value,
+                expected e zscore
+        """
+        last = self.last_closed_day
+        if last is None:
+            return []
+        first = None
+        if date_range is not None:
+            first, end = (pd.Timestamp(value).normalize() for value in date_range)
+            last = min(last, end)
+        since = last - pd.Timedelta(days=window_days)
+        if first is not None:
+            since = max(since, first - pd.Timedelta(days=1))
+        selected = {'region': set(regions) if regions is not None else None,
+                    'category': set(categories) if categories is not None else None}
+        # O total só é relevante quando a seleção cobre todas as chaves
+        unfiltered = all(
+            keys is None or keys.issuperset(key for (dim, key) in self._states if dim == dimension)
+            for dimension, keys in selected.items())
+
+        found = []
+        # Histórico completo (deque limitado); flags de cada dia ficam até saírem da janela
+        for flag in reversed(self.anomalies):
+            if not since < flag['date'] <= last:
+                continue
+            dimension = flag['dimension']
+            if dimension == 'all' and not unfiltered:
+                continue
+            if dimension != 'all' and selected[dimension] is not None and flag['key'] not in selected[dimension]:
+                continue
+            found.append(flag)
+        return sorted(found, key=lambda flag: -abs(flag['zscore']))
+
+
+def _zscore(value: float, mean: float, var: float) -> Optional[float]:
+    """Desvios-padrão entre o valor e a média (None sem variância)."""
+    if var <= 0:
+        return None
+    return (value - mean) / math.sqrt(var)
+
+
+def _format_anomaly(anomaly: Dict) -> Tuple[str, str]:
+    """Converte uma anomalia em (nível, mensagem) para as caixas de alerta."""
+    where = anomaly['key'] if anomaly['dimension'] != 'all' else 'Total'
+    day = anomaly['date'].strftime('%d/%m')
+    if anomaly['kind'] == 'margin_drop':
+        return ("danger", f"📉 Queda de margem em {where} ({day}): {anomaly['value']:.1f}% "
+                          f"vs {anomaly['expected']:.1f}% esperado")
+    if anomaly['kind'] == 'revenue_spike':
+        return ("warning", f"📈 Pico de receita em {where} ({day}): {format_currency(anomaly['value'])} "
+                           f"vs {format_currency(anomaly['expected'])} esperado")
+    return ("warning", f"📉 Queda de receita em {where} ({day}): {format_currency(anomaly['value'])} "
+                       f"vs {format_currency(anomaly['expected'])} esperado")
+
+
+def generate_alerts(df: pd.DataFrame, kpis: Dict, engine: Optional[StreamingAlertEngine] = None,
+                    regions: Optional[Iterable] = None, categories: Optional[Iterable] = None,
+                    date_range: Optional[Tuple[Any, Any]] = None,
+                    max_anomalies: int = 3) -> List[Tuple[str, str]]:
+    """
+    Gera alertas automáticos a partir dos KPIs e das anomalias detectadas
+
+    Args:
+        df (pd.DataFrame): DataFrame filtrado
+        kpis (Dict): KPIs do DataFrame filtrado
+        engine (Optional[StreamingAlertEngine]): Motor de anomalias (sem ele,
+            os alertas de desvio do histórico são omitidos)
+        regions (Optional[Iterable]): Regiões do filtro (None = todas)
+        categories (Optional[Iterable]): Categorias do filtro (None = todas)
+        date_range (Optional[Tuple[Any, Any]]): Período do filtro; só entram
+            anomalias dos últimos dias dentro dele
+        max_anomalies (int): Máximo de anomalias exibidas
+
+    Returns:
+        List[Tuple[str, str]]: Pares (nível, mensagem)
+    """
+    alerts = []
+
+    # Alerta de margem baixa
+    if kpis['avg_margin'] < ALERT_CONFIG['margin_critical']:
+        alerts.append(
+            ("danger", f"⚠️ Margem média crítica: {kpis['avg_margin']:.1f}% "
+                       f"(abaixo de {ALERT_CONFIG['margin_critical']}%)"))
+    elif kpis['avg_margin'] < ALERT_CONFIG['margin_low']:
+        alerts.append(
+            ("warning", f"⚡ Margem média baixa: {kpis['avg_margin']:.1f}% "
+                        f"(abaixo de {ALERT_CONFIG['margin_low']}%)"))
+    else:
+        alerts.append(
+            ("success", f"✅ Margem média saudável: {kpis['avg_margin']:.1f}%"))
+
+    # Alerta de concentração de receita (sobre os dados filtrados, como os KPIs)
+    top3_revenue = df.groupby('category', observed=True)['revenue'].sum().nlargest(3).sum()
+    total_revenue = df['revenue'].sum()
+    concentration = (top3_revenue / total_revenue *
+                     100) if total_revenue > 0 else 0
+    if concentration > ALERT_CONFIG['concentration_high']:
+        alerts.append(
+            ("danger", f"⚠️ Alta concentração: Top 3 categorias = {concentration:.1f}% da receita"))
+    elif concentration > ALERT_CONFIG['concentration_moderate']:
+        alerts.append(
+            ("warning", f"⚡ Concentração moderada: Top 3 categorias = {concentration:.1f}% da receita"))
+
+    # Alerta de ticket médio
+    if kpis['avg_ticket'] < ALERT_CONFIG['min_ticket']:
+        alerts.append(
+            ("warning", f"⚡ Ticket médio baixo: {format_currency(kpis['avg_ticket'])}"))
+    else:
+        alerts.append(
+            ("success", f"✅ Ticket médio saudável: {format_currency(kpis['avg_ticket'])}"))
+
+    # Alerta de volume de pedidos
+    if kpis['total_orders'] < ALERT_CONFIG['min_orders']:
+        alerts.append(
+            ("danger", f"⚠️ Volume de pedidos baixo no período: {kpis['total_orders']} pedidos"))
+
+    # Desvios em relação ao histórico recente
+    if engine is not None:
+        anomalies = engine.current_anomalies(regions, categories, date_range=date_range)
+        alerts.extend(_format_anomaly(anomaly) for anomaly in anomalies[:max_anomalies])
+
+    return alerts
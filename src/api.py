@@ -0,0 +1,412 @@
+"""
+Serviço HTTP local (JSON) sobre a camada de análise do projeto de Análise de Vendas
+
+Execução: python src/api.py [--host 127.0.0.1] [--port 8765]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import pandas as pd
+from alerts import StreamingAlertEngine, generate_alerts
+from config import API_CONFIG, ALERT_CONFIG, DATA_DIR, REFRESH_CONFIG
+from refresh import DataRefresher, DatasetSnapshot
+from utils import load_data, apply_filters, calculate_kpis, get_top_performers, generate_insights, forecast_revenue
+
+# Filtros em lista aceitos na query string (valores separados por vírgula ou repetidos)
+_LIST_FILTERS = ('regions', 'categories', 'products', 'customers')
+
+_MAX_HEADER_LINES = 100
+
+
+class APIError(Exception):
+    """Erro de requisição com o status HTTP correspondente."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_request(query: str, body: bytes = b'') -> Tuple[Dict, Dict]:
+    """
+    Separa a especificação de filtros dos parâmetros do endpoint
+
+    Na query string: regions, categories, products, customers (listas),
+    date_from/date_to, revenue_min/revenue_max e min_quantity. No corpo
+    JSON (POST): {"filters": {<spec de filter_mask>}, <parâmetros>}.
+
+    Args:
+        query (str): Query string da URL
+        body (bytes): Corpo JSON da requisição (opcional)
+
+    Returns:
+        Tuple[Dict, Dict]: Especificação de filtros e parâmetros do endpoint
+    """
+    values = {key: items for key, items in parse_qs(query, keep_blank_values=False).items()}
+    spec: Dict[str, Any] = {}
+    for key in _LIST_FILTERS:
+        if key in values:
+            spec[key] = sorted(item for raw in values.pop(key) for item in raw.split(',') if item)
+    date_from, date_to = values.pop('date_from', [None])[0], values.pop('date_to', [None])[0]
+    if date_from or date_to:
+        spec['date_range'] = (date_from or '1900-01-01', date_to or '2262-04-11')
+    revenue_min, revenue_max = values.pop('revenue_min', [None])[0], values.pop('revenue_max', [None])[0]
+    if revenue_min or revenue_max:
+        spec['revenue_range'] = (float(revenue_min or -math.inf), float(revenue_max or math.inf))
+    if 'min_quantity' in values:
+        spec['min_quantity'] = int(values.pop('min_quantity')[0])
+    params = {key: items[-1] for key, items in values.items()}
+
+    if body:
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError as error:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"JSON inválido: {error}") from error
+        if not isinstance(payload, dict):
+            raise APIError(HTTPStatus.BAD_REQUEST, "O corpo deve ser um objeto JSON")
+        spec.update({key: value for key, value in (payload.pop('filters', None) or {}).items()
+                     if value is not None})
+        params.update(payload)
+    return spec, params
+
+
+def _to_json(value: Any) -> Any:
+    """Converte tipos do numpy/pandas para JSON."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (pd.Timestamp, pd.Period)):
+        return str(value)
+    if isinstance(value, pd.Series):
+        return [{'key': _to_json(key), 'value': _to_json(item)} for key, item in value.items()]
+    if isinstance(value, dict):
+        return {str(key): _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return value
+
+
+def _kpis(df: pd.DataFrame, snapshot: DatasetSnapshot, spec: Dict, params: Dict) -> Any:
+    return calculate_kpis(df) if len(df) else {}
+
+
+def _top_performers(df: pd.DataFrame, snapshot: DatasetSnapshot, spec: Dict, params: Dict) -> Any:
+    column = params.get('column', 'product')
+    metric = params.get('metric', 'revenue')
+    if column not in ('category', 'product', 'region', 'customer'):
+        raise APIError(HTTPStatus.BAD_REQUEST, f"Coluna inválida: {column}")
+    if metric not in ('revenue', 'profit', 'quantity'):
+        raise APIError(HTTPStatus.BAD_REQUEST, f"Métrica inválida: {metric}")
+    parent = params.get('parent')
+    if parent is not None and column not in ('product', 'customer'):
+        raise APIError(HTTPStatus.BAD_REQUEST, f"Coluna sem hierarquia: {column}")
+    return get_top_performers(df, column, metric, int(params.get('top_n', 10)), parent=parent)
+
+
+def _insights(df: pd.DataFrame, snapshot: DatasetSnapshot, spec: Dict, params: Dict) -> Any:
+    return generate_insights(df) if len(df) else {}
+
+
+def _alerts(df: pd.DataFrame, snapshot: DatasetSnapshot, spec: Dict, params: Dict) -> Any:
+    if not len(df):
+        return []
+    alerts = generate_alerts(df, calculate_kpis(df), snapshot.derived.get('alerts'),
+                             regions=spec.get('regions'), categories=spec.get('categories'),
+                             date_range=spec.get('date_range'))
+    return [{'level': level, 'message': message} for level, message in alerts]
+
+
+def _forecast(df: pd.DataFrame, snapshot: DatasetSnapshot, spec: Dict, params: Dict) -> Any:
+    history, forecast = forecast_revenue(df, periods=int(params.get('periods', 3)))
+    return {'history': history, 'forecast': forecast}
+
+
+ENDPOINTS: Dict[str, Callable[[pd.DataFrame, DatasetSnapshot, Dict, Dict], Any]] = {
+    '/kpis': _kpis,
+    '/top-performers': _top_performers,
+    '/insights': _insights,
+    '/alerts': _alerts,
+    '/forecast': _forecast,
+}
+
+
+class AnalyticsAPI:
+    """
+    Respostas JSON das funções de análise sobre o snapshot atual dos dados
+
+    O dataset fica carregado uma vez (DataRefresher). Cada resposta é
+    identificada por um ETag derivado da versão dos dados, do endpoint e dos
+    filtros: requisições repetidas vêm de um cache LRU, If-None-Match
+    retorna 304 sem recalcular e requisições idênticas simultâneas
+    compartilham o mesmo cálculo, executado fora do loop de eventos.
+    """
+
+    def __init__(self, refresher: DataRefresher, workers: int = 4, cache_size: int = 256,
+                 keepalive_timeout: float = 15):
+        """
+        Args:
+            refresher (DataRefresher): Fonte dos snapshots versionados
+            workers (int): Threads que executam os cálculos
+            cache_size (int): Respostas mantidas no cache
+            keepalive_timeout (float): Segundos de inatividade antes de
+                encerrar uma conexão persistente
+        """
+        self.refresher = refresher
+        self.cache_size = cache_size
+        self.keepalive_timeout = keepalive_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self.stats = {'requests': 0, 'computed': 0, 'cache_hits': 0, 'not_modified': 0}
+        self._cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def etag(version: int, path: str, spec: Dict, params: Dict) -> str:
+        """
+        ETag da resposta para uma versão dos dados, endpoint e filtros
+
+        Args:
+            version (int): Versão do snapshot
+            path (str): Endpoint
+            spec (Dict): Especificação de filtros
+            params (Dict): Parâmetros do endpoint
+
+        Returns:
+            str: ETag entre aspas
+        """
+        canonical = json.dumps([path, spec, params], sort_keys=True, default=str)
+        digest = hashlib.sha1(canonical.encode()).hexdigest()[:16]
+        return f'"{version}-{digest}"'
+
+    def compute(self, snapshot: DatasetSnapshot, path: str, spec: Dict, params: Dict) -> bytes:
+        """
+        Calcula o corpo JSON de um endpoint (síncrono, executado nas threads)
+
+        Args:
+            snapshot (DatasetSnapshot): Snapshot dos dados
+            path (str): Endpoint
+            spec (Dict): Especificação de filtros
+            params (Dict): Parâmetros do endpoint
+
+        Returns:
+            bytes: Corpo da resposta
+        """
+        try:
+            df = apply_filters(snapshot.data, spec) if spec else snapshot.data
+            result = ENDPOINTS[path](df, snapshot, spec, params)
+        except (KeyError, ValueError, TypeError) as error:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Parâmetros inválidos: {error}") from error
+        payload = {'version': snapshot.version, 'rows': len(df), 'data': _to_json(result)}
+        return json.dumps(payload, ensure_ascii=False).encode()
+
+    async def respond(self, method: str, target: str, headers: Dict[str, str],
+                      body: bytes = b'') -> Tuple[HTTPStatus, Dict[str, str], bytes]:
+        """
+        Resolve uma requisição em (status, cabeçalhos, corpo)
+
+        Args:
+            method (str): Método HTTP
+            target (str): Caminho com query string
+            headers (Dict[str, str]): Cabeçalhos (nomes em minúsculas)
+            body (bytes): Corpo da requisição
+
+        Returns:
+            Tuple[HTTPStatus, Dict[str, str], bytes]: Resposta
+        """
+        self.stats['requests'] += 1
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        snapshot = self.refresher.current()
+
+        try:
+            if path == '/health':
+                return self._json(HTTPStatus.OK, {'status': 'ok', 'version': snapshot.version,
+                                                  'rows': len(snapshot.data), **self.stats})
+            if path not in ENDPOINTS:
+                raise APIError(HTTPStatus.NOT_FOUND, f"Endpoint inexistente: {path}")
+            if method not in ('GET', 'POST'):
+                raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, f"Método não suportado: {method}")
+            try:
+                spec, params = parse_request(url.query, body)
+            except ValueError as error:
+                raise APIError(HTTPStatus.BAD_REQUEST, f"Filtros inválidos: {error}") from error
+
+            etag = self.etag(snapshot.version, path, spec, params)
+            response_headers = {'ETag': etag, 'Cache-Control': 'no-cache',
+                                'X-Data-Version': str(snapshot.version)}
+            if headers.get('if-none-match') == etag:
+                self.stats['not_modified'] += 1
+                return HTTPStatus.NOT_MODIFIED, response_headers, b''
+
+            content = await self._cached(etag, snapshot, path, spec, params)
+            return HTTPStatus.OK, {**response_headers, 'Content-Type': 'application/json; charset=utf-8'}, content
+        except APIError as error:
+            return self._json(error.status, {'error': str(error)})
+        except Exception as error:
+            return self._json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': repr(error)})
+
+    async def _cached(self, etag: str, snapshot: DatasetSnapshot, path: str, spec: Dict,
+                      params: Dict) -> bytes:
+        """Corpo do cache LRU, de um cálculo em andamento ou de um novo cálculo."""
+        if etag in self._cache:
+            self._cache.move_to_end(etag)
+            self.stats['cache_hits'] += 1
+            return self._cache[etag]
+        if etag in self._pending:
+            self.stats['cache_hits'] += 1
+            return await asyncio.shield(self._pending[etag])
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self.compute, snapshot, path, spec, params)
+        self._pending[etag] = future
+        try:
+            content = await future
+        finally:
+            del self._pending[etag]
+        self.stats['computed'] += 1
+        self._cache[etag] = content
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return content
+
+    @staticmethod
+    def _json(status: HTTPStatus, payload: Dict) -> Tuple[HTTPStatus, Dict[str, str], bytes]:
+        return (status, {'Content-Type': 'application/json; charset=utf-8'},
+                json.dumps(payload, ensure_ascii=False).encode())
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Atende requisições HTTP/1.1 em sequência numa conexão persistente
+
+        Args:
+            reader (asyncio.StreamReader): Leitura da conexão
+            writer (asyncio.StreamWriter): Escrita da conexão
+        """
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write(writer, *self._json(HTTPStatus.BAD_REQUEST,
+                                                          {'error': 'Requisição inválida'}), False)
+                    break
+
+                headers = {}
+                for _ in range(_MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._write(writer, *self._json(HTTPStatus.BAD_REQUEST,
+                                                          {'error': 'Content-Length inválido'}), False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                status, response_headers, content = await self.respond(method, target, headers, body)
+                await self._write(writer, status, response_headers, content, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer: asyncio.StreamWriter, status: HTTPStatus, headers: Dict[str, str],
+                     content: bytes, keep_alive: bool) -> None:
+        """Escreve a resposta HTTP/1.1."""
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+                 f"Content-Length: {len(content)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if keep_alive:
+            lines.append(f"Keep-Alive: timeout={int(self.keepalive_timeout)}")
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + content)
+        await writer.drain()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765) -> asyncio.AbstractServer:
+        """
+        Inicia o servidor (apenas localhost por padrão)
+
+        Args:
+            host (str): Endereço de escuta
+            port (int): Porta (0 escolhe uma porta livre)
+
+        Returns:
+            asyncio.AbstractServer: Servidor iniciado
+        """
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self) -> None:
+        """Encerra as threads de cálculo."""
+        self.executor.shutdown(wait=False)
+
+
+def create_refresher(source: Optional[str] = None) -> DataRefresher:
+    """
+    Refresher com os dados de vendas e o motor de alertas
+
+    Args:
+        source (Optional[str]): CSV de origem (padrão: data/sales_data.csv)
+
+    Returns:
+        DataRefresher: Refresher já iniciado
+    """
+    source = source or DATA_DIR / "sales_data.csv"
+    return DataRefresher(
+        loader=lambda: load_data(source),
+        builders={
+            'alerts': lambda data: StreamingAlertEngine.build(
+                data, halflife_days=ALERT_CONFIG['halflife_days'],
+                z_threshold=ALERT_CONFIG['z_threshold'],
+                min_history_days=ALERT_CONFIG['min_history_days'])
+        },
+        interval=REFRESH_CONFIG['interval_seconds'] if REFRESH_CONFIG['enabled'] else 0,
+        source=source
+    ).start()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    api = AnalyticsAPI(create_refresher(args.data), workers=API_CONFIG['workers'],
+                       cache_size=API_CONFIG['cache_size'],
+                       keepalive_timeout=API_CONFIG['keepalive_timeout'])
+    server = await api.serve(args.host, args.port)
+    print(f"API de análise em http://{args.host}:{args.port} — endpoints: "
+          f"{', '.join(ENDPOINTS)}, /health")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serviço HTTP local da Análise de Vendas")
+    parser.add_argument('--host', default=API_CONFIG['host'])
+    parser.add_argument('--port', type=int, default=API_CONFIG['port'])
+    parser.add_argument('--data', default=None, help="CSV de vendas")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
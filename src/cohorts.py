@@ -0,0 +1,186 @@
+"""
+Análise de coortes, retenção e RFM para o projeto de Análise de Vendas
+"""
+
+from typing import Optional
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class CustomerActivityMatrix:
+    """
+    Matriz esparsa cliente × mês construída uma vez a partir dos pedidos
+
+    Guarda receita e número de pedidos por célula ativa (CSR, índices de
+    coluna ordenados). Coortes, curvas de retenção, taxas de recompra e
+    pontuações RFM são derivadas das entradas não nulas, sem groupby por
+    coorte, em tempo proporcional ao número de células ativas.
+    """
+
+    def __init__(self, customers: pd.Index, periods: pd.PeriodIndex, revenue: sparse.csr_matrix,
+                 orders: sparse.csr_matrix, last_order: pd.Series):
+        self.customers = customers
+        self.periods = periods
+        self.revenue = revenue
+        self.orders = orders
+        self.last_order = last_order
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> 'CustomerActivityMatrix':
+        """
+        Constrói as matrizes de receita e pedidos por cliente e mês
+
+        Args:
+            df (pd.DataFrame): DataFrame preparado
+
+        Returns:
+            CustomerActivityMatrix: Matrizes de atividade
+        """
+        customer_codes, customers = pd.factorize(df['customer'])
+        month_index = (df['order_date'].dt.year * 12 + df['order_date'].dt.month - 1).to_numpy()
+        first_month = int(month_index.min()) if len(df) else 0
+        n_periods = int(month_index.max()) - first_month + 1 if len(df) else 0
+        period_codes = month_index - first_month
+        periods = pd.period_range(
+            pd.Period(year=first_month // 12, month=first_month % 12 + 1, freq='M'),
+            periods=n_periods, freq='M')
+
+        shape = (len(customers), n_periods)
+        coords = (customer_codes, period_codes)
+        revenue = sparse.coo_matrix((df['revenue'].to_numpy(dtype=float), coords), shape=shape).tocsr()
+        orders = sparse.coo_matrix((np.ones(len(df)), coords), shape=shape).tocsr()
+        revenue.sort_indices()
+        orders.sort_indices()
+
+        last_order = df['order_date'].groupby(customer_codes).max()
+        last_order.index = customers[last_order.index]
+        return cls(pd.Index(customers, name='customer'), periods, revenue, orders, last_order)
+
+    def _entries(self):
+        """Linha, coluna, coorte e deslocamento de cada célula ativa."""
+        rows = np.repeat(np.arange(self.orders.shape[0]), np.diff(self.orders.indptr))
+        cols = self.orders.indices
+        first = self.orders.indices[self.orders.indptr[:-1]]
+        cohort = first[rows]
+        return rows, cols, cohort, cols - cohort
+
+    def first_period(self) -> pd.Series:
+        """
+        Mês da primeira compra de cada cliente (sua coorte)
+
+        Returns:
+            pd.Series: Período indexado pelo cliente
+        """
+        first = self.orders.indices[self.orders.indptr[:-1]]
+        return pd.Series(self.periods[first], index=self.customers, name='cohort')
+
+    def cohort_table(self, metric: str = 'customers') -> pd.DataFrame:
+        """
+        Tabela coorte × meses desde a primeira compra
+
+        Args:
+            metric (str): 'customers' (clientes ativos), 'orders' ou 'revenue'
+
+        Returns:
+            pd.DataFrame: Coortes nas linhas e deslocamento (0, 1, ...) nas colunas
+        """
+        n = len(self.periods)
+        _, _, cohort, offset = self._entries()
+        if metric == 'customers':
+            weights = None
+        elif metric == 'orders':
+            weights = self.orders.data
+        elif metric == 'revenue':
+            weights = self.revenue.data
+        else:
+            raise ValueError(f"Métrica de coorte inválida: {metric}")
+
+        table = np.bincount(cohort * n + offset, weights=weights, minlength=n * n).reshape(n, n)
+        result = pd.DataFrame(table, index=self.periods.astype(str), columns=range(n))
+        result.index.name = 'cohort'
+        result.columns.name = 'offset'
+        # Somente coortes com clientes
+        return result[result[0] > 0] if n else result
+
+    def retention(self) -> pd.DataFrame:
+        """
+        Fração de cada coorte ativa em cada mês após a primeira compra
+
+        Deslocamentos além do fim dos dados ficam como NaN.
+
+        Returns:
+            pd.DataFrame: Retenção coorte × deslocamento (0 a 1)
+        """
+        counts = self.cohort_table('customers')
+        if counts.empty:
+            return counts.astype(float)
+        retention = counts.div(counts[0], axis=0)
+        # Meses ainda não observados para coortes recentes
+        cohort_pos = pd.PeriodIndex(retention.index, freq='M').map(self.periods.get_loc).to_numpy()
+        observable = len(self.periods) - cohort_pos
+        retention = retention.where(np.arange(retention.shape[1]) < observable[:, None])
+        return retention
+
+    def retention_curve(self) -> pd.Series:
+        """
+        Curva média de retenção ponderada pelo tamanho das coortes observáveis
+
+        Returns:
+            pd.Series: Retenção por deslocamento
+        """
+        counts = self.cohort_table('customers')
+        if counts.empty:
+            return pd.Series(dtype=float, name='retention')
+        observed = self.retention().notna()
+        sizes = counts[0].to_numpy()[:, None] * observed
+        active = counts.where(observed, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            curve = active.sum() / sizes.sum()
+        curve.name = 'retention'
+        return curve
+
+    def repeat_purchase_rate(self) -> float:
+        """
+        Fração de clientes com mais de um pedido
+
+        Returns:
+            float: Taxa de recompra (0 a 1)
+        """
+        if not len(self.customers):
+            return 0.0
+        orders_per_customer = np.asarray(self.orders.sum(axis=1)).ravel()
+        return float((orders_per_customer > 1).mean())
+
+    def rfm(self, reference_date: Optional[pd.Timestamp] = None, bins: int = 5) -> pd.DataFrame:
+        """
+        Recência, frequência e valor monetário com pontuações de 1 a bins
+
+        Args:
+            reference_date (Optional[pd.Timestamp]): Data de referência da
+                recência (padrão: dia seguinte ao último pedido)
+            bins (int): Número de faixas das pontuações
+
+        Returns:
+            pd.DataFrame: Uma linha por cliente com recency_days, frequency,
+                monetary, active_months, r_score, f_score, m_score e rfm_score
+        """
+        if reference_date is None:
+            reference_date = self.last_order.max() + pd.Timedelta(days=1)
+
+        rfm = pd.DataFrame({
+            'recency_days': (reference_date - self.last_order.reindex(self.customers)).dt.days.to_numpy(),
+            'frequency': np.asarray(self.orders.sum(axis=1)).ravel().astype(np.int64),
+            'monetary': np.asarray(self.revenue.sum(axis=1)).ravel(),
+            'active_months': np.diff(self.orders.indptr)
+        }, index=self.customers)
+
+        def score(values: pd.Series, ascending: bool = True) -> pd.Series:
+            pct = values.rank(method='average', pct=True, ascending=ascending)
+            return np.ceil(pct * bins).clip(1, bins).astype(int)
+
+        rfm['r_score'] = score(rfm['recency_days'], ascending=False)
+        rfm['f_score'] = score(rfm['frequency'])
+        rfm['m_score'] = score(rfm['monetary'])
+        rfm['rfm_score'] = rfm['r_score'] * 100 + rfm['f_score'] * 10 + rfm['m_score']
+        return rfm
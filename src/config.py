@@ -36,7 +36,74 @@ PLOT_CONFIG = {
 DATA_CONFIG = {
     "date_format": "%Y-%m-%d",
     "decimal_places": 2,
-    "currency": "R$"
+    "currency": "R$",
+    # Deduplicação por chave do pedido (first, last ou flag)
+    "dedup_key": "order_id",
+    "dedup_policy": "first",
+    "dedup_compare_columns": ["quantity", "price", "revenue", "profit"],
+    # Validação: tolerância de receita vs quantidade × preço e arquivo de
+    # quarentena das linhas reprovadas (None = não grava)
+    "revenue_tolerance": 0.01,
+    "quarantine_file": None
+}
+
+# Configurações dos sketches de quantis
+SKETCH_CONFIG = {
+    "compression": 100,
+    "percentile_options": [0, 1, 5, 10, 25, 50, 75, 90, 95, 99, 100]
+}
+
+# Configurações do modo aproximado (amostra estratificada)
+SAMPLING_CONFIG = {
+    "fraction": 0.02,
+    "min_per_stratum": 30,
+    "max_rows": 200_000,
+    "confidence": 0.95,
+    "random_state": 42
+}
+
+# Varredura automática do número de segmentos (K-Means)
+SEGMENTATION_CONFIG = {
+    "k_min": 2,
+    "k_max": 8,
+    "silhouette_sample": 2000,
+    "n_jobs": None,
+    "random_state": 42
+}
+
+# Atualização dos dados em segundo plano
+REFRESH_CONFIG = {
+    "enabled": True,
+    "interval_seconds": 300
+}
+
+# Alertas: limites fixos e detecção de anomalias (EWMA diária)
+ALERT_CONFIG = {
+    "margin_critical": 15,
+    "margin_low": 20,
+    "concentration_high": 70,
+    "concentration_moderate": 55,
+    "min_ticket": 2000,
+    "min_orders": 50,
+    "halflife_days": 7,
+    "z_threshold": 3.0,
+    "min_history_days": 14
+}
+
+# Serviço HTTP local (JSON) sobre a camada de análise
+API_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "workers": 4,
+    "cache_size": 256,
+    "keepalive_timeout": 15
+}
+
+# Tabela dinâmica: dimensões disponíveis e tamanho da parte exibida
+PIVOT_CONFIG = {
+    "dimensions": ["region", "category", "product", "customer", "year_month"],
+    "top_k": 15,
+    "max_top_k": 50
 }
 
 # Cores do projeto
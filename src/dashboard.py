@@ -1,5 +1,14 @@
-from utils import load_data, calculate_kpis, get_top_performers, format_currency, format_percentage, generate_insights
-from config import DASHBOARD_CONFIG, DATA_DIR, COLORS
+from utils import load_data, filter_mask, apply_filters, calculate_kpis, get_top_performers, format_currency, format_percentage, generate_insights, forecast_revenue
+from config import DASHBOARD_CONFIG, DATA_DIR, COLORS, SKETCH_CONFIG, SAMPLING_CONFIG, REFRESH_CONFIG, SEGMENTATION_CONFIG, ALERT_CONFIG, PIVOT_CONFIG
+from alerts import StreamingAlertEngine, generate_alerts
+from refresh import DataRefresher
+from profiling import Profiler, instrument, set_active_profiler, span
+from segmentation import sweep_kmeans, best_k
+from cohorts import CustomerActivityMatrix
+from drilldown import DrillDownIndex
+from pivot import SparsePivot
+from sketches import RevenueSketchIndex
+from sampling import StratifiedSample, approximate_kpis
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -7,9 +16,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import sys
 import io
-import numpy as np
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from sklearn.linear_model import LinearRegression
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 
@@ -104,11 +113,64 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data
-def load_sales_data():
-    return load_data(DATA_DIR / "sales_data.csv")
-
-
+@st.cache_resource
+def get_data_refresher():
+    """Dataset e estruturas derivadas versionados, atualizados em segundo plano."""
+    source = DATA_DIR / "sales_data.csv"
+    # Preenchido pelo loader e copiado para o snapshot pelo builder 'quality'
+    validation = {}
+    return DataRefresher(
+        loader=lambda: load_data(source, validation=validation),
+        builders={
+            'quality': lambda data: dict(validation),
+            'sketches': lambda data: RevenueSketchIndex.build(
+                data, compression=SKETCH_CONFIG['compression']),
+            'sample': lambda data: StratifiedSample.build(data, **SAMPLING_CONFIG),
+            'alerts': lambda data: StreamingAlertEngine.build(
+                data, halflife_days=ALERT_CONFIG['halflife_days'],
+                z_threshold=ALERT_CONFIG['z_threshold'],
+                min_history_days=ALERT_CONFIG['min_history_days'])
+        },
+        interval=REFRESH_CONFIG['interval_seconds'] if REFRESH_CONFIG['enabled'] else 0,
+        source=source
+    ).start()
+
+
+@st.cache_data(show_spinner="Avaliando números de segmentos...")
+def run_kmeans_sweep(X_scaled):
+    """Varredura de k em paralelo, em cache por matriz de features (estado dos filtros)."""
+    return sweep_kmeans(
+        X_scaled, range(SEGMENTATION_CONFIG['k_min'], SEGMENTATION_CONFIG['k_max'] + 1),
+        n_jobs=SEGMENTATION_CONFIG['n_jobs'], sample_size=SEGMENTATION_CONFIG['silhouette_sample'],
+        random_state=SEGMENTATION_CONFIG['random_state'])
+
+
+@st.cache_resource(max_entries=16)
+def get_drilldown(version, spec_key, _df_filtered):
+    """Cache de drill-down construído uma vez por versão dos dados e estado dos filtros."""
+    return DrillDownIndex.build(_df_filtered)
+
+
+@st.cache_resource(max_entries=16)
+def get_cohorts(version, spec_key, _df_filtered):
+    """Matriz de atividade, retenção e RFM por versão dos dados e estado dos filtros."""
+    activity = CustomerActivityMatrix.build(_df_filtered)
+    return activity, activity.retention(), activity.rfm()
+
+
+@st.cache_resource(max_entries=16)
+def get_pivot(version, spec_key, rows, columns, value, aggfunc, _df_filtered):
+    """Tabela dinâmica esparsa por versão dos dados, filtros e dimensões escolhidas."""
+    return SparsePivot.build(_df_filtered, rows, columns, value, aggfunc)
+
+
+@st.cache_resource
+def get_exact_executor():
+    """Executor compartilhado que calcula os resultados exatos em segundo plano."""
+    return ThreadPoolExecutor(max_workers=2)
+
+
+@instrument()
 def export_excel(df):
     """Exporta dataframe para Excel em memória."""
     output = io.BytesIO()
@@ -117,55 +179,120 @@ def export_excel(df):
     return output.getvalue()
 
 
-def generate_alerts(df, kpis):
-    """Gera alertas automáticos baseados nos dados."""
-    alerts = []
+def render_kpis(kpis, intervals=None):
+    """Exibe os cartões de KPIs; com intervals, marca os valores como estimativas."""
+    prefix = "≈ " if intervals is not None else ""
 
-    # Alerta de margem baixa
-    if kpis['avg_margin'] < 15:
-        alerts.append(
-            ("danger", f"⚠️ Margem média crítica: {kpis['avg_margin']:.1f}% (abaixo de 15%)"))
-    elif kpis['avg_margin'] < 20:
-        alerts.append(
-            ("warning", f"⚡ Margem média baixa: {kpis['avg_margin']:.1f}% (abaixo de 20%)"))
-    else:
-        alerts.append(
-            ("success", f"✅ Margem média saudável: {kpis['avg_margin']:.1f}%"))
-
-    # Alerta de concentração de receita
-    top3_revenue = df.groupby('category')['revenue'].sum().nlargest(3).sum()
-    total_revenue = df['revenue'].sum()
-    concentration = (top3_revenue / total_revenue *
-                     100) if total_revenue > 0 else 0
-    if concentration > 70:
-        alerts.append(
-            ("danger", f"⚠️ Alta concentração: Top 3 categorias = {concentration:.1f}% da receita"))
-    elif concentration > 55:
-        alerts.append(
-            ("warning", f"⚡ Concentração moderada: Top 3 categorias = {concentration:.1f}% da receita"))
-
-    # Alerta de ticket médio
-    if kpis['avg_ticket'] < 2000:
-        alerts.append(
-            ("warning", f"⚡ Ticket médio baixo: {format_currency(kpis['avg_ticket'])}"))
-    else:
-        alerts.append(
-            ("success", f"✅ Ticket médio saudável: {format_currency(kpis['avg_ticket'])}"))
+    def ci(key, fmt):
+        """Intervalo de confiança exibido logo abaixo do valor estimado."""
+        if intervals is None or intervals.get(key) is None:
+            return
+        st.caption(f"IC {SAMPLING_CONFIG['confidence']:.0%}: ± {fmt(intervals[key])}")
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric(label="💰 Receita Total", value=prefix + format_currency(
+            kpis['total_revenue']), delta=f"{kpis['total_orders']} pedidos")
+        ci('total_revenue', format_currency)
+    with col2:
+        st.metric(label="📈 Lucro Total", value=prefix + format_currency(
+            kpis['total_profit']), delta=format_percentage(kpis['avg_margin']))
+        ci('total_profit', format_currency)
+    with col3:
+        st.metric(label="🎯 Ticket Médio",
+                  value=prefix + format_currency(kpis['avg_ticket']))
+        ci('avg_ticket', format_currency)
+    with col4:
+        st.metric(label="👥 Clientes",
+                  value=(f"≥ {kpis['unique_customers']:,}" if intervals is not None
+                         else f"{kpis['unique_customers']:,}"),
+                  delta=f"{kpis['total_orders']} pedidos")
+    with col5:
+        st.metric(label="📦 Produtos",
+                  value=(f"≥ {kpis['unique_products']:,}" if intervals is not None
+                         else f"{kpis['unique_products']:,}"),
+                  delta=f"{kpis['avg_quantity']:.1f} qtd média")
+
+
+@instrument('plot:category_revenue')
+def plot_category_revenue(category_revenue):
+    """Gráfico de barras da receita por categoria."""
+    fig_category = px.bar(
+        x=category_revenue.values, y=category_revenue.index, orientation='h',
+        title="Receita por Categoria", labels={'x': 'Receita (R$)', 'y': 'Categoria'},
+        color=category_revenue.values, color_continuous_scale='viridis'
+    )
+    fig_category.update_layout(showlegend=False, height=400)
+    return fig_category
+
+
+@instrument('plot:region_stats')
+def plot_region_stats(region_stats):
+    """Dispersão de receita vs lucro por região."""
+    fig_region = px.scatter(
+        region_stats, x='revenue', y='profit', size='order_id', color='region',
+        title="Receita vs Lucro por Região",
+        labels={
+            'revenue': 'Receita (R$)', 'profit': 'Lucro (R$)', 'order_id': 'Nº Pedidos'},
+        hover_data=['order_id']
+    )
+    fig_region.update_layout(height=400)
+    return fig_region
 
-    # Alerta de volume de pedidos
-    if kpis['total_orders'] < 50:
-        alerts.append(
-            ("danger", f"⚠️ Volume de pedidos baixo no período: {kpis['total_orders']} pedidos"))
 
-    return alerts
+@instrument('plot:monthly_evolution')
+def plot_monthly_evolution(df_filtered):
+    """Painel 2×2 com receita, lucro, pedidos e margem mensais."""
+    monthly_data = df_filtered.groupby(df_filtered['order_date'].dt.to_period('M')).agg(
+        {'revenue': 'sum', 'profit': 'sum', 'order_id': 'count'}
+    ).reset_index()
+    monthly_data['order_date'] = monthly_data['order_date'].astype(str)
+    monthly_data['margin'] = (monthly_data['profit'] /
+                              monthly_data['revenue'] * 100).fillna(0)
+
+    fig_temporal = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Receita Mensal', 'Lucro Mensal',
+                        'Pedidos Mensais', 'Margem Mensal'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    fig_temporal.add_trace(go.Scatter(x=monthly_data['order_date'], y=monthly_data['revenue'],
+                           mode='lines+markers', name='Receita', line=dict(color=COLORS['primary'])), row=1, col=1)
+    fig_temporal.add_trace(go.Scatter(x=monthly_data['order_date'], y=monthly_data['profit'],
+                           mode='lines+markers', name='Lucro', line=dict(color=COLORS['success'])), row=1, col=2)
+    fig_temporal.add_trace(go.Bar(x=monthly_data['order_date'], y=monthly_data['order_id'],
+                           name='Pedidos', marker_color=COLORS['info']), row=2, col=1)
+    fig_temporal.add_trace(go.Scatter(x=monthly_data['order_date'], y=monthly_data['margin'],
+                           mode='lines+markers', name='Margem %', line=dict(color=COLORS['warning'])), row=2, col=2)
+    fig_temporal.update_layout(height=600, showlegend=False)
+    return fig_temporal
+
+
+# ── PROFILING (opt-in) ─────────────────────────────────────────────────────────
+# O checkbox fica no fim da sidebar; seu valor já está no session_state no início da execução
+# Memória é opt-in à parte: tracemalloc desacelera o processo inteiro (todas as sessões)
+profiler = (Profiler(track_memory=st.session_state.get('debug_memory', False))
+            if st.session_state.get('debug_panel') else None)
+set_active_profiler(profiler)
+
+
+def stop_run(rerun=False):
+    """Encerra a execução (st.stop/st.rerun) liberando antes o profiler e o tracemalloc."""
+    set_active_profiler(None)
+    if rerun:
+        st.rerun()
+    st.stop()
 
 
-# Carregar dados
+# Carregar dados (snapshot publicado; nunca espera por uma atualização em curso)
 try:
-    df = load_sales_data()
+    refresher = get_data_refresher()
+    snapshot = refresher.current()
 except Exception as e:
     st.error(f"Erro ao carregar dados: {e}")
-    st.stop()
+    stop_run()
+df = snapshot.data
 
 # ── SIDEBAR ──────────────────────────────────────────────────────────────────
 st.sidebar.header("🔍 Filtros de Análise")
@@ -217,14 +344,48 @@ selected_customers = st.sidebar.multiselect(
 # Filtro de faixa de receita
 min_rev = float(df['revenue'].min())
 max_rev = float(df['revenue'].max())
-revenue_range = st.sidebar.slider(
-    "💰 Faixa de Receita por Pedido (R$)",
-    min_value=min_rev,
-    max_value=max_rev,
-    value=(min_rev, max_rev),
-    format="R$ %.0f",
-    help="Filtre pedidos por valor de receita"
+use_percentiles = st.sidebar.checkbox(
+    "📐 Definir faixa de receita por percentis",
+    help="Converte percentis da distribuição de receita em valores (R$) para as regiões e categorias selecionadas"
 )
+sketches = snapshot.derived['sketches']
+# Meses cobertos pelo período (os sketches têm granularidade mensal)
+slice_months = None
+if len(date_range) == 2:
+    slice_months = list(pd.period_range(
+        date_range[0], date_range[1], freq='M').strftime('%Y-%m'))
+if use_percentiles:
+    pct_range = st.sidebar.select_slider(
+        "💰 Faixa de Receita por Pedido (percentis)",
+        options=SKETCH_CONFIG['percentile_options'],
+        value=(SKETCH_CONFIG['percentile_options'][0],
+               SKETCH_CONFIG['percentile_options'][-1]),
+        format_func=lambda p: f"P{p}"
+    )
+    slice_digest = sketches.query(
+        regions=regions, categories=categories, months=slice_months)
+    lower, upper = slice_digest.quantile([pct_range[0] / 100, pct_range[1] / 100])
+    # Percentis extremos cobrem a faixa inteira, sem perder os valores limite
+    revenue_range = (min_rev if pct_range[0] == 0 else lower,
+                     max_rev if pct_range[1] == 100 else upper)
+    st.sidebar.caption(
+        f"Faixa: {format_currency(revenue_range[0])} a {format_currency(revenue_range[1])}")
+else:
+    revenue_range = st.sidebar.slider(
+        "💰 Faixa de Receita por Pedido (R$)",
+        min_value=min_rev,
+        max_value=max_rev,
+        value=(min_rev, max_rev),
+        format="R$ %.0f",
+        help="Filtre pedidos por valor de receita"
+    )
+slice_quantiles = sketches.quantiles(
+    regions=regions, categories=categories, months=slice_months)
+if not slice_quantiles.isna().any():
+    st.sidebar.caption(
+        f"Mediana: {format_currency(slice_quantiles[0.5])} · "
+        f"P90: {format_currency(slice_quantiles[0.9])} · "
+        f"P99: {format_currency(slice_quantiles[0.99])}")
 
 # Filtro de quantidade mínima
 min_qty = int(df['quantity'].min())
@@ -238,32 +399,103 @@ qty_filter = st.sidebar.slider(
 )
 
 # ── APLICAR FILTROS ───────────────────────────────────────────────────────────
-if len(date_range) == 2:
-    df_filtered = df[
-        (df['order_date'] >= pd.to_datetime(date_range[0])) &
-        (df['order_date'] <= pd.to_datetime(date_range[1])) &
-        (df['region'].isin(regions)) &
-        (df['category'].isin(categories)) &
-        (df['product'].isin(selected_products)) &
-        (df['customer'].isin(selected_customers)) &
-        (df['revenue'] >= revenue_range[0]) &
-        (df['revenue'] <= revenue_range[1]) &
-        (df['quantity'] >= qty_filter)
-    ]
+filter_spec = {
+    'date_range': tuple(date_range) if len(date_range) == 2 else None,
+    'regions': regions,
+    'categories': categories,
+    'products': selected_products,
+    'customers': selected_customers,
+    'revenue_range': revenue_range,
+    'min_quantity': qty_filter
+}
+
+# ── MODO APROXIMADO ───────────────────────────────────────────────────────────
+st.sidebar.markdown("---")
+approx_mode = st.sidebar.checkbox(
+    "⚡ Modo aproximado (amostra estratificada)",
+    help="Responde KPIs e rankings a partir de uma amostra em memória enquanto os resultados exatos são calculados em segundo plano"
+)
+
+col_version, col_refresh = st.sidebar.columns([3, 2])
+col_version.caption(
+    f"🗂️ Dados v{snapshot.version} · {time.strftime('%H:%M:%S', time.localtime(snapshot.built_at))}")
+if col_refresh.button("🔄 Atualizar", help="Recarrega os dados em segundo plano; a versão atual segue em uso até a nova ficar pronta"):
+    refresher.refresh_now()
+if refresher.last_error is not None:
+    st.sidebar.warning(f"Falha na última atualização: {refresher.last_error}")
+
+quality = snapshot.derived['quality']
+if len(quality['quarantine']):
+    with st.sidebar.expander(f"🧪 Qualidade dos dados · {len(quality['quarantine'])} linhas em quarentena"):
+        summary = quality['summary']
+        st.dataframe(summary.loc[summary['rows'] > 0, ['description', 'rows']].rename(
+            columns={'description': 'Regra', 'rows': 'Linhas'}), hide_index=True)
+        st.download_button(
+            label="📥 Baixar quarentena (CSV)",
+            data=quality['quarantine'].to_csv(index=False).encode('utf-8'),
+            file_name="quarentena_vendas.csv",
+            mime="text/csv"
+        )
 else:
-    df_filtered = df[
-        (df['region'].isin(regions)) &
-        (df['category'].isin(categories)) &
-        (df['product'].isin(selected_products)) &
-        (df['customer'].isin(selected_customers)) &
-        (df['revenue'] >= revenue_range[0]) &
-        (df['revenue'] <= revenue_range[1]) &
-        (df['quantity'] >= qty_filter)
-    ]
+    st.sidebar.caption("🧪 Todas as linhas passaram na validação")
+
+exact_job = None
+if approx_mode:
+    exact_jobs = st.session_state.setdefault('exact_jobs', {})
+    job_key = (snapshot.version, repr(filter_spec))
+    if job_key not in exact_jobs:
+        # Resultados de outros filtros não serão mais exibidos: libera o executor
+        # compartilhado (cancel só tem efeito nos que ainda estão na fila)
+        for stale in exact_jobs.values():
+            stale.cancel()
+        exact_jobs.clear()
+        exact_jobs[job_key] = get_exact_executor().submit(apply_filters, df, filter_spec)
+    exact_job = exact_jobs[job_key]
+
+sample = snapshot.derived['sample'] if approx_mode else None
+sample_mask = None
+if exact_job is not None and not exact_job.done():
+    sample_mask = filter_mask(sample.frame, filter_spec).to_numpy()
+
+if sample_mask is not None and sample_mask.any():
+    kpis, kpi_intervals = approximate_kpis(sample, sample_mask)
+
+    st.markdown('<h1 class="main-header">📊 Dashboard de Análise de Vendas</h1>',
+                unsafe_allow_html=True)
+    st.markdown(
+        f"*Exibindo **≈ {kpis['total_orders']:,}** de **{len(df):,}** registros "
+        f"(estimativa a partir de {len(sample):,} linhas amostradas)*")
+    st.markdown("---")
+
+    st.subheader("📈 Indicadores Principais")
+    render_kpis(kpis, kpi_intervals)
+    st.markdown("---")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("📊 Performance por Categoria")
+        category_revenue = sample.estimate_group_totals(
+            'category', ['revenue'], sample_mask)['revenue']
+        st.plotly_chart(plot_category_revenue(category_revenue), width='stretch')
+    with col2:
+        st.subheader("🌎 Análise Regional")
+        region_stats = sample.estimate_group_totals(
+            'region', ['revenue', 'profit', 'orders'], sample_mask
+        ).rename(columns={'orders': 'order_id'}).reset_index()
+        st.plotly_chart(plot_region_stats(region_stats), width='stretch')
+
+    # Aguarda o resultado exato; qualquer interação interrompe a espera
+    status = st.empty()
+    while not exact_job.done():
+        status.info("⏳ Valores aproximados — calculando resultados exatos…")
+        time.sleep(0.1)
+    stop_run(rerun=True)
+
+df_filtered = exact_job.result() if exact_job is not None else apply_filters(df, filter_spec)
 
 if df_filtered.empty:
     st.warning("⚠️ Nenhum dado encontrado com os filtros aplicados.")
-    st.stop()
+    stop_run()
 
 # ── TÍTULO ────────────────────────────────────────────────────────────────────
 st.markdown('<h1 class="main-header">📊 Dashboard de Análise de Vendas</h1>',
@@ -275,29 +507,15 @@ st.markdown("---")
 # ── KPIs ──────────────────────────────────────────────────────────────────────
 kpis = calculate_kpis(df_filtered)
 st.subheader("📈 Indicadores Principais")
-col1, col2, col3, col4, col5 = st.columns(5)
-
-with col1:
-    st.metric(label="💰 Receita Total", value=format_currency(
-        kpis['total_revenue']), delta=f"{kpis['total_orders']} pedidos")
-with col2:
-    st.metric(label="📈 Lucro Total", value=format_currency(
-        kpis['total_profit']), delta=format_percentage(kpis['avg_margin']))
-with col3:
-    st.metric(label="🎯 Ticket Médio",
-              value=format_currency(kpis['avg_ticket']))
-with col4:
-    st.metric(label="👥 Clientes",
-              value=f"{kpis['unique_customers']:,}", delta=f"{kpis['total_orders']} pedidos")
-with col5:
-    st.metric(label="📦 Produtos",
-              value=f"{kpis['unique_products']:,}", delta=f"{kpis['avg_quantity']:.1f} qtd média")
+render_kpis(kpis)
 
 st.markdown("---")
 
 # ── ALERTAS AUTOMÁTICOS ───────────────────────────────────────────────────────
 st.subheader("🔔 Alertas Automáticos")
-alerts = generate_alerts(df_filtered, kpis)
+alerts = generate_alerts(df_filtered, kpis, snapshot.derived['alerts'],
+                         regions=filter_spec['regions'], categories=filter_spec['categories'],
+                         date_range=filter_spec['date_range'])
 cols = st.columns(len(alerts))
 for i, (level, msg) in enumerate(alerts):
     with cols[i]:
@@ -312,69 +530,42 @@ col1, col2 = st.columns(2)
 with col1:
     st.subheader("📊 Performance por Categoria")
     category_revenue = get_top_performers(df_filtered, 'category', 'revenue')
-    fig_category = px.bar(
-        x=category_revenue.values, y=category_revenue.index, orientation='h',
-        title="Receita por Categoria", labels={'x': 'Receita (R$)', 'y': 'Categoria'},
-        color=category_revenue.values, color_continuous_scale='viridis'
-    )
-    fig_category.update_layout(showlegend=False, height=400)
-    st.plotly_chart(fig_category, width='stretch')
+    st.plotly_chart(plot_category_revenue(category_revenue), width='stretch')
 
 with col2:
     st.subheader("🌎 Análise Regional")
     region_stats = df_filtered.groupby('region').agg(
         {'revenue': 'sum', 'profit': 'sum', 'order_id': 'count'}
     ).reset_index()
-    fig_region = px.scatter(
-        region_stats, x='revenue', y='profit', size='order_id', color='region',
-        title="Receita vs Lucro por Região",
-        labels={
-            'revenue': 'Receita (R$)', 'profit': 'Lucro (R$)', 'order_id': 'Nº Pedidos'},
-        hover_data=['order_id']
-    )
-    fig_region.update_layout(height=400)
-    st.plotly_chart(fig_region, width='stretch')
+    st.plotly_chart(plot_region_stats(region_stats), width='stretch')
 
 # ── ANÁLISE TEMPORAL ──────────────────────────────────────────────────────────
 st.subheader("📈 Evolução Temporal")
-monthly_data = df_filtered.groupby(df_filtered['order_date'].dt.to_period('M')).agg(
-    {'revenue': 'sum', 'profit': 'sum', 'order_id': 'count'}
-).reset_index()
-monthly_data['order_date'] = monthly_data['order_date'].astype(str)
-monthly_data['margin'] = (monthly_data['profit'] /
-                          monthly_data['revenue'] * 100).fillna(0)
-
-fig_temporal = make_subplots(
-    rows=2, cols=2,
-    subplot_titles=('Receita Mensal', 'Lucro Mensal',
-                    'Pedidos Mensais', 'Margem Mensal'),
-    specs=[[{"secondary_y": False}, {"secondary_y": False}],
-           [{"secondary_y": False}, {"secondary_y": False}]]
-)
-fig_temporal.add_trace(go.Scatter(x=monthly_data['order_date'], y=monthly_data['revenue'],
-                       mode='lines+markers', name='Receita', line=dict(color=COLORS['primary'])), row=1, col=1)
-fig_temporal.add_trace(go.Scatter(x=monthly_data['order_date'], y=monthly_data['profit'],
-                       mode='lines+markers', name='Lucro', line=dict(color=COLORS['success'])), row=1, col=2)
-fig_temporal.add_trace(go.Bar(x=monthly_data['order_date'], y=monthly_data['order_id'],
-                       name='Pedidos', marker_color=COLORS['info']), row=2, col=1)
-fig_temporal.add_trace(go.Scatter(x=monthly_data['order_date'], y=monthly_data['margin'],
-                       mode='lines+markers', name='Margem %', line=dict(color=COLORS['warning'])), row=2, col=2)
-fig_temporal.update_layout(height=600, showlegend=False)
-st.plotly_chart(fig_temporal, width='stretch')
+st.plotly_chart(plot_monthly_evolution(df_filtered), width='stretch')
 
 # ── RANKINGS ──────────────────────────────────────────────────────────────────
 st.markdown("---")
 col1, col2 = st.columns(2)
 
+drilldown = get_drilldown(snapshot.version, repr(filter_spec), df_filtered)
+
 with col1:
     st.subheader("🏆 Top 10 Produtos")
-    top_products = get_top_performers(df_filtered, 'product', 'revenue', 10)
+    category_parent = st.selectbox(
+        "Detalhar categoria", ['Todas'] + list(drilldown.levels['product'].parents))
+    top_products = get_top_performers(
+        df_filtered, 'product', 'revenue', 10,
+        parent=None if category_parent == 'Todas' else category_parent, hierarchy=drilldown)
     st.dataframe(pd.DataFrame({'Produto': top_products.index, 'Receita': [
                  format_currency(x) for x in top_products.values]}), width='stretch', hide_index=True)
 
 with col2:
     st.subheader("👥 Top 10 Clientes")
-    top_customers = get_top_performers(df_filtered, 'customer', 'revenue', 10)
+    region_parent = st.selectbox(
+        "Detalhar região", ['Todas'] + list(drilldown.levels['customer'].parents))
+    top_customers = get_top_performers(
+        df_filtered, 'customer', 'revenue', 10,
+        parent=None if region_parent == 'Todas' else region_parent, hierarchy=drilldown)
     st.dataframe(pd.DataFrame({'Cliente': top_customers.index, 'Receita': [
                  format_currency(x) for x in top_customers.values]}), width='stretch', hide_index=True)
 
@@ -429,36 +620,16 @@ st.markdown("---")
 st.subheader("🤖 Previsão de Vendas (Machine Learning)")
 st.caption("Modelo de Regressão Linear treinado com os dados históricos filtrados para prever receita futura.")
 
-# Preparar dados mensais para treino
-ml_monthly = df_filtered.groupby(df_filtered['order_date'].dt.to_period('M'))[
-    'revenue'].sum().reset_index()
-ml_monthly.columns = ['mes', 'receita']
-ml_monthly['mes_num'] = range(len(ml_monthly))
-
-if len(ml_monthly) >= 3:
-    X = ml_monthly[['mes_num']].values
-    y = ml_monthly['receita'].values
-
-    model = LinearRegression()
-    model.fit(X, y)
-
-    # Prever os próximos 3 meses
-    n_meses = len(ml_monthly)
-    futuros_idx = np.array([[n_meses], [n_meses + 1], [n_meses + 2]])
-    previsoes = model.predict(futuros_idx)
-
-    # Gerar labels dos meses futuros
-    ultimo_mes = ml_monthly['mes'].iloc[-1]
-    meses_futuros = [(ultimo_mes + i + 1).strftime('%Y-%m') for i in range(3)]
+ml_history, ml_forecast = forecast_revenue(df_filtered, periods=3)
 
-    # Montar dataframe de previsão
-    df_prev = pd.DataFrame(
-        {'Mês': meses_futuros, 'Previsão de Receita': previsoes})
+if len(ml_forecast):
+    meses_futuros = list(ml_forecast.index.astype(str))
+    previsoes = ml_forecast.to_numpy()
 
     # Gráfico combinado: histórico + previsão
     fig_ml = go.Figure()
     fig_ml.add_trace(go.Scatter(
-        x=ml_monthly['mes'].astype(str), y=ml_monthly['receita'],
+        x=ml_history.index.astype(str), y=ml_history.to_numpy(),
         mode='lines+markers', name='Histórico',
         line=dict(color='#1f77b4', width=2),
         marker=dict(size=6)
@@ -483,10 +654,80 @@ if len(ml_monthly) >= 3:
 else:
     st.info("ℹ️ São necessários pelo menos 3 meses de dados para gerar previsões. Ajuste os filtros de data.")
 
+# ── COORTES E RETENÇÃO ────────────────────────────────────────────────────────
+st.markdown("---")
+st.subheader("📅 Coortes e Retenção")
+st.caption("Clientes agrupados pelo mês da primeira compra: percentual de cada coorte que volta a comprar nos meses seguintes.")
+
+with span('cohorts:build', len(df_filtered)):
+    activity, retention, rfm = get_cohorts(snapshot.version, repr(filter_spec), df_filtered)
+
+col1, col2 = st.columns([3, 1])
+with col1:
+    fig_cohort = px.imshow(
+        retention * 100, text_auto='.0f', aspect='auto', color_continuous_scale='Blues',
+        labels={'x': 'Meses desde a primeira compra', 'y': 'Coorte', 'color': 'Retenção (%)'},
+        title="Retenção por Coorte (%)"
+    )
+    fig_cohort.update_layout(height=400)
+    st.plotly_chart(fig_cohort, width='stretch')
+with col2:
+    curve = activity.retention_curve()
+    st.metric(label="🔁 Taxa de Recompra",
+              value=format_percentage(activity.repeat_purchase_rate() * 100),
+              help="Clientes com mais de um pedido no período filtrado")
+    if len(curve) > 1:
+        st.metric(label="📆 Retenção no 1º mês", value=format_percentage(curve[1] * 100))
+    st.metric(label="⭐ Clientes RFM 5-5-5",
+              value=f"{int((rfm['rfm_score'] == 555).sum()):,}",
+              help="Recência, frequência e valor monetário no quintil mais alto")
+
+# ── TABELA DINÂMICA ───────────────────────────────────────────────────────────
+st.markdown("---")
+st.subheader("🧮 Tabela Dinâmica")
+st.caption("Cruzamento de duas dimensões quaisquer. A tabela completa fica em formato esparso; só as maiores linhas e colunas são exibidas.")
+
+dimension_labels = {'region': 'Região', 'category': 'Categoria', 'product': 'Produto',
+                    'customer': 'Cliente', 'year_month': 'Mês'}
+metric_labels = {'revenue': 'Receita', 'profit': 'Lucro', 'quantity': 'Quantidade'}
+aggfunc_labels = {'sum': 'Soma', 'mean': 'Média', 'count': 'Nº de pedidos'}
+
+col1, col2, col3, col4, col5 = st.columns(5)
+with col1:
+    pivot_rows = st.selectbox("Linhas", PIVOT_CONFIG['dimensions'], index=3,
+                              format_func=dimension_labels.get)
+with col2:
+    pivot_columns = st.selectbox("Colunas", [d for d in PIVOT_CONFIG['dimensions'] if d != pivot_rows],
+                                 index=1, format_func=dimension_labels.get)
+with col3:
+    pivot_value = st.selectbox("Métrica", list(metric_labels), format_func=metric_labels.get)
+with col4:
+    pivot_aggfunc = st.selectbox("Agregação", list(aggfunc_labels), format_func=aggfunc_labels.get)
+with col5:
+    pivot_top = st.slider("Top linhas/colunas", 5, PIVOT_CONFIG['max_top_k'], PIVOT_CONFIG['top_k'])
+
+with span('pivot:build', len(df_filtered)):
+    pivot = get_pivot(snapshot.version, repr(filter_spec), pivot_rows, pivot_columns,
+                      pivot_value, pivot_aggfunc, df_filtered)
+    # Meses: os mais recentes, em ordem cronológica; as demais dimensões: as maiores
+    pivot_view = pivot.truncate(pivot_top, pivot_top)
+    pivot_dense = pivot_view.to_dense(pivot_top, pivot_top)
+
+if pivot_dense.size:
+    fig_pivot = px.imshow(
+        pivot_dense, aspect='auto', color_continuous_scale='Blues',
+        labels={'x': dimension_labels[pivot_columns], 'y': dimension_labels[pivot_rows],
+                'color': f"{metric_labels[pivot_value]} ({aggfunc_labels[pivot_aggfunc]})"}
+    )
+    fig_pivot.update_layout(height=max(400, 22 * len(pivot_dense)))
+    st.plotly_chart(fig_pivot, width='stretch')
+st.caption(f"Tabela completa: {pivot.shape[0]:,} × {pivot.shape[1]:,} — "
+           f"{pivot.nnz:,} células com pedidos ({format_percentage(pivot.density * 100)} preenchida)")
+
 # ── SEGMENTAÇÃO DE CLIENTES (K-MEANS) ─────────────────────────────────────────
 st.markdown("---")
 st.subheader("🎯 Segmentação de Clientes (K-Means)")
-st.caption("Algoritmo K-Means agrupa automaticamente os clientes por comportamento de compra: receita total, número de pedidos e ticket médio.")
+st.caption("Algoritmo K-Means agrupa automaticamente os clientes por comportamento de compra: receita total, número de pedidos e ticket médio (e, opcionalmente, recência e meses ativos).")
 
 # Agregar métricas por cliente
 clientes_agg = df_filtered.groupby('customer').agg(
@@ -496,16 +737,44 @@ clientes_agg = df_filtered.groupby('customer').agg(
 ).reset_index()
 
 if len(clientes_agg) >= 3:
-    n_clusters = st.slider("Número de segmentos (clusters)", min_value=2, max_value=5, value=3,
-                           help="Escolha quantos grupos de clientes deseja identificar")
-
-    # Normalizar e aplicar K-Means
+    features = ['receita_total', 'num_pedidos', 'ticket_medio']
+    if st.checkbox("📅 Incluir recência e meses ativos (RFM) nas features",
+                   help="Acrescenta dias desde a última compra e número de meses com compra"):
+        clientes_agg = clientes_agg.join(
+            rfm[['recency_days', 'active_months']], on='customer')
+        features += ['recency_days', 'active_months']
+
+    # Normalizar features
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(
-        clientes_agg[['receita_total', 'num_pedidos', 'ticket_medio']])
+    X_scaled = scaler.fit_transform(clientes_agg[features])
+
+    auto_k = st.checkbox("🤖 Escolher o número de segmentos automaticamente", value=True,
+                         help="Ajusta o K-Means para vários k em paralelo e pré-seleciona o de maior silhueta")
+    if auto_k:
+        with span('ml:kmeans_sweep', len(X_scaled)):
+            sweep = run_kmeans_sweep(X_scaled)
+        n_clusters = best_k(sweep)
+        if len(sweep) > 1:
+            st.slider("Número de segmentos (clusters)", min_value=int(sweep['k'].min()),
+                      max_value=int(sweep['k'].max()), value=n_clusters, disabled=True,
+                      help="Selecionado pela maior silhueta (amostrada) da varredura")
+        else:
+            # Com poucos clientes só um k é viável (k < número de clientes)
+            st.caption(f"Número de segmentos: {n_clusters} (único valor possível para "
+                       f"{len(X_scaled)} clientes)")
+        labels = sweep.set_index('k').loc[n_clusters, 'labels']
+        clientes_agg['segmento'] = labels.astype(str)
+        with st.expander("📉 Varredura de k (silhueta e inércia)"):
+            st.dataframe(sweep[['k', 'silhouette', 'inertia']].round(3),
+                         hide_index=True, width='stretch')
+    else:
+        n_clusters = st.slider("Número de segmentos (clusters)", min_value=2,
+                               max_value=min(5, len(X_scaled)), value=3,
+                               help="Escolha quantos grupos de clientes deseja identificar")
 
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    clientes_agg['segmento'] = kmeans.fit_predict(X_scaled).astype(str)
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        with span('ml:kmeans', len(X_scaled)):
+            clientes_agg['segmento'] = kmeans.fit_predict(X_scaled).astype(str)
     clientes_agg['segmento'] = 'Segmento ' + \
         (clientes_agg['segmento'].astype(int) + 1).astype(str)
 
@@ -596,6 +865,34 @@ with col3:
         use_container_width=True
     )
 
+# ── PAINEL DE DEPURAÇÃO ──────────────────────────────────────────────────────
+st.sidebar.markdown("---")
+st.sidebar.checkbox("🐞 Painel de depuração (profiling)", key='debug_panel',
+                    help="Mede tempo e linhas de cada etapa desta execução")
+if st.session_state.get('debug_panel'):
+    st.sidebar.checkbox("Medir memória (tracemalloc)", key='debug_memory',
+                        help="Registra a variação de memória de cada etapa. O rastreamento vale para o "
+                             "processo inteiro e deixa todas as sessões mais lentas enquanto estiver ligado")
+if profiler is not None:
+    st.markdown("---")
+    st.subheader("🐞 Profiling desta execução")
+    profile_df = profiler.summary()
+    profile_df['name'] = ['  ' * depth + name for depth,
+                          name in zip(profile_df['depth'], profile_df['name'])]
+    st.dataframe(profile_df.drop(columns='depth'), hide_index=True, width='stretch')
+    if snapshot.build_profile is not None:
+        st.caption(f"Construção do snapshot v{snapshot.version}")
+        st.dataframe(snapshot.build_profile.summary().drop(columns='depth'),
+                     hide_index=True, width='stretch')
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ Baixar JSON", data=profiler.to_json(),
+                           file_name="profile.json", mime="application/json")
+    with col2:
+        st.download_button("⬇️ Baixar Chrome Trace", data=profiler.to_chrome_trace(),
+                           file_name="profile_trace.json", mime="application/json")
+    set_active_profiler(None)
+
 # ── FOOTER ────────────────────────────────────────────────────────────────────
 st.markdown("---")
 st.markdown("""
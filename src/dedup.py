@@ -0,0 +1,214 @@
+"""
+Deduplicação de pedidos por chave para o projeto de Análise de Vendas
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+
+DEDUP_POLICIES = ('first', 'last', 'flag')
+
+
+class OrderDeduplicator:
+    """
+    Deduplica pedidos pela chave declarada (order_id por padrão)
+
+    Apenas a chave é usada para localizar duplicatas; as colunas de comparação
+    (valores numéricos por padrão) geram um hash de conteúdo que distingue
+    reenvios idênticos de versões conflitantes do mesmo pedido. O índice
+    chave -> hash é mantido entre cargas, permitindo deduplicar cargas
+    incrementais contra tudo o que já foi visto; na política flag o índice
+    guarda também todas as versões (chave, conteúdo) já mantidas.
+
+    Políticas de conflito:
+        first: mantém a primeira versão de cada chave
+        last: mantém a versão mais recente (substitui cargas anteriores);
+            reenvio idêntico à versão guardada é descartado
+        flag: descarta cópias de qualquer versão já vista e marca as
+            versões conflitantes
+    """
+
+    def __init__(self, key: str = 'order_id', policy: str = 'first',
+                 compare_columns: Optional[List[str]] = None):
+        if policy not in DEDUP_POLICIES:
+            raise ValueError(
+                f"Política de deduplicação inválida: {policy} (use {', '.join(DEDUP_POLICIES)})")
+
+        self.key = key
+        self.policy = policy
+        self.compare_columns = compare_columns
+        self.last_stats: Dict = {}
+        self._keys = pd.Index([])
+        self._hashes = np.empty(0, dtype=np.uint64)
+        # Versões distintas por chave e hashes dos pares (chave, conteúdo) já mantidos
+        self._counts = np.empty(0, dtype=np.int64)
+        self._versions = np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def resolve(self, df: pd.DataFrame, valid: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, Dict]:
+        """
+        Decide quais linhas manter e atualiza o índice de hashes
+
+        Args:
+            df (pd.DataFrame): Lote de pedidos
+            valid (Optional[np.ndarray]): Máscara das linhas elegíveis; as
+                demais são ignoradas e nunca entram no índice. Linhas com
+                chave nula são sempre descartadas (contadas em null_keys)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, Dict]: Máscara de linhas mantidas,
+                máscara de linhas em conflito e contagens da deduplicação
+        """
+        n_total = len(df)
+        rows = np.arange(n_total) if valid is None else np.flatnonzero(valid)
+        # Sem chave não há como deduplicar: a linha é descartada e nunca entra no índice
+        null_keys = pd.isna(df[self.key].array[rows])
+        n_null = int(null_keys.sum())
+        rows = rows[~null_keys]
+        n = len(rows)
+
+        # Hash apenas da chave: códigos por pedido e posição no índice persistente
+        codes, uniques = pd.factorize(df[self.key].array[rows])
+        hashes = self._content_hash(df, rows)
+        if len(self._keys):
+            stored_pos = self._keys.get_indexer(uniques)
+        else:
+            stored_pos = np.full(len(uniques), -1, dtype=np.intp)
+        seen = stored_pos >= 0
+        stored = np.zeros(len(uniques), dtype=np.uint64)
+        stored[seen] = self._hashes[stored_pos[seen]]
+        stored_counts = np.zeros(len(uniques), dtype=np.int64)
+        stored_counts[seen] = self._counts[stored_pos[seen]]
+
+        positions = np.arange(n)
+        first_idx = np.empty(len(uniques), dtype=np.intp)
+        first_idx[codes[::-1]] = positions[::-1]
+        last_idx = np.empty(len(uniques), dtype=np.intp)
+        last_idx[codes] = positions
+
+        superseded = 0
+        new_versions = None
+        if self.policy == 'first':
+            ref = np.where(seen, stored, hashes[first_idx])
+            keep = (positions == first_idx[codes]) & ~seen[codes]
+            conflict = hashes != ref[codes]
+            new_hashes = ref
+            new_counts = np.maximum(stored_counts, 1)
+        elif self.policy == 'last':
+            ref = hashes[last_idx]
+            changed = seen & (stored != ref)
+            # Reenvio idêntico à versão já guardada não volta para o lote
+            keep = (positions == last_idx[codes]) & ~(seen & ~changed)[codes]
+            superseded = int(changed.sum())
+            conflict = (hashes != ref[codes]) | changed[codes]
+            new_hashes = ref
+            new_counts = np.maximum(stored_counts, 1)
+        else:
+            # Mantém cada versão distinta (chave, conteúdo) uma única vez, entre cargas
+            pair_hashes = pd.util.hash_pandas_object(
+                pd.DataFrame({'key': uniques.take(codes), 'hash': hashes}), index=False).to_numpy()
+            known = np.isin(pair_hashes, self._versions) | (seen[codes] & (hashes == stored[codes]))
+            keep = ~pd.Series(pair_hashes).duplicated().to_numpy() & ~known
+            new_counts = np.bincount(codes[keep], minlength=len(uniques)) + np.maximum(stored_counts, seen)
+            conflict = new_counts[codes] > 1
+            new_hashes = np.where(seen, stored, hashes[first_idx])
+            new_versions = pair_hashes[keep]
+
+        self._update_index(uniques, stored_pos, new_hashes, new_counts, new_versions)
+
+        keep_mask = np.zeros(n_total, dtype=bool)
+        keep_mask[rows[keep]] = True
+        conflict_mask = np.zeros(n_total, dtype=bool)
+        conflict_mask[rows[conflict]] = True
+
+        self.last_stats = {
+            'rows_in': n + n_null,
+            'rows_out': int(keep.sum()),
+            'dropped': int(n + n_null - keep.sum()),
+            'null_keys': n_null,
+            'conflicts': int(conflict.sum()),
+            'superseded': superseded,
+            'index_size': len(self._keys)
+        }
+        return keep_mask, conflict_mask, self.last_stats
+
+    def deduplicate(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Remove duplicatas de um lote segundo a política configurada
+
+        Args:
+            df (pd.DataFrame): Lote de pedidos
+
+        Returns:
+            Tuple[pd.DataFrame, Dict]: Pedidos mantidos (com a coluna
+                dedup_conflict na política flag) e contagens da deduplicação
+        """
+        keep, conflict, stats = self.resolve(df)
+        df_dedup = df[keep]
+        if self.policy == 'flag':
+            df_dedup = df_dedup.assign(dedup_conflict=conflict[keep])
+        return df_dedup, stats
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Persiste o índice chave -> hash (e as versões vistas) em disco
+
+        Args:
+            path (Union[str, Path]): Arquivo de destino
+        """
+        pd.to_pickle({
+            'hashes': pd.Series(self._hashes, index=self._keys, name=self.key),
+            'counts': self._counts,
+            'versions': self._versions
+        }, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], policy: str = 'first',
+             compare_columns: Optional[List[str]] = None) -> 'OrderDeduplicator':
+        """
+        Recria um deduplicador a partir de um índice salvo
+
+        Args:
+            path (Union[str, Path]): Arquivo gerado por save
+            policy (str): Política de conflito
+            compare_columns (Optional[List[str]]): Colunas de comparação
+
+        Returns:
+            OrderDeduplicator: Deduplicador com o índice carregado
+        """
+        saved = pd.read_pickle(path)
+        # Índices antigos guardavam apenas a Series chave -> hash
+        if isinstance(saved, pd.Series):
+            saved = {'hashes': saved}
+        index = saved['hashes']
+        deduplicator = cls(index.name, policy, compare_columns)
+        deduplicator._keys = index.index
+        deduplicator._hashes = index.to_numpy(dtype=np.uint64, copy=True)
+        deduplicator._counts = np.asarray(saved.get('counts', np.ones(len(index), dtype=np.int64)))
+        deduplicator._versions = np.asarray(saved.get('versions', np.empty(0, dtype=np.uint64)))
+        return deduplicator
+
+    def _content_hash(self, df: pd.DataFrame, rows: np.ndarray) -> np.ndarray:
+        """Hash das colunas de comparação para as linhas selecionadas."""
+        columns = self.compare_columns or [
+            col for col in df.columns if col != self.key]
+        content = df[columns].take(rows)
+        return pd.util.hash_pandas_object(content, index=False).to_numpy()
+
+    def _update_index(self, uniques, stored_pos: np.ndarray, hashes: np.ndarray,
+                      counts: np.ndarray, versions: Optional[np.ndarray] = None) -> None:
+        """Atualiza hashes de chaves conhecidas, acrescenta as novas e registra versões."""
+        seen = stored_pos >= 0
+        self._hashes[stored_pos[seen]] = hashes[seen]
+        self._counts[stored_pos[seen]] = counts[seen]
+        if (~seen).any():
+            new_keys = pd.Index(uniques[~seen])
+            self._keys = self._keys.append(new_keys) if len(self._keys) else new_keys
+            self._hashes = np.concatenate([self._hashes, hashes[~seen]])
+            self._counts = np.concatenate([self._counts, counts[~seen]])
+        if versions is not None and len(versions):
+            self._versions = np.union1d(self._versions, versions)
@@ -0,0 +1,134 @@
+"""
+Cache hierárquico de agregações para drill-down no projeto de Análise de Vendas
+"""
+
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+
+# Filho -> pai de cada hierarquia navegável
+HIERARCHIES = {'product': 'category', 'customer': 'region'}
+
+DRILLDOWN_METRICS = ('revenue', 'profit', 'quantity')
+
+
+class _Level(NamedTuple):
+    """Totais dos filhos agrupados por pai, em ordem decrescente dentro de cada pai."""
+    parent: str
+    parents: pd.Index
+    indptr: np.ndarray
+    children: Dict[str, pd.Index]
+    values: Dict[str, np.ndarray]
+
+
+class DrillDownIndex:
+    """
+    Totais por pai e filho pré-ordenados (categoria → produto, região → cliente)
+
+    Construído uma vez por estado de filtro. Para cada hierarquia e métrica,
+    os filhos ficam em blocos contíguos por pai (indptr, como numa matriz
+    CSR), já ordenados do maior para o menor total; detalhar um pai ou pegar
+    o top-N dentro dele é um fatiamento, sem novo groupby sobre os pedidos.
+    """
+
+    def __init__(self, levels: Dict[str, _Level]):
+        self.levels = levels
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, hierarchies: Optional[Dict[str, str]] = None,
+              metrics: Iterable[str] = DRILLDOWN_METRICS) -> 'DrillDownIndex':
+        """
+        Agrega os pedidos por pai e filho e ordena os filhos de cada pai
+
+        Args:
+            df (pd.DataFrame): DataFrame preparado (já filtrado)
+            hierarchies (Optional[Dict[str, str]]): Mapeamento filho -> pai
+                (padrão: HIERARCHIES)
+            metrics (Iterable[str]): Métricas somadas
+
+        Returns:
+            DrillDownIndex: Cache das hierarquias
+        """
+        metrics = list(metrics)
+        levels = {}
+        for child, parent in (hierarchies or HIERARCHIES).items():
+            grouped = df.groupby([parent, child], observed=True)[metrics].sum()
+            parent_codes, parents = pd.factorize(grouped.index.get_level_values(0), sort=True)
+            counts = np.bincount(parent_codes, minlength=len(parents))
+            indptr = np.concatenate([[0], np.cumsum(counts)])
+            child_labels = grouped.index.get_level_values(1)
+
+            children, values = {}, {}
+            for metric in metrics:
+                totals = grouped[metric].to_numpy()
+                # Pai crescente e, dentro dele, total decrescente (empates em ordem alfabética)
+                order = np.lexsort((-totals, parent_codes))
+                children[metric] = pd.Index(child_labels[order], name=child)
+                values[metric] = totals[order]
+            levels[child] = _Level(parent, pd.Index(parents, name=parent), indptr, children, values)
+        return cls(levels)
+
+    def supports(self, column: str, metric: str) -> bool:
+        """
+        Indica se o cache responde pelo par coluna/métrica
+
+        Args:
+            column (str): Coluna filha (ex.: 'product')
+            metric (str): Métrica
+
+        Returns:
+            bool: True se a hierarquia e a métrica foram pré-agregadas
+        """
+        return column in self.levels and metric in self.levels[column].values
+
+    def parent_of(self, column: str) -> str:
+        """
+        Coluna pai de uma coluna filha
+
+        Args:
+            column (str): Coluna filha
+
+        Returns:
+            str: Coluna pai
+        """
+        return self.levels[column].parent
+
+    def top(self, column: str, parent_value: Any, metric: str = 'revenue',
+            top_n: Optional[int] = 10) -> pd.Series:
+        """
+        Maiores filhos dentro de um pai
+
+        Args:
+            column (str): Coluna filha (ex.: 'product')
+            parent_value (Any): Valor do pai (ex.: uma categoria)
+            metric (str): Métrica de ordenação
+            top_n (Optional[int]): Número de itens (None = todos)
+
+        Returns:
+            pd.Series: Totais por filho em ordem decrescente
+        """
+        level = self.levels[column]
+        position = level.parents.get_indexer([parent_value])[0]
+        if position < 0:
+            start = stop = 0
+        else:
+            start, stop = level.indptr[position], level.indptr[position + 1]
+        if top_n is not None:
+            stop = min(stop, start + top_n)
+        return pd.Series(level.values[metric][start:stop],
+                         index=level.children[metric][start:stop], name=metric)
+
+    def parent_totals(self, column: str, metric: str = 'revenue') -> pd.Series:
+        """
+        Totais de cada pai, somando seus filhos
+
+        Args:
+            column (str): Coluna filha da hierarquia
+            metric (str): Métrica
+
+        Returns:
+            pd.Series: Total por pai em ordem decrescente
+        """
+        level = self.levels[column]
+        totals = np.add.reduceat(level.values[metric], level.indptr[:-1]) if len(level.parents) else []
+        return pd.Series(totals, index=level.parents, name=metric, dtype=float).sort_values(ascending=False)
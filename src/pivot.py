@@ -0,0 +1,230 @@
+"""
+Tabelas dinâmicas esparsas para o projeto de Análise de Vendas
+"""
+
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+AGGFUNCS = ('sum', 'count', 'mean')
+
+# Dimensão derivada de order_date (ano e mês)
+YEAR_MONTH = 'year_month'
+
+OTHERS_LABEL = 'Outros'
+
+
+def dimension_codes(df: pd.DataFrame, name: str) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Códigos inteiros e rótulos de uma dimensão
+
+    Colunas categóricas usam os próprios códigos; as demais são fatoradas
+    (rótulos em ordem). 'year_month' é derivada de order_date.
+
+    Args:
+        df (pd.DataFrame): DataFrame preparado
+        name (str): Coluna ou 'year_month'
+
+    Returns:
+        Tuple[np.ndarray, pd.Index]: Código por linha (-1 para ausentes) e rótulos
+    """
+    if name == YEAR_MONTH:
+        dates = df['order_date']
+        months = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+        if not len(months):
+            return np.empty(0, dtype=np.intp), pd.Index([], name=name)
+        first = int(months.min())
+        labels = pd.period_range(pd.Period(year=first // 12, month=first % 12 + 1, freq='M'),
+                                 periods=int(months.max()) - first + 1, freq='M')
+        return months - first, pd.Index(labels.astype(str), name=name)
+
+    column = df[name]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), pd.Index(column.cat.categories, name=name)
+    codes, labels = pd.factorize(column, sort=True)
+    return codes, pd.Index(labels, name=name)
+
+
+class SparsePivot:
+    """
+    Tabela dinâmica linha × coluna guardada como matriz esparsa (CSR)
+
+    Somas e contagens ficam em duas matrizes com as mesmas células ativas;
+    sum, count e mean são derivadas delas. Pares de alta cardinalidade
+    (cliente × produto) ocupam memória proporcional às células com pedidos,
+    e só a parte exibida é convertida em DataFrame denso (to_dense).
+    """
+
+    def __init__(self, sums: sparse.csr_matrix, counts: sparse.csr_matrix, rows: pd.Index,
+                 columns: pd.Index, value: str, aggfunc: str = 'sum'):
+        if aggfunc not in AGGFUNCS:
+            raise ValueError(f"Agregação inválida: {aggfunc}")
+        self.sums = sums
+        self.counts = counts
+        self.rows = rows
+        self.columns = columns
+        self.value = value
+        self.aggfunc = aggfunc
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, index: str, columns: str, value: str = 'revenue',
+              aggfunc: str = 'sum') -> 'SparsePivot':
+        """
+        Agrega uma métrica por par de dimensões em uma passada sobre os códigos
+
+        Args:
+            df (pd.DataFrame): DataFrame preparado
+            index (str): Dimensão das linhas (coluna ou 'year_month')
+            columns (str): Dimensão das colunas (coluna ou 'year_month')
+            value (str): Métrica agregada
+            aggfunc (str): 'sum', 'count' ou 'mean'
+
+        Returns:
+            SparsePivot: Tabela dinâmica esparsa
+        """
+        row_codes, row_labels = dimension_codes(df, index)
+        col_codes, col_labels = dimension_codes(df, columns)
+        values = df[value].to_numpy(dtype=float)
+        # Linhas com dimensão ausente não entram na tabela
+        present = (row_codes >= 0) & (col_codes >= 0)
+        coords = (row_codes[present], col_codes[present])
+        shape = (len(row_labels), len(col_labels))
+
+        sums = sparse.coo_matrix((values[present], coords), shape=shape).tocsr()
+        counts = sparse.coo_matrix((np.ones(int(present.sum())), coords), shape=shape).tocsr()
+        return cls(sums, counts, row_labels, col_labels, value, aggfunc)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.sums.shape
+
+    @property
+    def nnz(self) -> int:
+        """Células com ao menos um pedido."""
+        return self.counts.nnz
+
+    @property
+    def density(self) -> float:
+        """Fração de células com pedidos."""
+        size = self.shape[0] * self.shape[1]
+        return self.nnz / size if size else 0.0
+
+    def _aggregate(self, sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Aplica a agregação a somas e contagens já combinadas."""
+        if self.aggfunc == 'sum':
+            return sums
+        if self.aggfunc == 'count':
+            return counts
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
+
+    def _totals(self, axis: int) -> np.ndarray:
+        return self._aggregate(np.asarray(self.sums.sum(axis=axis)).ravel(),
+                               np.asarray(self.counts.sum(axis=axis)).ravel())
+
+    def row_totals(self) -> pd.Series:
+        """
+        Total de cada linha (média da linha para 'mean')
+
+        Returns:
+            pd.Series: Totais indexados pelos rótulos das linhas
+        """
+        return pd.Series(self._totals(1), index=self.rows, name=self.value)
+
+    def column_totals(self) -> pd.Series:
+        """
+        Total de cada coluna (média da coluna para 'mean')
+
+        Returns:
+            pd.Series: Totais indexados pelos rótulos das colunas
+        """
+        return pd.Series(self._totals(0), index=self.columns, name=self.value)
+
+    def truncate(self, top_rows: Optional[int] = None, top_cols: Optional[int] = None,
+                 others: bool = False) -> 'SparsePivot':
+        """
+        Mantém as maiores linhas e/ou colunas, em ordem decrescente de total
+
+        A dimensão 'year_month' mantém os meses mais recentes, em ordem
+        cronológica.
+
+        Args:
+            top_rows (Optional[int]): Linhas mantidas (None = todas, na ordem original)
+            top_cols (Optional[int]): Colunas mantidas (None = todas, na ordem original)
+            others (bool): Acrescenta a linha/coluna 'Outros' com o restante
+
+        Returns:
+            SparsePivot: Nova tabela truncada
+        """
+        row_order = _ranking(self._totals(1), top_rows, self.rows.name == YEAR_MONTH)
+        col_order = _ranking(self._totals(0), top_cols, self.columns.name == YEAR_MONTH)
+
+        sums, counts, rows = _take_rows(self.sums, self.counts, self.rows, row_order, others)
+        sums, counts, columns = _take_rows(sums.T.tocsr(), counts.T.tocsr(), self.columns,
+                                           col_order, others)
+        return SparsePivot(sums.T.tocsr(), counts.T.tocsr(), rows, columns, self.value, self.aggfunc)
+
+    def to_dense(self, max_rows: int = 50, max_cols: int = 50) -> pd.DataFrame:
+        """
+        Converte apenas a parte exibida (primeiras linhas e colunas) em DataFrame
+
+        Args:
+            max_rows (int): Linhas convertidas
+            max_cols (int): Colunas convertidas
+
+        Returns:
+            pd.DataFrame: Tabela densa (0 nas células vazias; NaN para 'mean')
+        """
+        sums = self.sums[:max_rows, :max_cols].toarray()
+        counts = self.counts[:max_rows, :max_cols].toarray()
+        values = self._aggregate(sums, counts)
+        if self.aggfunc == 'mean':
+            values = np.where(counts > 0, values, np.nan)
+        return pd.DataFrame(values, index=self.rows[:max_rows], columns=self.columns[:max_cols])
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Células com pedidos em formato longo
+
+        Returns:
+            pd.DataFrame: Uma linha por célula ativa com as duas dimensões e o valor
+        """
+        # As células ativas são as de counts; somas podem ser exatamente zero
+        counts = self.counts.tocoo()
+        sums = np.asarray(self.sums[counts.row, counts.col]).ravel()
+        return pd.DataFrame({
+            self.rows.name or 'row': self.rows[counts.row],
+            self.columns.name or 'column': self.columns[counts.col],
+            self.value: self._aggregate(sums, counts.data)
+        })
+
+
+def _ranking(totals: np.ndarray, top: Optional[int], chronological: bool = False) -> np.ndarray:
+    """Posições das top maiores em ordem decrescente (NaN por último), ou das top últimas se
+    chronological; todas se top é None."""
+    if top is None:
+        return np.arange(len(totals))
+    if chronological:
+        return np.arange(max(len(totals) - top, 0), len(totals))
+    return np.argsort(-np.nan_to_num(totals, nan=-np.inf), kind='stable')[:top]
+
+
+def _take_rows(sums: sparse.csr_matrix, counts: sparse.csr_matrix, labels: pd.Index,
+               order: np.ndarray, others: bool) -> Tuple[sparse.csr_matrix, sparse.csr_matrix, pd.Index]:
+    """Seleciona linhas na ordem dada e, opcionalmente, soma as demais em 'Outros'."""
+    taken_sums, taken_counts, taken_labels = sums[order], counts[order], labels[order]
+    rest = np.setdiff1d(np.arange(sums.shape[0]), order, assume_unique=True)
+    if others and len(rest):
+        bucket_counts = np.asarray(counts[rest].sum(axis=0)).ravel()
+        bucket_sums = np.asarray(sums[rest].sum(axis=0)).ravel()
+        # Mesmas células ativas nas duas matrizes, mesmo com soma zero (lucros que se anulam)
+        active = np.flatnonzero(bucket_counts)
+        coords = (np.zeros(len(active), dtype=np.intp), active)
+        shape = (1, len(bucket_counts))
+        taken_sums = sparse.vstack(
+            [taken_sums, sparse.csr_matrix((bucket_sums[active], coords), shape=shape)], format='csr')
+        taken_counts = sparse.vstack(
+            [taken_counts, sparse.csr_matrix((bucket_counts[active], coords), shape=shape)], format='csr')
+        taken_labels = taken_labels.append(pd.Index([OTHERS_LABEL], name=labels.name))
+    return taken_sums, taken_counts, taken_labels
@@ -0,0 +1,251 @@
+"""
+Instrumentação leve dos pontos críticos do projeto de Análise de Vendas
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+import pandas as pd
+
+
+_active: ContextVar[Optional['Profiler']] = ContextVar('active_profiler', default=None)
+
+# tracemalloc vale para o processo inteiro: quem liga conta os usuários e só
+# desliga quando o último sai (e nunca desliga um rastreamento alheio)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def start_memory_tracing() -> None:
+    """
+    Registra um usuário do tracemalloc, ligando-o se necessário
+
+    O rastreamento deixa todas as alocações do processo mais lentas (todas
+    as sessões e threads, não só quem pediu); cada chamada deve ter um
+    stop_memory_tracing correspondente.
+    """
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def stop_memory_tracing() -> None:
+    """Libera um usuário do tracemalloc; o último desliga o que foi ligado aqui."""
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users = max(_tracing_users - 1, 0)
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+class Profiler:
+    """
+    Coleta spans (etapa, tempo, linhas de entrada/saída e memória) de uma execução
+
+    Só registra enquanto estiver ativo no contexto atual (ver profiling e
+    set_active_profiler); sem profiler ativo, span e instrument custam apenas
+    uma leitura de ContextVar.
+    """
+
+    def __init__(self, track_memory: bool = False):
+        self.track_memory = track_memory
+        self.spans: List[Dict] = []
+        self._origin = time.perf_counter()
+        self._depth = 0
+        self._release = None
+        if track_memory:
+            start_memory_tracing()
+            # Execuções interrompidas sem close liberam o rastreamento na coleta do profiler
+            self._release = weakref.finalize(self, stop_memory_tracing)
+
+    def close(self) -> None:
+        """Libera o rastreamento de memória registrado por este profiler (uma única vez)."""
+        if self._release is not None:
+            self._release()
+
+    @contextmanager
+    def span(self, name: str, rows_in: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Mede uma etapa; o registro retornado aceita rows_out e outros campos
+
+        Args:
+            name (str): Nome da etapa
+            rows_in (Optional[int]): Linhas de entrada
+
+        Yields:
+            Dict: Registro da etapa
+        """
+        record = {'name': name, 'rows_in': rows_in, 'rows_out': None, 'depth': self._depth,
+                  'thread': threading.get_ident()}
+        memory_before = tracemalloc.get_traced_memory()[0] if self._tracing() else None
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield record
+        finally:
+            self._depth -= 1
+            record['start'] = start - self._origin
+            record['seconds'] = time.perf_counter() - start
+            record['memory_delta'] = (tracemalloc.get_traced_memory()[0] - memory_before
+                                      if memory_before is not None and self._tracing() else None)
+            self.spans.append(record)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Tabela das etapas registradas, na ordem de início
+
+        Returns:
+            pd.DataFrame: Uma linha por span
+        """
+        columns = ['name', 'depth', 'start', 'seconds', 'rows_in', 'rows_out', 'memory_delta']
+        if not self.spans:
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame(self.spans)[columns].sort_values('start').reset_index(drop=True)
+
+    def to_json(self) -> str:
+        """
+        Exporta os spans como JSON
+
+        Returns:
+            str: Documento JSON com a lista de spans
+        """
+        return json.dumps({'spans': sorted(self.spans, key=lambda s: s['start'])},
+                          default=_json_default, ensure_ascii=False, indent=2)
+
+    def to_chrome_trace(self) -> str:
+        """
+        Exporta os spans no formato Chrome Trace (chrome://tracing, Perfetto)
+
+        Returns:
+            str: Documento JSON com traceEvents do tipo "X"
+        """
+        pid = os.getpid()
+        events = [{
+            'name': span['name'],
+            'ph': 'X',
+            'ts': span['start'] * 1e6,
+            'dur': span['seconds'] * 1e6,
+            'pid': pid,
+            'tid': span['thread'],
+            'args': {key: span[key] for key in ('rows_in', 'rows_out', 'memory_delta')
+                     if span[key] is not None}
+        } for span in self.spans]
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, default=_json_default)
+
+    def _tracing(self) -> bool:
+        return self.track_memory and tracemalloc.is_tracing()
+
+
+def _json_default(value):
+    """Converte escalares NumPy para tipos nativos na serialização."""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def get_active_profiler() -> Optional[Profiler]:
+    """Retorna o profiler ativo no contexto atual, se houver."""
+    return _active.get()
+
+
+def set_active_profiler(profiler: Optional[Profiler]) -> None:
+    """
+    Ativa (ou desativa, com None) o profiler no contexto atual
+
+    Útil em scripts lineares, como o dashboard, onde um bloco with não
+    envolve a execução inteira. O profiler substituído é encerrado.
+
+    Args:
+        profiler (Optional[Profiler]): Profiler a ativar
+    """
+    previous = _active.get()
+    if previous is not None and previous is not profiler:
+        previous.close()
+    _active.set(profiler)
+
+
+@contextmanager
+def profiling(track_memory: bool = False) -> Iterator[Profiler]:
+    """
+    Ativa um novo profiler durante o bloco
+
+    Args:
+        track_memory (bool): Registra a variação de memória de cada span
+            (liga o tracemalloc, que afeta o processo inteiro)
+
+    Yields:
+        Profiler: Profiler ativo
+    """
+    profiler = Profiler(track_memory)
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+        profiler.close()
+
+
+@contextmanager
+def span(name: str, rows_in: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Mede uma etapa no profiler ativo; sem profiler, não registra nada
+
+    Args:
+        name (str): Nome da etapa
+        rows_in (Optional[int]): Linhas de entrada
+
+    Yields:
+        Dict: Registro da etapa (aceita rows_out)
+    """
+    profiler = _active.get()
+    if profiler is None:
+        yield {}
+        return
+    with profiler.span(name, rows_in) as record:
+        yield record
+
+
+def _rows(value) -> Optional[int]:
+    """Número de linhas de DataFrames e Series; None para outros valores."""
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+def instrument(name: Optional[str] = None) -> Callable:
+    """
+    Decorador que mede cada chamada da função como um span
+
+    Linhas de entrada e saída são registradas quando o primeiro argumento e
+    o retorno são DataFrames ou Series.
+
+    Args:
+        name (Optional[str]): Nome do span (padrão: nome da função)
+
+    Returns:
+        Callable: Decorador
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active.get()
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.span(span_name, _rows(args[0]) if args else None) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = _rows(result)
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,160 @@
+"""
+Atualização de dados em segundo plano para o projeto de Análise de Vendas
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+import pandas as pd
+from profiling import Profiler, profiling, span
+
+
+class DatasetSnapshot(NamedTuple):
+    """Versão imutável do dataset preparado e das estruturas derivadas."""
+    version: int
+    data: pd.DataFrame
+    derived: Dict[str, Any]
+    built_at: float
+    source_mtime: Optional[float]
+    build_profile: Optional[Profiler] = None
+
+
+class DataRefresher:
+    """
+    Reconstrói o dataset preparado fora do caminho das requisições
+
+    Uma thread de trabalho recarrega os dados a cada intervalo (ou quando
+    solicitado), reconstrói as estruturas derivadas e só então troca o
+    snapshot publicado, de forma atômica e com número de versão. Leitores
+    continuam usando o snapshot anterior até a troca; uma falha na
+    reconstrução mantém a versão atual e fica registrada em last_error.
+    """
+
+    def __init__(self, loader: Callable[[], pd.DataFrame],
+                 builders: Optional[Dict[str, Callable[[pd.DataFrame], Any]]] = None,
+                 interval: float = 300, source: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            loader (Callable[[], pd.DataFrame]): Carrega e prepara os dados
+            builders (Optional[Dict[str, Callable]]): Estruturas derivadas,
+                construídas a partir do DataFrame carregado
+            interval (float): Segundos entre atualizações (0 desativa a thread)
+            source (Optional[Union[str, Path]]): Arquivo de origem; se
+                informado, a atualização periódica só recarrega quando ele muda
+        """
+        self.loader = loader
+        self.builders = builders or {}
+        self.interval = interval
+        self.source = Path(source) if source is not None else None
+        self.last_error: Optional[Exception] = None
+
+        self._snapshot: Optional[DatasetSnapshot] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._force = False
+        self._thread: Optional[threading.Thread] = None
+        self._oneoff: Optional[threading.Thread] = None
+
+    def start(self) -> 'DataRefresher':
+        """
+        Publica o primeiro snapshot e inicia a thread de atualização
+
+        Returns:
+            DataRefresher: A própria instância
+        """
+        if self._snapshot is None:
+            self._rebuild()
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='data-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Encerra a thread de atualização."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def current(self) -> DatasetSnapshot:
+        """
+        Retorna o snapshot publicado mais recente
+
+        Returns:
+            DatasetSnapshot: Snapshot atual (nunca bloqueia por reconstrução)
+        """
+        if self._snapshot is None:
+            raise RuntimeError("DataRefresher ainda não foi iniciado")
+        return self._snapshot
+
+    def refresh_now(self, wait: bool = False) -> DatasetSnapshot:
+        """
+        Solicita uma reconstrução imediata, mesmo sem mudança na origem
+
+        Sem a thread periódica (interval=0), a reconstrução roda numa thread
+        avulsa; pedidos feitos enquanto ela ainda roda são absorvidos por ela.
+
+        Args:
+            wait (bool): Se True, reconstrói na thread atual e aguarda
+
+        Returns:
+            DatasetSnapshot: Snapshot publicado ao retornar
+        """
+        if wait:
+            self._rebuild()
+        elif self._thread is not None:
+            self._force = True
+            self._wake.set()
+        elif self._oneoff is None or not self._oneoff.is_alive():
+            self._oneoff = threading.Thread(
+                target=self._rebuild, name='data-refresher-once', daemon=True)
+            self._oneoff.start()
+        return self.current()
+
+    def _run(self) -> None:
+        """Laço da thread: espera o intervalo ou um pedido e reconstrói."""
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            force, self._force = self._force, False
+            if force or self._source_changed():
+                self._rebuild()
+
+    def _source_changed(self) -> bool:
+        """Indica se o arquivo de origem mudou desde o snapshot atual."""
+        if self.source is None or self._snapshot is None:
+            return True
+        try:
+            return os.stat(self.source).st_mtime != self._snapshot.source_mtime
+        except OSError:
+            return False
+
+    def _rebuild(self) -> None:
+        """Carrega, deriva e publica um novo snapshot."""
+        # Serializa reconstruções; leitores nunca esperam por este lock
+        with self._lock:
+            try:
+                mtime = os.stat(self.source).st_mtime if self.source is not None else None
+                with profiling() as profiler:
+                    data = self.loader()
+                    derived = {}
+                    for name, build in self.builders.items():
+                        with span(f"build:{name}", len(data)):
+                            derived[name] = build(data)
+            except Exception as e:
+                self.last_error = e
+                if self._snapshot is None:
+                    raise
+                return
+
+            version = self._snapshot.version + 1 if self._snapshot is not None else 1
+            self._snapshot = DatasetSnapshot(
+                version, data, derived, time.time(), mtime, profiler)
+            self.last_error = None
@@ -0,0 +1,179 @@
+"""
+Amostragem estratificada para exploração aproximada no projeto de Análise de Vendas
+"""
+
+from statistics import NormalDist
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+
+class StratifiedSample:
+    """
+    Amostra estratificada por região × categoria × mês mantida em memória
+
+    Cada estrato h com N_h pedidos contribui com n_h linhas sorteadas sem
+    reposição. Totais de qualquer fatia filtrada são estimados por expansão
+    (N_h / n_h) e acompanhados de intervalos de confiança da amostragem
+    estratificada, com correção de população finita.
+    """
+
+    def __init__(self, frame: pd.DataFrame, strata: np.ndarray, population: np.ndarray,
+                 sizes: np.ndarray, confidence: float = 0.95):
+        self.frame = frame
+        self.strata = strata
+        self.population = population
+        self.sizes = sizes
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, fraction: float = 0.02, min_per_stratum: int = 30,
+              max_rows: Optional[int] = None, confidence: float = 0.95,
+              random_state: int = 42) -> 'StratifiedSample':
+        """
+        Sorteia a amostra estratificada
+
+        Args:
+            df (pd.DataFrame): DataFrame preparado
+            fraction (float): Fração sorteada em cada estrato
+            min_per_stratum (int): Mínimo por estrato (ou o estrato inteiro)
+            max_rows (Optional[int]): Limite aproximado do tamanho da amostra
+            confidence (float): Nível de confiança dos intervalos
+            random_state (int): Semente do sorteio
+
+        Returns:
+            StratifiedSample: Amostra com os pesos de expansão por estrato
+        """
+        months = (df['order_date'].dt.year * 12 + df['order_date'].dt.month).to_numpy()
+        dim_codes = [pd.factorize(column)[0] for column in (df['region'], df['category'], months)]
+        sizes = [codes.max() + 1 if len(codes) else 1 for codes in dim_codes]
+        cells = np.ravel_multi_index(dim_codes, sizes) if len(df) else np.empty(0, dtype=np.intp)
+        _, strata = np.unique(cells, return_inverse=True)
+
+        population = np.bincount(strata)
+        if max_rows is not None and fraction * len(df) > max_rows:
+            fraction = max_rows / len(df)
+        sample_sizes = np.minimum(
+            population, np.maximum(np.ceil(population * fraction), min_per_stratum)).astype(np.int64)
+
+        # Ordem aleatória dentro de cada estrato; mantém as n_h primeiras
+        rng = np.random.default_rng(random_state)
+        order = np.lexsort((rng.random(len(df)), strata))
+        starts = np.r_[0, np.cumsum(population)[:-1]]
+        rank = np.arange(len(df)) - starts[strata[order]]
+        chosen = np.sort(order[rank < sample_sizes[strata[order]]])
+
+        return cls(df.iloc[chosen], strata[chosen], population, sample_sizes, confidence)
+
+    def estimate_total(self, values: np.ndarray, mask: np.ndarray) -> Tuple[float, float]:
+        """
+        Estima o total de values na fatia indicada por mask
+
+        Args:
+            values (np.ndarray): Valor por linha da amostra
+            mask (np.ndarray): Pertencimento de cada linha da amostra à fatia
+
+        Returns:
+            Tuple[float, float]: Total estimado e meia-largura do intervalo
+        """
+        z = np.where(mask, values, 0.0)
+        total, variance = self._expand(z)
+        return total, self.z * np.sqrt(variance)
+
+    def estimate_ratio(self, numerator: np.ndarray, denominator: np.ndarray,
+                       mask: np.ndarray) -> Tuple[float, float]:
+        """
+        Estima a razão entre dois totais da fatia (linearização de Taylor)
+
+        Args:
+            numerator (np.ndarray): Valores do numerador por linha
+            denominator (np.ndarray): Valores do denominador por linha
+            mask (np.ndarray): Pertencimento de cada linha à fatia
+
+        Returns:
+            Tuple[float, float]: Razão estimada e meia-largura do intervalo
+        """
+        num, _ = self._expand(np.where(mask, numerator, 0.0))
+        den, _ = self._expand(np.where(mask, denominator, 0.0))
+        if den == 0:
+            return np.nan, np.nan
+        ratio = num / den
+        _, variance = self._expand(np.where(mask, numerator - ratio * denominator, 0.0))
+        return ratio, self.z * np.sqrt(variance) / abs(den)
+
+    def estimate_group_totals(self, column: str, metrics: Sequence[str],
+                              mask: np.ndarray) -> pd.DataFrame:
+        """
+        Estima totais por grupo na fatia (receita por categoria, por região...)
+
+        Args:
+            column (str): Coluna de agrupamento
+            metrics (Sequence[str]): Métricas somadas; 'orders' conta pedidos
+            mask (np.ndarray): Pertencimento de cada linha à fatia
+
+        Returns:
+            pd.DataFrame: Totais estimados por grupo, ordenados pela primeira métrica
+        """
+        weights = self.population / self.sizes
+        row_weights = weights[self.strata][mask]
+        groups = self.frame[column].to_numpy()[mask]
+        totals = {}
+        for metric in metrics:
+            values = 1.0 if metric == 'orders' else self.frame[metric].to_numpy()[mask]
+            totals[metric] = row_weights * values
+        result = pd.DataFrame(totals).groupby(groups).sum()
+        result.index.name = column
+        return result.sort_values(list(metrics)[0], ascending=False)
+
+    def _expand(self, z: np.ndarray) -> Tuple[float, float]:
+        """Total por expansão e variância estratificada de z."""
+        n = self.sizes.astype(float)
+        sums = np.bincount(self.strata, weights=z, minlength=len(n))
+        squares = np.bincount(self.strata, weights=z * z, minlength=len(n))
+        means = sums / n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s2 = np.where(n > 1, (squares - n * means ** 2) / (n - 1), 0.0)
+        fpc = 1 - n / self.population
+        total = float(np.sum(self.population * means))
+        variance = float(np.sum(self.population ** 2 * fpc * np.maximum(s2, 0) / n))
+        return total, variance
+
+
+def approximate_kpis(sample: StratifiedSample, mask: np.ndarray) -> Tuple[Dict, Dict]:
+    """
+    Estima os KPIs de calculate_kpis a partir da amostra
+
+    Clientes e produtos únicos não são expansíveis: o valor retornado é a
+    contagem distinta na amostra (limite inferior) e não tem intervalo.
+
+    Args:
+        sample (StratifiedSample): Amostra estratificada
+        mask (np.ndarray): Filtro aplicado às linhas da amostra
+
+    Returns:
+        Tuple[Dict, Dict]: KPIs estimados e meia-largura do intervalo de cada um
+    """
+    mask = np.asarray(mask, dtype=bool)
+    frame = sample.frame
+    revenue = frame['revenue'].to_numpy(dtype=float)
+    profit = frame['profit'].to_numpy(dtype=float)
+    quantity = frame['quantity'].to_numpy(dtype=float)
+    ones = np.ones(len(frame))
+
+    kpis, intervals = {}, {}
+    kpis['total_revenue'], intervals['total_revenue'] = sample.estimate_total(revenue, mask)
+    kpis['total_profit'], intervals['total_profit'] = sample.estimate_total(profit, mask)
+    kpis['avg_ticket'], intervals['avg_ticket'] = sample.estimate_ratio(revenue, ones, mask)
+    orders, orders_ci = sample.estimate_total(ones, mask)
+    kpis['total_orders'], intervals['total_orders'] = int(round(orders)), orders_ci
+    kpis['unique_customers'] = frame['customer'][mask].nunique()
+    kpis['unique_products'] = frame['product'][mask].nunique()
+    intervals['unique_customers'] = intervals['unique_products'] = None
+    margin, margin_ci = sample.estimate_ratio(profit, revenue, mask)
+    kpis['avg_margin'], intervals['avg_margin'] = margin * 100, margin_ci * 100
+    kpis['avg_quantity'], intervals['avg_quantity'] = sample.estimate_ratio(quantity, ones, mask)
+    return kpis, intervals
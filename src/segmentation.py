@@ -0,0 +1,100 @@
+"""
+Segmentação automática de clientes para o projeto de Análise de Vendas
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+from threadpoolctl import threadpool_limits
+
+
+def _fit_k(X: np.ndarray, k: int, sample_size: int, random_state: int, threads: Optional[int]) -> Dict:
+    """
+    Ajusta o K-Means para um k e calcula inércia e silhueta amostrada
+
+    Executado nos processos de trabalho; threads limita o paralelismo interno
+    do scikit-learn para não disputar núcleos com os demais processos.
+    """
+    with threadpool_limits(limits=threads):
+        model = KMeans(n_clusters=k, random_state=random_state, n_init=10).fit(X)
+    assigned = model.labels_
+    silhouette = np.nan
+    if 1 < len(np.unique(assigned)) < len(X):
+        # Silhueta em amostra fixa: O(sample_size²) em vez de O(n²)
+        silhouette = silhouette_score(
+            X, assigned, sample_size=min(sample_size, len(X)), random_state=random_state)
+    return {'k': k, 'inertia': float(model.inertia_), 'silhouette': float(silhouette),
+            'labels': assigned}
+
+
+def sweep_kmeans(X: np.ndarray, k_values: Iterable[int] = range(2, 9), n_jobs: Optional[int] = None,
+                 sample_size: int = 2000, random_state: int = 42) -> pd.DataFrame:
+    """
+    Ajusta o K-Means para vários k em paralelo (um processo por k)
+
+    Args:
+        X (np.ndarray): Matriz de features já normalizada
+        k_values (Iterable[int]): Valores de k avaliados (k < número de linhas)
+        n_jobs (Optional[int]): Processos de trabalho (None = todos os núcleos;
+            1 = sequencial no processo atual)
+        sample_size (int): Linhas usadas no cálculo da silhueta
+        random_state (int): Semente do K-Means e da amostra da silhueta
+
+    Returns:
+        pd.DataFrame: Uma linha por k com inertia, silhouette e labels
+    """
+    X = np.asarray(X, dtype=float)
+    ks = [k for k in k_values if 2 <= k < len(X)]
+    if not ks:
+        return pd.DataFrame(columns=['k', 'inertia', 'silhouette', 'labels'])
+
+    workers = min(len(ks), n_jobs or os.cpu_count() or 1)
+    if workers == 1:
+        results = [_fit_k(X, k, sample_size, random_state, None) for k in ks]
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # forkserver: fork direto de um processo com threads (servidor do Streamlit,
+        # atualização em segundo plano) pode herdar locks presos e travar
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('forkserver')) as executor:
+            futures = [executor.submit(_fit_k, X, k, sample_size, random_state, threads)
+                       for k in ks]
+            results = [future.result() for future in futures]
+
+    return pd.DataFrame(results)
+
+
+def best_k(sweep: pd.DataFrame) -> int:
+    """
+    Escolhe o número de segmentos de uma varredura
+
+    Usa a maior silhueta; sem silhueta válida, recorre ao cotovelo da inércia
+    (ponto mais distante da reta entre o primeiro e o último k).
+
+    Args:
+        sweep (pd.DataFrame): Resultado de sweep_kmeans
+
+    Returns:
+        int: k escolhido
+    """
+    if sweep.empty:
+        raise ValueError("Varredura vazia: são necessários mais clientes que segmentos")
+
+    if sweep['silhouette'].notna().any():
+        return int(sweep.loc[sweep['silhouette'].idxmax(), 'k'])
+
+    k = sweep['k'].to_numpy(dtype=float)
+    inertia = sweep['inertia'].to_numpy(dtype=float)
+    if len(k) < 3:
+        return int(k[0])
+    # Normaliza os eixos e mede a distância até a reta entre os extremos
+    x = (k - k[0]) / (k[-1] - k[0])
+    span = inertia[0] - inertia[-1]
+    y = (inertia - inertia[-1]) / span if span else np.zeros_like(inertia)
+    distance = np.abs(x + y - 1) / np.sqrt(2)
+    return int(k[np.argmax(distance)])
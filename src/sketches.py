@@ -0,0 +1,282 @@
+"""
+Sketches de quantis para o projeto de Análise de Vendas
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+
+
+def _compress(values: np.ndarray, weights: np.ndarray, groups: np.ndarray,
+              compression: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Agrupa pontos ordenados em centroides de t-digest, vários grupos por vez
+
+    Os pontos devem estar ordenados por (grupo, valor). Cada centroide ocupa
+    no máximo uma unidade da escala k1 = compression / (2π) · arcsin(2q − 1),
+    o que mantém centroides unitários nas caudas e largos na mediana.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Médias, pesos e grupo de
+            cada centroide
+    """
+    if len(values) == 0:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.intp)
+
+    # Peso acumulado dentro de cada grupo
+    cum = np.cumsum(weights)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    offsets = np.repeat(cum[starts] - weights[starts], np.diff(np.r_[starts, len(groups)]))
+    totals = np.repeat(np.add.reduceat(weights, starts), np.diff(np.r_[starts, len(groups)]))
+    q = (cum - offsets - weights / 2) / totals
+
+    k = compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+    bucket = np.floor(k).astype(np.int64)
+    # Identificador único de centroide: muda com o grupo ou com o balde
+    new_centroid = np.r_[True, (groups[1:] != groups[:-1]) | (bucket[1:] != bucket[:-1])]
+    centroid = np.cumsum(new_centroid) - 1
+
+    weight = np.bincount(centroid, weights=weights)
+    mean = np.bincount(centroid, weights=values * weights) / weight
+    return mean, weight, groups[new_centroid]
+
+
+class TDigest:
+    """
+    Sketch de quantis mergeável (t-digest com escala k1)
+
+    Guarda algumas centenas de centroides (média, peso) independentemente do
+    número de valores resumidos. Dois sketches se combinam sem acesso aos
+    dados originais, o que permite responder quantis de qualquer união de
+    fatias pré-calculadas.
+    """
+
+    def __init__(self, means: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None,
+                 minimum: float = np.nan, maximum: float = np.nan, compression: float = 200):
+        self.means = np.empty(0) if means is None else np.asarray(means, dtype=float)
+        self.weights = np.empty(0) if weights is None else np.asarray(weights, dtype=float)
+        self.min = minimum
+        self.max = maximum
+        self.compression = compression
+
+    def __len__(self) -> int:
+        return len(self.means)
+
+    @property
+    def count(self) -> float:
+        """Número de valores resumidos pelo sketch."""
+        return float(self.weights.sum())
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], compression: float = 200) -> 'TDigest':
+        """
+        Constrói um sketch a partir de valores brutos
+
+        Args:
+            values (Iterable[float]): Valores a resumir (NaN são ignorados)
+            compression (float): Parâmetro de compressão (maior = mais preciso)
+
+        Returns:
+            TDigest: Sketch dos valores
+        """
+        values = np.asarray(values, dtype=float)
+        values = np.sort(values[~np.isnan(values)])
+        if len(values) == 0:
+            return cls(compression=compression)
+
+        means, weights, _ = _compress(values, np.ones(len(values)),
+                                      np.zeros(len(values), dtype=np.intp), compression)
+        return cls(means, weights, values[0], values[-1], compression)
+
+    @classmethod
+    def merge_all(cls, digests: Sequence['TDigest'], compression: Optional[float] = None) -> 'TDigest':
+        """
+        Combina vários sketches em um só
+
+        Args:
+            digests (Sequence[TDigest]): Sketches a combinar
+            compression (Optional[float]): Compressão do resultado (padrão:
+                a maior entre as entradas)
+
+        Returns:
+            TDigest: Sketch equivalente à união dos dados resumidos
+        """
+        digests = [d for d in digests if len(d)]
+        if compression is None:
+            compression = max((d.compression for d in digests), default=200)
+        if not digests:
+            return cls(compression=compression)
+
+        means = np.concatenate([d.means for d in digests])
+        weights = np.concatenate([d.weights for d in digests])
+        order = np.argsort(means, kind='mergesort')
+        means, weights, _ = _compress(means[order], weights[order],
+                                      np.zeros(len(means), dtype=np.intp), compression)
+        return cls(means, weights,
+                   min(d.min for d in digests), max(d.max for d in digests), compression)
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """
+        Combina este sketch com outro
+
+        Args:
+            other (TDigest): Sketch a combinar
+
+        Returns:
+            TDigest: Novo sketch com a união dos dois
+        """
+        return TDigest.merge_all([self, other], max(self.compression, other.compression))
+
+    def quantile(self, q: Union[float, Sequence[float]]) -> Union[float, np.ndarray]:
+        """
+        Estima um ou mais quantis
+
+        Args:
+            q (Union[float, Sequence[float]]): Quantis entre 0 e 1
+
+        Returns:
+            Union[float, np.ndarray]: Valores estimados (NaN se vazio)
+        """
+        qs = np.asarray(q, dtype=float)
+        if not len(self):
+            result = np.full(qs.shape, np.nan)
+        else:
+            # Cada centroide representa seu ponto médio em rank acumulado
+            cum = np.cumsum(self.weights)
+            centers = cum - self.weights / 2
+            ranks = np.r_[0.0, centers, cum[-1]]
+            points = np.r_[self.min, self.means, self.max]
+            result = np.interp(np.clip(qs, 0, 1) * cum[-1], ranks, points)
+        return float(result) if result.ndim == 0 else result
+
+
+class RevenueSketchIndex:
+    """
+    Sketches de receita por região × categoria × mês
+
+    Construído uma vez na carga dos dados; quantis de qualquer combinação de
+    regiões, categorias e meses são obtidos combinando os sketches das
+    células selecionadas, sem reordenar as linhas brutas.
+    """
+
+    def __init__(self, digests: Dict[Tuple[str, str, str], TDigest], compression: float = 100):
+        self.digests = digests
+        self.compression = compression
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, value: str = 'revenue', compression: float = 100) -> 'RevenueSketchIndex':
+        """
+        Constrói os sketches de todas as células em uma única ordenação
+
+        Args:
+            df (pd.DataFrame): DataFrame preparado
+            value (str): Coluna resumida
+            compression (float): Compressão de cada célula
+
+        Returns:
+            RevenueSketchIndex: Índice de sketches por célula
+        """
+        # Códigos por dimensão combinados em um código de célula inteiro
+        dates = df['order_date']
+        month_codes = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+        dim_codes, dim_labels = [], []
+        for column in (df['region'], df['category'], month_codes):
+            codes, labels = pd.factorize(column)
+            dim_codes.append(codes)
+            dim_labels.append(labels)
+        dim_labels[2] = [f"{m // 12:04d}-{m % 12 + 1:02d}" for m in dim_labels[2]]
+        sizes = [len(labels) for labels in dim_labels]
+        codes = np.ravel_multi_index(dim_codes, sizes) if len(df) else np.empty(0, dtype=np.intp)
+        cells, codes = np.unique(codes, return_inverse=True)
+        keys = [
+            tuple(dim_labels[d][i] for d, i in enumerate(cell))
+            for cell in zip(*np.unravel_index(cells, sizes))
+        ]
+
+        values = df[value].to_numpy(dtype=float)
+        order = np.lexsort((values, codes))
+        values, codes = values[order], codes[order]
+        means, weights, groups = _compress(values, np.ones(len(values)), codes, compression)
+
+        # Fatiar centroides e extremos por célula
+        bounds = np.searchsorted(groups, np.arange(len(keys) + 1))
+        value_bounds = np.searchsorted(codes, np.arange(len(keys) + 1))
+        digests = {}
+        for i, key in enumerate(keys):
+            lo, hi = bounds[i], bounds[i + 1]
+            digests[key] = TDigest(
+                means[lo:hi], weights[lo:hi],
+                values[value_bounds[i]], values[value_bounds[i + 1] - 1], compression)
+        return cls(digests, compression)
+
+    def query(self, regions: Optional[Iterable[str]] = None, categories: Optional[Iterable[str]] = None,
+              months: Optional[Iterable[str]] = None) -> TDigest:
+        """
+        Combina os sketches das células selecionadas
+
+        Args:
+            regions (Optional[Iterable[str]]): Regiões (None = todas)
+            categories (Optional[Iterable[str]]): Categorias (None = todas)
+            months (Optional[Iterable[str]]): Meses 'AAAA-MM' (None = todos)
+
+        Returns:
+            TDigest: Sketch da fatia selecionada
+        """
+        selected = [set(f) if f is not None else None for f in (regions, categories, months)]
+        digests = [
+            digest for key, digest in self.digests.items()
+            if all(s is None or k in s for s, k in zip(selected, key))
+        ]
+        return TDigest.merge_all(digests, self.compression)
+
+    def quantiles(self, qs: Sequence[float] = (0.5, 0.9, 0.99), **filters) -> pd.Series:
+        """
+        Quantis da fatia selecionada
+
+        Args:
+            qs (Sequence[float]): Quantis desejados
+            **filters: regions, categories e months (ver query)
+
+        Returns:
+            pd.Series: Valores indexados pelo quantil
+        """
+        return pd.Series(self.query(**filters).quantile(qs), index=list(qs))
+
+    def percentile_bands(self, percentiles: Sequence[float] = (0, 25, 50, 75, 90, 99, 100),
+                         **filters) -> pd.DataFrame:
+        """
+        Faixas de receita entre percentis consecutivos
+
+        Args:
+            percentiles (Sequence[float]): Percentis de 0 a 100 em ordem
+            **filters: regions, categories e months (ver query)
+
+        Returns:
+            pd.DataFrame: Uma linha por faixa com band, lower e upper
+        """
+        edges = self.query(**filters).quantile(np.asarray(percentiles) / 100)
+        return pd.DataFrame({
+            'band': [f"P{a:g}–P{b:g}" for a, b in zip(percentiles[:-1], percentiles[1:])],
+            'lower': edges[:-1],
+            'upper': edges[1:]
+        })
+
+
+def ticket_bins_from_percentiles(digest: TDigest,
+                                 percentiles: Sequence[float] = (0.5, 0.9, 0.99)) -> List[float]:
+    """
+    Limites das categorias de ticket a partir de percentis da receita
+
+    Args:
+        digest (TDigest): Sketch da receita por pedido
+        percentiles (Sequence[float]): Percentis que separam Baixo, Médio,
+            Alto e Premium
+
+    Returns:
+        List[float]: Bins para pd.cut, de 0 a infinito
+    """
+    bins = [0.0]
+    for edge in np.asarray(digest.quantile(percentiles), dtype=float):
+        # pd.cut exige limites estritamente crescentes
+        bins.append(float(max(edge, np.nextafter(bins[-1], np.inf))))
+    return bins + [float('inf')]
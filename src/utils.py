@@ -2,72 +2,242 @@
 Utilitários para o projeto de Análise de Vendas
 """
 
+import time
+import tracemalloc
+from contextlib import contextmanager
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 import plotly.express as px
 import plotly.graph_objects as go
+from sklearn.linear_model import LinearRegression
 from config import DATA_CONFIG, COLORS
+from dedup import OrderDeduplicator
+from drilldown import DrillDownIndex, HIERARCHIES
+from validation import validate_orders, quarantine_frame, validation_summary, write_quarantine
+from profiling import instrument, start_memory_tracing, stop_memory_tracing
 
 
-def load_data(file_path: str) -> pd.DataFrame:
+@instrument()
+def load_data(file_path: str, deduplicator: Optional[OrderDeduplicator] = None,
+              validation: Optional[Dict] = None) -> pd.DataFrame:
     """
     Carrega e prepara os dados de vendas
 
     Args:
         file_path (str): Caminho para o arquivo CSV
+        deduplicator (Optional[OrderDeduplicator]): Deduplicador por chave;
+            se omitido, usa a chave e a política de DATA_CONFIG
+        validation (Optional[Dict]): Se informado, recebe o relatório de
+            validação (ver prepare_data)
 
     Returns:
         pd.DataFrame: DataFrame com dados limpos e preparados
     """
     try:
+        if deduplicator is None:
+            deduplicator = OrderDeduplicator(
+                DATA_CONFIG['dedup_key'], DATA_CONFIG['dedup_policy'],
+                DATA_CONFIG['dedup_compare_columns'])
+        report = validation if validation is not None else {}
         df = pd.read_csv(file_path)
-        df = prepare_data(df)
+        df = prepare_data(df, deduplicator=deduplicator, validation=report)
+        if DATA_CONFIG['quarantine_file'] is not None:
+            write_quarantine(report['quarantine'], DATA_CONFIG['quarantine_file'])
         return df
     except Exception as e:
         raise Exception(f"Erro ao carregar dados: {e}")
 
 
-def prepare_data(df: pd.DataFrame) -> pd.DataFrame:
+@instrument()
+def prepare_data(df: pd.DataFrame, memory_report: Optional[List[Dict]] = None,
+                 deduplicator: Optional[OrderDeduplicator] = None,
+                 ticket_bins: Optional[List[float]] = None,
+                 validation: Optional[Dict] = None) -> pd.DataFrame:
     """
     Prepara e limpa os dados
 
+    Calcula uma única máscara de linhas válidas (regras de validation.RULES,
+    incluindo nulos, e sem duplicatas), materializa o resultado uma só vez e
+    monta as colunas derivadas em bloco, sem as cópias intermediárias de
+    copy/dropna/drop_duplicates.
+
     Args:
         df (pd.DataFrame): DataFrame bruto
+        memory_report (Optional[List[Dict]]): Se informado, recebe uma entrada
+            de alocação por etapa (requer tracemalloc ativo)
+        deduplicator (Optional[OrderDeduplicator]): Se informado, deduplica
+            pela chave do pedido em vez de comparar linhas inteiras
+        ticket_bins (Optional[List[float]]): Limites das categorias de ticket
+            (ver sketches.ticket_bins_from_percentiles); padrão 1000/5000/10000
+        validation (Optional[Dict]): Se informado, recebe 'counts' (linhas
+            por regra), 'summary' e 'quarantine' (linhas reprovadas com os
+            códigos de motivo)
 
     Returns:
         pd.DataFrame: DataFrame preparado
     """
-    # Cópia dos dados
-    df_clean = df.copy()
+    # Máscara combinada: regras de qualidade e duplicatas sem materializar cópias
+    with _memory_step(memory_report, 'mask') as step:
+        checks = validate_orders(df, DATA_CONFIG['revenue_tolerance'])
+        keep = checks.valid.copy()
+        if validation is not None:
+            validation['counts'] = checks.counts
+            validation['summary'] = validation_summary(checks)
+            validation['quarantine'] = quarantine_frame(df, checks)
+        if deduplicator is None:
+            keep &= ~df.duplicated().to_numpy()
+        else:
+            keep, conflict, _ = deduplicator.resolve(df, valid=keep)
+        step['rows'] = int(keep.sum())
+
+    # Materializar as colunas filtradas uma única vez, com índice compartilhado
+    with _memory_step(memory_report, 'materialize') as step:
+        index = df.index[keep]
+        # order_date já convertida na validação
+        columns = {col: (checks.order_date if col == 'order_date' else df[col]).array[keep]
+                   for col in df.columns}
+        step['rows'] = len(index)
+
+    # Criar features temporais e de negócio em bloco
+    with _memory_step(memory_report, 'derive') as step:
+        dates = pd.Series(columns['order_date'], index=index)
+        revenue = pd.Series(columns['revenue'], index=index)
+        columns['order_date'] = dates.array
+        derived = {
+            'year': dates.dt.year,
+            'month': dates.dt.month,
+            'day_of_week': dates.dt.dayofweek,
+            'quarter': dates.dt.quarter,
+            'margin': pd.Series(columns['profit'], index=index) / revenue,
+            'revenue_per_unit': revenue / pd.Series(columns['quantity'], index=index),
+            # Categorizar tickets
+            'ticket_category': pd.cut(
+                revenue,
+                bins=ticket_bins or [0, 1000, 5000, 10000, float('inf')],
+                labels=['Baixo', 'Médio', 'Alto', 'Premium']
+            )
+        }
+        if deduplicator is not None and deduplicator.policy == 'flag':
+            derived['dedup_conflict'] = pd.Series(conflict[keep], index=index)
+        columns.update({name: values.array for name, values in derived.items()})
+        step['rows'] = len(index)
 
-    # Remover nulos e duplicatas
-    df_clean = df_clean.dropna()
-    df_clean = df_clean.drop_duplicates()
+    with _memory_step(memory_report, 'assemble') as step:
+        df_clean = pd.DataFrame(columns, index=index, copy=False)
+        step['rows'] = len(df_clean)
 
-    # Converter tipos
-    df_clean['order_date'] = pd.to_datetime(df_clean['order_date'])
+    return df_clean
 
-    # Criar features temporais
-    df_clean['year'] = df_clean['order_date'].dt.year
-    df_clean['month'] = df_clean['order_date'].dt.month
-    df_clean['day_of_week'] = df_clean['order_date'].dt.dayofweek
-    df_clean['quarter'] = df_clean['order_date'].dt.quarter
 
-    # Criar features de negócio
-    df_clean['margin'] = df_clean['profit'] / df_clean['revenue']
-    df_clean['revenue_per_unit'] = df_clean['revenue'] / df_clean['quantity']
+def prepare_data_with_report(df: pd.DataFrame, deduplicator: Optional[OrderDeduplicator] = None,
+                             ticket_bins: Optional[List[float]] = None,
+                             validation: Optional[Dict] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Executa prepare_data medindo alocações e pico de memória por etapa
 
-    # Categorizar tickets
-    df_clean['ticket_category'] = pd.cut(
-        df_clean['revenue'],
-        bins=[0, 1000, 5000, 10000, float('inf')],
-        labels=['Baixo', 'Médio', 'Alto', 'Premium']
-    )
+    Args:
+        df (pd.DataFrame): DataFrame bruto
+        deduplicator (Optional[OrderDeduplicator]): Repassado a prepare_data
+            (deduplicação por chave, como em load_data)
+        ticket_bins (Optional[List[float]]): Repassado a prepare_data
+        validation (Optional[Dict]): Repassado a prepare_data (contagens e quarentena)
 
-    return df_clean
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: DataFrame preparado e relatório com
+            colunas step, rows, seconds, allocated_bytes e peak_bytes. O
+            relatório traz em attrs o tamanho final (final_bytes) e a razão
+            entre o pico e o tamanho final (peak_ratio).
+    """
+    start_memory_tracing()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        steps: List[Dict] = []
+        df_clean = prepare_data(df, memory_report=steps, deduplicator=deduplicator,
+                                ticket_bins=ticket_bins, validation=validation)
+    finally:
+        stop_memory_tracing()
+
+    report = pd.DataFrame(steps)
+    # Pico relativo ao início do preparo, não ao início de cada etapa
+    report['peak_bytes'] = report['peak_bytes'] - baseline
+    final_bytes = int(df_clean.memory_usage(index=True).sum())
+    report.attrs['final_bytes'] = final_bytes
+    report.attrs['peak_ratio'] = (
+        report['peak_bytes'].max() / final_bytes if final_bytes else 0.0)
+    return df_clean, report
+
+
+@contextmanager
+def _memory_step(report: Optional[List[Dict]], name: str):
+    """Registra tempo, alocação líquida e pico absoluto de uma etapa."""
+    step = {'step': name, 'rows': 0}
+    if report is None or not tracemalloc.is_tracing():
+        yield step
+        return
+
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    yield step
+    current, peak = tracemalloc.get_traced_memory()
+    step['seconds'] = time.perf_counter() - start
+    step['allocated_bytes'] = current - before
+    step['peak_bytes'] = peak
+    report.append(step)
+
+
+def filter_mask(df: pd.DataFrame, spec: Dict) -> pd.Series:
+    """
+    Calcula a máscara booleana de uma especificação de filtros
+
+    Args:
+        df (pd.DataFrame): DataFrame preparado
+        spec (Dict): Filtros opcionais; chaves ausentes ou None não filtram:
+            date_range (tupla início/fim), regions, categories, products,
+            customers (listas), revenue_range (tupla mín/máx) e min_quantity
+
+    Returns:
+        pd.Series: Máscara alinhada ao índice de df
+    """
+    mask = pd.Series(True, index=df.index)
+
+    date_range = spec.get('date_range')
+    if date_range is not None and len(date_range) == 2:
+        mask &= (df['order_date'] >= pd.to_datetime(date_range[0])) & \
+            (df['order_date'] <= pd.to_datetime(date_range[1]))
+
+    for key, column in (('regions', 'region'), ('categories', 'category'),
+                        ('products', 'product'), ('customers', 'customer')):
+        if spec.get(key) is not None:
+            mask &= df[column].isin(spec[key])
+
+    revenue_range = spec.get('revenue_range')
+    if revenue_range is not None:
+        mask &= (df['revenue'] >= revenue_range[0]) & (df['revenue'] <= revenue_range[1])
 
+    if spec.get('min_quantity') is not None:
+        mask &= df['quantity'] >= spec['min_quantity']
 
+    return mask
+
+
+@instrument()
+def apply_filters(df: pd.DataFrame, spec: Dict) -> pd.DataFrame:
+    """
+    Aplica uma especificação de filtros (ver filter_mask)
+
+    Args:
+        df (pd.DataFrame): DataFrame preparado
+        spec (Dict): Especificação de filtros
+
+    Returns:
+        pd.DataFrame: DataFrame filtrado
+    """
+    return df[filter_mask(df, spec)]
+
+
+@instrument()
 def calculate_kpis(df: pd.DataFrame) -> Dict:
     """
     Calcula os principais KPIs
@@ -92,7 +262,10 @@ def calculate_kpis(df: pd.DataFrame) -> Dict:
     return kpis
 
 
-def get_top_performers(df: pd.DataFrame, column: str, metric: str = 'revenue', top_n: int = 10) -> pd.Series:
+@instrument()
+def get_top_performers(df: pd.DataFrame, column: str, metric: str = 'revenue', top_n: int = 10,
+                       parent: Optional[Any] = None,
+                       hierarchy: Optional[DrillDownIndex] = None) -> pd.Series:
     """
     Retorna os top performers por uma métrica
 
@@ -101,10 +274,18 @@ def get_top_performers(df: pd.DataFrame, column: str, metric: str = 'revenue', t
         column (str): Coluna para agrupar
         metric (str): Métrica para ordenar
         top_n (int): Número de itens a retornar
+        parent (Optional[Any]): Valor do pai para detalhar (ex.: uma categoria
+            ao agrupar por produto), conforme HIERARCHIES
+        hierarchy (Optional[DrillDownIndex]): Cache de drill-down construído
+            a partir de df; com parent, a consulta é feita nele
 
     Returns:
         pd.Series: Top performers
     """
+    if parent is not None:
+        if hierarchy is not None and hierarchy.supports(column, metric):
+            return hierarchy.top(column, parent, metric, top_n)
+        df = df[df[HIERARCHIES[column]] == parent]
     return df.groupby(column)[metric].sum().sort_values(ascending=False).head(top_n)
 
 
@@ -170,6 +351,7 @@ def create_summary_table(df: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(summary_data)
 
 
+@instrument()
 def generate_insights(df: pd.DataFrame) -> Dict:
     """
     Gera insights automáticos dos dados
@@ -202,6 +384,31 @@ def generate_insights(df: pd.DataFrame) -> Dict:
     return insights
 
 
+@instrument()
+def forecast_revenue(df: pd.DataFrame, periods: int = 3) -> Tuple[pd.Series, pd.Series]:
+    """
+    Prevê a receita mensal com regressão linear sobre o histórico
+
+    Args:
+        df (pd.DataFrame): DataFrame com dados
+        periods (int): Meses futuros previstos
+
+    Returns:
+        Tuple[pd.Series, pd.Series]: Receita histórica e prevista, indexadas
+            por mês (previsão vazia com menos de 3 meses de histórico)
+    """
+    history = df.groupby(df['order_date'].dt.to_period('M'))['revenue'].sum()
+    history.index.name = 'month'
+    if len(history) < 3:
+        return history, pd.Series(dtype=float, name='revenue')
+
+    X = np.arange(len(history)).reshape(-1, 1)
+    model = LinearRegression().fit(X, history.to_numpy())
+    future = np.arange(len(history), len(history) + periods).reshape(-1, 1)
+    index = pd.period_range(history.index[-1] + 1, periods=periods, freq='M', name='month')
+    return history, pd.Series(model.predict(future), index=index, name='revenue')
+
+
 def create_plotly_theme():
     """
     Cria tema personalizado para gráficos Plotly
@@ -0,0 +1,143 @@
+"""
+Validação de qualidade dos dados para o projeto de Análise de Vendas
+"""
+
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Union
+import numpy as np
+import pandas as pd
+
+# Regras de qualidade: nome -> (bit do código de motivo, descrição)
+RULES: Dict[str, tuple] = {
+    'missing_value': (1, "Valor ausente em alguma coluna"),
+    'invalid_date': (2, "Data do pedido inválida"),
+    'non_positive_quantity': (4, "Quantidade menor ou igual a zero"),
+    'non_positive_revenue': (8, "Receita menor ou igual a zero"),
+    'revenue_mismatch': (16, "Receita diferente de quantidade × preço"),
+    'profit_exceeds_revenue': (32, "Lucro maior que a receita"),
+}
+
+
+class ValidationResult(NamedTuple):
+    """Resultado da validação, alinhado às linhas do DataFrame validado."""
+    valid: np.ndarray
+    codes: np.ndarray
+    counts: pd.Series
+    order_date: Optional[pd.Series]
+
+
+def validate_orders(df: pd.DataFrame, revenue_tolerance: float = 0.01) -> ValidationResult:
+    """
+    Avalia todas as regras de qualidade em bloco, sem laços por linha
+
+    Cada regra é uma máscara vetorizada; as falhas são combinadas num código
+    de motivo por linha (um bit por regra, ver RULES). Regras cujas colunas
+    não existem em df são ignoradas. A data é convertida uma única vez e
+    devolvida para reaproveitamento em prepare_data.
+
+    Args:
+        df (pd.DataFrame): DataFrame bruto
+        revenue_tolerance (float): Diferença absoluta aceita entre receita e
+            quantidade × preço (arredondamento)
+
+    Returns:
+        ValidationResult: Máscara de linhas válidas, códigos de motivo,
+            contagem por regra e a data convertida
+    """
+    codes = np.zeros(len(df), dtype=np.uint8)
+
+    def flag(rule: str, mask) -> None:
+        codes[np.asarray(mask, dtype=bool)] |= RULES[rule][0]
+
+    missing = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        missing |= df[col].isna().to_numpy()
+    flag('missing_value', missing)
+
+    order_date = None
+    if 'order_date' in df:
+        order_date = pd.to_datetime(df['order_date'], errors='coerce')
+        flag('invalid_date', order_date.isna().to_numpy() & ~missing)
+
+    # Comparações com NaN são falsas: valores ausentes contam só em missing_value
+    columns = {col: df[col].to_numpy(dtype=float, na_value=np.nan)
+               for col in ('quantity', 'price', 'revenue', 'profit') if col in df}
+    if 'quantity' in columns:
+        flag('non_positive_quantity', columns['quantity'] <= 0)
+    if 'revenue' in columns:
+        flag('non_positive_revenue', columns['revenue'] <= 0)
+    if {'quantity', 'price', 'revenue'} <= columns.keys():
+        expected = columns['quantity'] * columns['price']
+        flag('revenue_mismatch', np.abs(columns['revenue'] - expected) >
+             revenue_tolerance + 1e-9 * np.abs(expected))
+    if {'revenue', 'profit'} <= columns.keys():
+        flag('profit_exceeds_revenue', columns['profit'] > columns['revenue'])
+
+    counts = pd.Series({rule: int(np.count_nonzero(codes & bit)) for rule, (bit, _) in RULES.items()},
+                       name='rows')
+    return ValidationResult(codes == 0, codes, counts, order_date)
+
+
+def reason_labels(codes: np.ndarray) -> np.ndarray:
+    """
+    Converte códigos de motivo em nomes de regras separados por ';'
+
+    Args:
+        codes (np.ndarray): Códigos de motivo
+
+    Returns:
+        np.ndarray: Um texto por código ('' para linhas válidas)
+    """
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    labels = np.array([';'.join(rule for rule, (bit, _) in RULES.items() if code & bit)
+                       for code in uniques], dtype=object)
+    return labels[inverse]
+
+
+def quarantine_frame(df: pd.DataFrame, result: ValidationResult) -> pd.DataFrame:
+    """
+    Linhas reprovadas com o código e os nomes dos motivos
+
+    Args:
+        df (pd.DataFrame): DataFrame validado
+        result (ValidationResult): Resultado de validate_orders
+
+    Returns:
+        pd.DataFrame: Linhas reprovadas com reason_code e reasons
+    """
+    rejected = ~result.valid
+    quarantine = df[rejected].copy()
+    quarantine['reason_code'] = result.codes[rejected]
+    quarantine['reasons'] = reason_labels(result.codes[rejected])
+    return quarantine
+
+
+def write_quarantine(quarantine: pd.DataFrame, path: Union[str, Path]) -> None:
+    """
+    Grava a quarentena em CSV, substituindo o arquivo anterior
+
+    Quarentena vazia gera um arquivo só com o cabeçalho, para que uma carga
+    limpa não deixe em disco as linhas reprovadas da carga anterior.
+
+    Args:
+        quarantine (pd.DataFrame): Resultado de quarantine_frame
+        path (Union[str, Path]): Arquivo de destino
+    """
+    quarantine.to_csv(path, index=False)
+
+
+def validation_summary(result: ValidationResult) -> pd.DataFrame:
+    """
+    Contagem e descrição de cada regra
+
+    Args:
+        result (ValidationResult): Resultado de validate_orders
+
+    Returns:
+        pd.DataFrame: Uma linha por regra com rule, description e rows
+    """
+    return pd.DataFrame({
+        'rule': list(RULES),
+        'description': [description for _, description in RULES.values()],
+        'rows': result.counts.to_numpy()
+    })
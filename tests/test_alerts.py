@@ -0,0 +1,127 @@
+"""
+Testes para o motor de alertas em fluxo
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from alerts import StreamingAlertEngine, generate_alerts
+from utils import calculate_kpis
+
+
+class TestStreamingAlertEngine:
+
+    @pytest.fixture
+    def history(self):
+        """60 dias estáveis com 5 pedidos por dia em duas regiões"""
+        rng = np.random.default_rng(0)
+        n = 300
+        revenue = rng.normal(1000, 50, n)
+        return pd.DataFrame({
+            'order_date': np.repeat(pd.date_range('2025-01-01', periods=60), 5),
+            'customer': np.tile(['Cliente A', 'Cliente B', 'Cliente C'], 100),
+            'product': np.tile(['Produto X', 'Produto Y'], 150),
+            'quantity': np.ones(n, dtype=int),
+            'region': np.tile(['Norte', 'Sul', 'Norte', 'Sul', 'Norte'], 60),
+            'category': np.tile(['Cat A', 'Cat B', 'Cat A', 'Cat A', 'Cat B'], 60),
+            'revenue': revenue,
+            'profit': revenue * 0.25
+        })
+
+    def test_lote_igual_ao_fluxo(self, history):
+        """update_frame produz o mesmo estado que pedidos individuais"""
+        batch = StreamingAlertEngine.build(history, min_history_days=5)
+        stream = StreamingAlertEngine(min_history_days=5)
+        for order in history.to_dict('records'):
+            stream.update(order)
+
+        assert stream.orders_seen == batch.orders_seen == len(history)
+        assert stream.last_closed_day == batch.last_closed_day
+        for key, state in batch._states.items():
+            other = stream._states[key]
+            assert other.revenue_mean == pytest.approx(state.revenue_mean)
+            assert other.margin_var == pytest.approx(state.margin_var)
+
+    def test_pico_e_queda_de_margem(self, history):
+        """Desvios do histórico recente viram anomalias da chave afetada"""
+        engine = StreamingAlertEngine.build(history)
+        assert engine.current_anomalies() == []
+
+        day = pd.Timestamp('2025-03-02')
+        for _ in range(10):
+            engine.update({'order_date': day, 'region': 'Norte', 'category': 'Cat A',
+                           'revenue': 1000.0, 'profit': -200.0})
+        engine.update({'order_date': day + pd.Timedelta(days=1), 'region': 'Sul',
+                       'category': 'Cat B', 'revenue': 1000.0, 'profit': 250.0})
+
+        kinds = {(a['dimension'], a['key'], a['kind']) for a in engine.current_anomalies()}
+        assert ('region', 'Norte', 'revenue_spike') in kinds
+        assert ('category', 'Cat A', 'margin_drop') in kinds
+        assert ('all', None, 'revenue_spike') in kinds
+        assert not any(key == 'Sul' for _, key, _ in kinds)
+        # Filtro por região exclui o total e as demais regiões
+        filtered = engine.current_anomalies(regions=['Sul'], categories=['Cat B'])
+        assert filtered == []
+
+    def test_alertas_do_dashboard(self, history):
+        """generate_alerts inclui as anomalias e a concentração"""
+        engine = StreamingAlertEngine.build(history)
+        engine.update({'order_date': '2025-03-02', 'region': 'Norte', 'category': 'Cat A',
+                       'revenue': 50000.0, 'profit': 100.0})
+        engine.update({'order_date': '2025-03-03', 'region': 'Norte', 'category': 'Cat A',
+                       'revenue': 1000.0, 'profit': 250.0})
+        alerts = generate_alerts(history, calculate_kpis(history), engine, max_anomalies=6)
+
+        assert any('Alta concentração' in msg for _, msg in alerts)
+        assert any('Pico de receita em Norte' in msg for _, msg in alerts)
+        assert any('Queda de margem' in msg for _, msg in alerts)
+
+    def test_anomalia_permanece_na_janela(self, history):
+        """Uma anomalia continua listada enquanto estiver dentro da janela"""
+        engine = StreamingAlertEngine.build(history)
+        engine.update({'order_date': '2025-03-02', 'region': 'Norte', 'category': 'Cat A',
+                       'revenue': 50000.0, 'profit': 12500.0})
+        for offset in range(1, 5):
+            day = pd.Timestamp('2025-03-02') + pd.Timedelta(days=offset)
+            engine.update({'order_date': day, 'region': 'Norte', 'category': 'Cat A',
+                           'revenue': 5000.0, 'profit': 1250.0})
+
+        assert engine.last_closed_day == pd.Timestamp('2025-03-05')
+        spikes = [a for a in engine.current_anomalies(regions=['Norte'])
+                  if a['kind'] == 'revenue_spike' and a['date'] == pd.Timestamp('2025-03-02')]
+        assert spikes
+        assert not any(a['date'] == pd.Timestamp('2025-03-02')
+                       for a in engine.current_anomalies(window_days=2))
+
+    def test_concentracao_usa_dados_filtrados(self, history):
+        """A concentração segue o DataFrame filtrado, não o histórico do motor"""
+        engine = StreamingAlertEngine.build(history)
+        rng = np.random.default_rng(1)
+        spread = history.assign(category=rng.choice([f'Cat {c}' for c in 'ABCDEFGH'], len(history)))
+        alerts = generate_alerts(spread, calculate_kpis(spread), engine)
+
+        assert not any('concentração' in msg.lower() for _, msg in alerts)
+        assert any('Alta concentração' in msg
+                   for _, msg in generate_alerts(history, calculate_kpis(history), engine))
+
+    def test_anomalias_respeitam_periodo(self, history):
+        """Anomalias fora do período filtrado não aparecem"""
+        engine = StreamingAlertEngine.build(history)
+        engine.update({'order_date': '2025-03-02', 'region': 'Norte', 'category': 'Cat A',
+                       'revenue': 50000.0, 'profit': 12500.0})
+        engine.update({'order_date': '2025-03-03', 'region': 'Norte', 'category': 'Cat A',
+                       'revenue': 5000.0, 'profit': 1250.0})
+
+        assert engine.current_anomalies(date_range=('2025-03-01', '2025-03-03'))
+        assert engine.current_anomalies(date_range=('2025-01-01', '2025-02-28')) == []
+        assert engine.current_anomalies(date_range=('2025-03-03', '2025-03-31')) == []
+        alerts = generate_alerts(history, calculate_kpis(history), engine,
+                                 date_range=('2025-01-01', '2025-02-28'))
+        assert not any('Pico de receita' in msg for _, msg in alerts)
@@ -0,0 +1,149 @@
+"""
+Testes para o serviço HTTP local
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from alerts import StreamingAlertEngine
+from api import AnalyticsAPI, parse_request
+from refresh import DataRefresher
+from utils import prepare_data, calculate_kpis
+
+
+async def _request(reader, writer, target, headers=''):
+    """Envia um GET na conexão aberta e lê status, cabeçalhos e corpo."""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while (line := await reader.readline()) != b'\r\n':
+        name, _, value = line.decode().partition(':')
+        response_headers[name.lower()] = value.strip()
+    body = await reader.readexactly(int(response_headers['content-length']))
+    return status, response_headers, body
+
+
+class TestAnalyticsAPI:
+
+    @pytest.fixture
+    def api(self):
+        """API sobre 6 meses de pedidos aleatórios"""
+        rng = np.random.default_rng(1)
+        n = 600
+        quantity = rng.integers(1, 5, n)
+        price = rng.integers(100, 1000, n).astype(float)
+        data = pd.DataFrame({
+            'order_id': [f'ORD-{i:04d}' for i in range(n)],
+            'order_date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 180, n), 'D'),
+            'customer': rng.choice(['Cliente A', 'Cliente B', 'Cliente C'], n),
+            'product': rng.choice(['Produto X', 'Produto Y', 'Produto Z'], n),
+            'category': rng.choice(['Cat A', 'Cat B'], n),
+            'region': rng.choice(['Norte', 'Sul'], n),
+            'quantity': quantity,
+            'price': price,
+            'revenue': quantity * price,
+            'profit': quantity * price * 0.2
+        })
+        refresher = DataRefresher(loader=lambda: prepare_data(data),
+                                  builders={'alerts': StreamingAlertEngine.build}, interval=0).start()
+        api = AnalyticsAPI(refresher, workers=2, cache_size=4, keepalive_timeout=2)
+        yield api
+        api.close()
+
+    def test_parse_request(self):
+        """Query string e corpo JSON viram especificação de filtros e parâmetros"""
+        spec, params = parse_request('regions=Sul,Norte&categories=A&categories=B&date_from=2025-01-01'
+                                     '&revenue_min=10&min_quantity=2&top_n=5')
+        assert spec == {'regions': ['Norte', 'Sul'], 'categories': ['A', 'B'],
+                        'date_range': ('2025-01-01', '2262-04-11'),
+                        'revenue_range': (10.0, float('inf')), 'min_quantity': 2}
+        assert params == {'top_n': '5'}
+
+        spec, params = parse_request('', b'{"filters": {"regions": ["Sul"], "products": null}, "column": "customer"}')
+        assert spec == {'regions': ['Sul']}
+        assert params == {'column': 'customer'}
+
+    def test_endpoints_e_cache(self, api):
+        """Respostas iguais às funções de análise, com ETag, 304 e cache"""
+        async def scenario():
+            status, headers, body = await api.respond('GET', '/kpis?regions=Norte', {})
+            _, again_headers, again = await api.respond('GET', '/kpis?regions=Norte', {})
+            not_modified = await api.respond('GET', '/kpis?regions=Norte',
+                                             {'if-none-match': headers['ETag']})
+            errors = [(await api.respond('GET', target, {}))[0]
+                      for target in ('/nada', '/top-performers?column=x', '/forecast?periods=a')]
+            forecast = json.loads((await api.respond('GET', '/forecast?periods=2', {}))[2])
+            return status, headers, body, again_headers, again, not_modified, errors, forecast
+
+        status, headers, body, again_headers, again, not_modified, errors, forecast = asyncio.run(scenario())
+
+        df = api.refresher.current().data
+        expected = calculate_kpis(df[df['region'] == 'Norte'])
+        payload = json.loads(body)
+        assert status == 200 and body == again
+        assert payload['data']['total_revenue'] == pytest.approx(expected['total_revenue'])
+        assert headers['ETag'] == again_headers['ETag']
+        assert headers['ETag'].startswith('"1-')
+        assert not_modified[0] == 304 and not_modified[2] == b''
+        assert errors == [404, 400, 400]
+        assert [item['key'] for item in forecast['data']['forecast']] == ['2025-07', '2025-08']
+        assert api.stats['computed'] == 2 and api.stats['cache_hits'] == 1
+
+    def test_conexao_persistente(self, api):
+        """Várias requisições na mesma conexão, inclusive concorrentes"""
+        async def scenario():
+            server = await api.serve('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            first = await _request(reader, writer, '/top-performers?column=customer&parent=Sul&top_n=2')
+            second = await _request(reader, writer, '/alerts?categories=Cat%20A')
+            third = await _request(reader, writer, '/insights', f"If-None-Match: {first[1]['etag']}\r\n")
+            writer.close()
+
+            async def client():
+                r, w = await asyncio.open_connection('127.0.0.1', port)
+                result = await _request(r, w, '/kpis', 'Connection: close\r\n')
+                w.close()
+                return result
+            parallel = await asyncio.gather(*[client() for _ in range(20)])
+            server.close()
+            await server.wait_closed()
+            return first, second, third, parallel
+
+        first, second, third, parallel = asyncio.run(scenario())
+
+        assert first[0] == 200 and first[1]['connection'] == 'keep-alive'
+        assert len(json.loads(first[2])['data']) == 2
+        assert second[0] == 200 and json.loads(second[2])['data'][0]['level'] == 'success'
+        assert third[0] == 200
+        assert {result[0] for result in parallel} == {200}
+        assert len({result[2] for result in parallel}) == 1
+        assert api.stats['computed'] == 4
+
+    def test_filtros_e_cabecalhos_invalidos(self, api):
+        """Filtros que falham na filtragem e Content-Length inválido geram 400"""
+        async def scenario():
+            statuses = [(await api.respond('GET', '/kpis?date_from=garbage', {}))[0],
+                        (await api.respond('POST', '/kpis', {}, b'{"filters": {"revenue_range": 5}}'))[0]]
+            server = await api.serve('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"POST /kpis HTTP/1.1\r\nHost: localhost\r\nContent-Length: abc\r\n\r\n")
+            await writer.drain()
+            statuses.append(int((await reader.readline()).split()[1]))
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return statuses
+
+        assert asyncio.run(scenario()) == [400, 400, 400]
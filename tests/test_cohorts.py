@@ -0,0 +1,85 @@
+"""
+Testes para a matriz esparsa de atividade de clientes
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from cohorts import CustomerActivityMatrix
+
+
+class TestCustomerActivityMatrix:
+
+    @pytest.fixture
+    def orders(self):
+        """A compra em jan/fev/abr, B em jan, C em fev e mar"""
+        data = {
+            'customer': ['A', 'A', 'B', 'A', 'C', 'C', 'A'],
+            'order_date': pd.to_datetime(['2025-01-05', '2025-01-20', '2025-01-10', '2025-02-03',
+                                          '2025-02-15', '2025-03-01', '2025-04-10']),
+            'revenue': [100.0, 50.0, 80.0, 30.0, 200.0, 20.0, 10.0]
+        }
+        return pd.DataFrame(data)
+
+    def test_matrizes_esparsas(self, orders):
+        """Células ativas somam receita e pedidos por cliente e mês"""
+        activity = CustomerActivityMatrix.build(orders)
+
+        assert activity.revenue.shape == (3, 4)
+        assert activity.orders.nnz == 6
+        assert activity.revenue[0, 0] == 150.0
+        assert list(activity.first_period().astype(str)) == ['2025-01', '2025-01', '2025-02']
+
+    def test_coortes_e_retencao(self, orders):
+        """Tabela de coortes e retenção com meses não observados como NaN"""
+        activity = CustomerActivityMatrix.build(orders)
+        counts = activity.cohort_table()
+        retention = activity.retention()
+
+        assert list(counts.index) == ['2025-01', '2025-02']
+        assert list(counts.loc['2025-01']) == [2, 1, 0, 1]
+        assert list(counts.loc['2025-02'])[:3] == [1, 1, 0]
+        assert retention.loc['2025-01', 1] == 0.5
+        assert np.isnan(retention.loc['2025-02', 3])
+        assert activity.cohort_table('revenue').loc['2025-01', 0] == 230.0
+        # Deslocamento 1: (1 de 2) + (1 de 1) clientes
+        assert activity.retention_curve()[1] == pytest.approx(2 / 3)
+
+    def test_coorte_reproduz_groupby(self, orders):
+        """Contagens iguais ao cálculo de referência com groupby"""
+        rng = np.random.default_rng(5)
+        n = 5000
+        df = pd.DataFrame({
+            'customer': rng.integers(0, 300, n).astype(str),
+            'order_date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, n), 'D'),
+            'revenue': rng.random(n)
+        })
+        month = df['order_date'].dt.to_period('M')
+        cohort = month.groupby(df['customer']).transform('min')
+        offset = (month.dt.year - cohort.dt.year) * 12 + month.dt.month - cohort.dt.month
+        expected = df.groupby([cohort.astype(str), offset])['customer'].nunique().unstack(fill_value=0)
+
+        table = CustomerActivityMatrix.build(df).cohort_table()
+
+        np.testing.assert_array_equal(table.iloc[:, :expected.shape[1]].to_numpy(),
+                                      expected.to_numpy())
+
+    def test_rfm_e_recompra(self, orders):
+        """RFM por cliente e taxa de recompra"""
+        activity = CustomerActivityMatrix.build(orders)
+        rfm = activity.rfm(bins=3)
+
+        assert rfm.loc['A', 'frequency'] == 4
+        assert rfm.loc['A', 'recency_days'] == 1
+        assert rfm.loc['B', 'monetary'] == 80.0
+        assert rfm.loc['A', 'active_months'] == 3
+        assert rfm.loc['A', 'r_score'] == 3
+        assert rfm['rfm_score'].between(111, 333).all()
+        assert activity.repeat_purchase_rate() == pytest.approx(2 / 3)
@@ -0,0 +1,52 @@
+"""
+Testes de execução do dashboard (Streamlit AppTest)
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+import profiling
+from streamlit.testing.v1 import AppTest
+
+DASHBOARD = str(Path(__file__).parent.parent / "src" / "dashboard.py")
+
+
+class TestDashboard:
+
+    @pytest.fixture
+    def app(self):
+        """Dashboard executado uma vez sobre o dataset padrão"""
+        at = AppTest.from_file(DASHBOARD, default_timeout=120).run()
+        assert not at.exception
+        return at
+
+    def test_segmentacao_com_tres_clientes(self, app):
+        """Com 3 clientes a varredura só tem k=2 e o dashboard não quebra"""
+        customers = next(w for w in app.sidebar.multiselect if w.label == "👤 Clientes")
+        customers.set_value(customers.options[:3]).run()
+
+        assert not app.exception
+        assert any("único valor possível para 3 clientes" in c.value for c in app.caption)
+
+        next(w for w in app.checkbox if w.label.startswith("🤖")).uncheck().run()
+        assert not app.exception
+
+    def test_profiler_liberado_em_st_stop(self, app):
+        """Execução encerrada por st.stop não deixa o tracemalloc ligado"""
+        next(w for w in app.sidebar.checkbox if w.key == 'debug_panel').check().run()
+        next(w for w in app.sidebar.checkbox if w.key == 'debug_memory').check().run()
+        regions = next(w for w in app.sidebar.multiselect if w.label == "🌎 Regiões")
+        all_regions = list(regions.options)
+        regions.set_value([]).run()
+        assert any("Nenhum dado encontrado" in w.value for w in app.warning)
+        regions.set_value(all_regions).run()
+
+        assert not app.exception
+        assert profiling._tracing_users == 0
+        assert not tracemalloc.is_tracing()
@@ -0,0 +1,120 @@
+"""
+Testes para a deduplicação por chave
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from dedup import OrderDeduplicator
+from utils import prepare_data
+
+
+class TestOrderDeduplicator:
+
+    @pytest.fixture
+    def batch(self):
+        """Lote com um reenvio idêntico e um reenvio com valor divergente"""
+        data = {
+            'order_id': ['ORD-001', 'ORD-002', 'ORD-001', 'ORD-003', 'ORD-002'],
+            'order_date': ['2025-01-01', '2025-01-02', '2025-01-01', '2025-01-03', '2025-01-02'],
+            'customer': ['Cliente A', 'Cliente B', 'Cliente A', 'Cliente C', 'Cliente B'],
+            'quantity': [2, 1, 2, 3, 1],
+            'price': [100.0, 200.0, 100.0, 50.0, 250.0],
+            'revenue': [200.0, 200.0, 200.0, 150.0, 250.0],
+            'profit': [40.0, 50.0, 40.0, 30.0, 60.0]
+        }
+        return pd.DataFrame(data)
+
+    def test_policy_first(self, batch):
+        """Mantém a primeira versão e conta o conflito de ORD-002"""
+        df_dedup, stats = OrderDeduplicator(policy='first').deduplicate(batch)
+
+        assert list(df_dedup.index) == [0, 1, 3]
+        assert stats['dropped'] == 2
+        assert stats['conflicts'] == 1
+
+    def test_policy_last(self, batch):
+        """Mantém a versão mais recente de cada pedido"""
+        df_dedup, stats = OrderDeduplicator(policy='last').deduplicate(batch)
+
+        assert list(df_dedup.index) == [2, 3, 4]
+        assert df_dedup.loc[4, 'revenue'] == 250.0
+        assert stats['conflicts'] == 1
+
+    def test_policy_flag(self, batch):
+        """Descarta só a cópia idêntica e marca as versões divergentes"""
+        df_dedup, stats = OrderDeduplicator(policy='flag').deduplicate(batch)
+
+        assert list(df_dedup.index) == [0, 1, 3, 4]
+        assert list(df_dedup['dedup_conflict']) == [False, True, False, True]
+        assert stats['dropped'] == 1
+
+    def test_carga_incremental(self, batch, tmp_path):
+        """O índice persistido deduplica cargas posteriores"""
+        deduplicator = OrderDeduplicator()
+        deduplicator.deduplicate(batch)
+        path = tmp_path / "dedup_index.pkl"
+        deduplicator.save(path)
+
+        restored = OrderDeduplicator.load(path)
+        df_dedup, stats = restored.deduplicate(batch.iloc[[3, 4]])
+
+        assert len(restored) == 3
+        assert df_dedup.empty
+        assert stats['conflicts'] == 1
+
+    def test_reenvio_incremental_flag(self, batch, tmp_path):
+        """Na política flag, versões já vistas em cargas anteriores não voltam"""
+        deduplicator = OrderDeduplicator(policy='flag')
+        deduplicator.deduplicate(batch.iloc[[0, 1]])
+        df_new, _ = deduplicator.deduplicate(batch.iloc[[4]])
+        df_again, stats = deduplicator.deduplicate(batch.iloc[[1, 4, 4]])
+
+        assert list(df_new.index) == [4] and bool(df_new['dedup_conflict'].iloc[0])
+        assert df_again.empty and stats['dropped'] == 3
+
+        path = tmp_path / "dedup_index.pkl"
+        deduplicator.save(path)
+        restored = OrderDeduplicator.load(path, policy='flag')
+        df_restored, stats = restored.deduplicate(batch)
+        assert list(df_restored.index) == [3] and stats['conflicts'] == 2
+
+    def test_reenvio_incremental_last(self, batch):
+        """Na política last, reenvio idêntico é descartado e versão nova substitui"""
+        deduplicator = OrderDeduplicator(policy='last')
+        deduplicator.deduplicate(batch.iloc[[0, 1]])
+        df_again, stats = deduplicator.deduplicate(batch.iloc[[0, 1]])
+        df_changed, changed_stats = deduplicator.deduplicate(batch.iloc[[0, 4]])
+
+        assert df_again.empty and stats['superseded'] == 0
+        assert list(df_changed.index) == [4]
+        assert changed_stats['superseded'] == 1 and changed_stats['conflicts'] == 1
+
+    def test_politica_invalida(self):
+        """Política desconhecida gera erro"""
+        with pytest.raises(ValueError):
+            OrderDeduplicator(policy='newest')
+
+    def test_prepare_data_ignora_linhas_nulas(self, batch):
+        """Linhas nulas não ocupam a chave antes da versão válida"""
+        batch = batch.assign(product='Produto X', category='Cat A', region='Norte')
+        batch.loc[1, 'customer'] = np.nan
+        df_prepared = prepare_data(batch, deduplicator=OrderDeduplicator())
+
+        assert list(df_prepared.index) == [0, 3, 4]
+
+    @pytest.mark.parametrize('policy', ['first', 'last', 'flag'])
+    def test_chave_nula(self, policy):
+        """Linhas sem chave são descartadas sem afetar os demais pedidos"""
+        batch = pd.DataFrame({'order_id': ['A', None, 'B', 'A'], 'revenue': [1.0, 2.0, 3.0, 1.0]})
+        df_dedup, stats = OrderDeduplicator(policy=policy).deduplicate(batch)
+
+        assert sorted(df_dedup['order_id']) == ['A', 'B']
+        assert stats['null_keys'] == 1 and stats['dropped'] == 2
@@ -0,0 +1,360 @@
+"""
+Testes diferenciais: caminhos otimizados contra implementações de referência em pandas
+
+Gera datasets aleatórios (nulos, duplicatas, empates, fatias vazias e um único
+mês) e compara cada caminho otimizado com o cálculo direto em pandas. O
+dataset grande usa DIFF_ROWS linhas (padrão 1.000.000).
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from alerts import StreamingAlertEngine
+from cohorts import CustomerActivityMatrix
+from dedup import OrderDeduplicator
+from drilldown import DrillDownIndex, HIERARCHIES
+from sampling import StratifiedSample, approximate_kpis
+from sketches import RevenueSketchIndex
+from utils import (prepare_data, apply_filters, filter_mask, calculate_kpis, get_top_performers,
+                   generate_insights, forecast_revenue)
+
+LARGE_ROWS = int(os.environ.get('DIFF_ROWS', 1_000_000))
+
+# Tolerâncias: somas em ordens diferentes e meias-larguras de intervalo de
+# confiança na amostra (a dos sketches depende do quantil, ver o teste)
+RTOL = 1e-9
+CI_MULTIPLIER = 4
+
+
+def make_orders(seed, n, n_customers=500, n_products=60, days=365, null_rate=0.001,
+                dup_rate=0.01, conflict_rate=0.005, invalid_rate=0.002, price_levels=None):
+    """
+    Gera pedidos brutos aleatórios
+
+    Args:
+        seed (int): Semente
+        n (int): Pedidos distintos
+        n_customers (int): Clientes distintos
+        n_products (int): Produtos distintos (6 categorias)
+        days (int): Dias cobertos a partir de 2025-01-01
+        null_rate (float): Fração de nulos por coluna
+        dup_rate (float): Fração de linhas repetidas integralmente
+        conflict_rate (float): Fração de order_id repetidos com outro conteúdo
+            (receita deixa de bater com quantidade × preço)
+        invalid_rate (float): Fração de linhas que violam cada regra de negócio
+        price_levels (list): Preços possíveis (poucos níveis geram empates)
+
+    Returns:
+        pd.DataFrame: Pedidos no formato do CSV
+    """
+    rng = np.random.default_rng(seed)
+    product = rng.integers(0, n_products, n)
+    quantity = rng.integers(1, 10, n)
+    price = (rng.choice(price_levels, n) if price_levels is not None
+             else np.round(rng.lognormal(6, 1, n), 2))
+    revenue = np.round(quantity * price, 2)
+    df = pd.DataFrame({
+        'order_id': np.char.add('ORD-', np.arange(n).astype(str)),
+        'order_date': (pd.Timestamp('2025-01-01')
+                       + pd.to_timedelta(rng.integers(0, days, n), 'D')).strftime('%Y-%m-%d'),
+        'customer': np.char.add('Cliente ', rng.integers(0, n_customers, n).astype(str)),
+        'product': np.char.add('Produto ', product.astype(str)),
+        'category': np.char.add('Categoria ', (product % 6).astype(str)),
+        'region': rng.choice(['Norte', 'Sul', 'Leste', 'Oeste', 'Centro'], n),
+        'quantity': quantity,
+        'price': price,
+        'revenue': revenue,
+        'profit': np.round(revenue * rng.choice([0.1, 0.2, 0.3], n), 2)
+    })
+
+    repeated = df.iloc[rng.integers(0, n, int(n * dup_rate))]
+    conflicts = df.iloc[rng.integers(0, n, int(n * conflict_rate))].assign(
+        quantity=lambda frame: frame['quantity'] + 1)
+    df = pd.concat([df, repeated, conflicts], ignore_index=True)
+    df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+    # Violações das regras de validação
+    for column, value in (('quantity', 0), ('revenue', 0.0), ('order_date', 'data-invalida')):
+        df[column] = df[column].mask(rng.random(len(df)) < invalid_rate, value)
+    df['profit'] = df['profit'].mask(rng.random(len(df)) < invalid_rate, df['revenue'] * 2)
+
+    for column in df.columns:
+        df[column] = df[column].mask(rng.random(len(df)) < null_rate)
+    return df
+
+
+def reference_dedup(df, policy):
+    """Deduplicação por order_id direto em pandas; em flag, uma linha por versão distinta."""
+    df = df[df['order_id'].notna()]
+    if policy == 'flag':
+        df = df.drop_duplicates()
+        return df.assign(dedup_conflict=df['order_id'].duplicated(keep=False))
+    return df.drop_duplicates(subset='order_id', keep=policy)
+
+
+def reference_prepare(df, policy=None):
+    """prepare_data original (cópia, dropna, drop_duplicates) mais as regras de validação."""
+    df_clean = df.copy()
+    df_clean = df_clean.dropna()
+    df_clean = df_clean[pd.to_datetime(df_clean['order_date'], errors='coerce').notna()]
+    df_clean = df_clean[
+        (df_clean['quantity'] > 0) & (df_clean['revenue'] > 0)
+        & ((df_clean['revenue'] - df_clean['quantity'] * df_clean['price']).abs() <= 0.01)
+        & (df_clean['profit'] <= df_clean['revenue'])
+    ]
+    df_clean = df_clean.drop_duplicates() if policy is None else reference_dedup(df_clean, policy)
+    df_clean['order_date'] = pd.to_datetime(df_clean['order_date'])
+    df_clean['year'] = df_clean['order_date'].dt.year
+    df_clean['month'] = df_clean['order_date'].dt.month
+    df_clean['day_of_week'] = df_clean['order_date'].dt.dayofweek
+    df_clean['quarter'] = df_clean['order_date'].dt.quarter
+    df_clean['margin'] = df_clean['profit'] / df_clean['revenue']
+    df_clean['revenue_per_unit'] = df_clean['revenue'] / df_clean['quantity']
+    df_clean['ticket_category'] = pd.cut(
+        df_clean['revenue'],
+        bins=[0, 1000, 5000, 10000, float('inf')],
+        labels=['Baixo', 'Médio', 'Alto', 'Premium']
+    )
+    if policy == 'flag':
+        df_clean['dedup_conflict'] = df_clean.pop('dedup_conflict')
+    return df_clean
+
+
+def reference_filter(df, spec):
+    """Filtros aplicados um a um, como no dashboard original."""
+    out = df
+    if spec.get('date_range') is not None:
+        start, end = pd.to_datetime(spec['date_range'][0]), pd.to_datetime(spec['date_range'][1])
+        out = out[(out['order_date'] >= start) & (out['order_date'] <= end)]
+    for key, column in (('regions', 'region'), ('categories', 'category'),
+                        ('products', 'product'), ('customers', 'customer')):
+        if spec.get(key) is not None:
+            out = out[out[column].isin(spec[key])]
+    if spec.get('revenue_range') is not None:
+        out = out[out['revenue'].between(*spec['revenue_range'])]
+    if spec.get('min_quantity') is not None:
+        out = out[out['quantity'] >= spec['min_quantity']]
+    return out
+
+
+def assert_top_matches(result, totals, top_n):
+    """Top-N igual ao da referência a menos da ordem entre empates."""
+    expected = totals.sort_values(ascending=False).head(top_n)
+    assert len(result) == len(expected)
+    np.testing.assert_allclose(result.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=RTOL)
+    np.testing.assert_allclose(totals.loc[result.index].to_numpy(dtype=float),
+                               result.to_numpy(dtype=float), rtol=RTOL)
+
+
+DATASETS = {
+    'pequeno': dict(seed=1, n=300),
+    'mes_unico': dict(seed=2, n=2000, days=28),
+    'empates': dict(seed=3, n=5000, n_customers=40, n_products=12, price_levels=[100.0, 250.0, 1000.0]),
+    'duplicatas': dict(seed=4, n=3000, dup_rate=0.3, conflict_rate=0.2),
+    'nulos': dict(seed=5, n=3000, null_rate=0.05),
+    'grande': dict(seed=6, n=LARGE_ROWS, n_customers=50_000, n_products=500),
+}
+
+
+@pytest.fixture(scope='module', params=list(DATASETS))
+def dataset(request):
+    """Dados brutos e preparados pelos caminhos otimizado e de referência"""
+    raw = make_orders(**DATASETS[request.param])
+    return request.param, raw, prepare_data(raw), reference_prepare(raw)
+
+
+class TestDifferential:
+
+    def test_prepare_data(self, dataset):
+        """Máscara única + materialização igual a copy/dropna/drop_duplicates"""
+        _, raw, fast, reference = dataset
+
+        pd.testing.assert_frame_equal(fast, reference)
+
+    @pytest.mark.parametrize('policy', ['first', 'last', 'flag'])
+    def test_deduplicacao_por_chave(self, dataset, policy):
+        """OrderDeduplicator igual a drop_duplicates por order_id, com chaves nulas no lote"""
+        _, raw, _, _ = dataset
+
+        deduplicated, stats = OrderDeduplicator('order_id', policy).deduplicate(raw)
+        expected = reference_dedup(raw, policy)
+        pd.testing.assert_frame_equal(deduplicated.sort_index(), expected.sort_index())
+        assert stats['null_keys'] == raw['order_id'].isna().sum()
+        assert stats['rows_out'] == len(expected)
+
+    @pytest.mark.parametrize('policy', ['first', 'last', 'flag'])
+    def test_prepare_data_com_deduplicador(self, dataset, policy):
+        """prepare_data com deduplicação por chave igual à referência passo a passo"""
+        _, raw, _, _ = dataset
+
+        fast = prepare_data(raw, deduplicator=OrderDeduplicator('order_id', policy))
+        pd.testing.assert_frame_equal(fast, reference_prepare(raw, policy))
+
+    def test_filtros_e_kpis(self, dataset):
+        """apply_filters e calculate_kpis iguais à filtragem passo a passo"""
+        _, _, fast, reference = dataset
+        months = fast['order_date'].dt.to_period('M')
+        specs = [
+            {},
+            {'regions': ['Norte', 'Sul'], 'categories': ['Categoria 1', 'Categoria 4']},
+            {'date_range': (str(months.min().start_time.date()), str(months.min().end_time.date())),
+             'min_quantity': 5},
+            {'revenue_range': (500.0, 5000.0), 'customers': list(fast['customer'].unique()[:10])},
+            # Fatias vazias
+            {'regions': ['Inexistente']},
+            {'date_range': ('2030-01-01', '2030-12-31')},
+        ]
+        for spec in specs:
+            filtered = apply_filters(fast, spec)
+            expected = reference_filter(reference, spec)
+            pd.testing.assert_index_equal(filtered.index, expected.index)
+            if len(expected):
+                kpis, expected_kpis = calculate_kpis(filtered), calculate_kpis(expected)
+                for key, value in expected_kpis.items():
+                    assert kpis[key] == pytest.approx(value, rel=RTOL), key
+
+    def test_top_performers_e_drilldown(self, dataset):
+        """Top-N do cache de drill-down igual ao groupby dentro de cada pai"""
+        _, _, fast, reference = dataset
+        drilldown = DrillDownIndex.build(fast)
+
+        for column, parent_column in HIERARCHIES.items():
+            parents = list(reference[parent_column].unique()[:3]) + ['Inexistente']
+            for parent in parents:
+                for metric in ('revenue', 'quantity'):
+                    totals = reference[reference[parent_column] == parent].groupby(column)[metric].sum()
+                    result = get_top_performers(fast, column, metric, 10, parent=parent,
+                                                hierarchy=drilldown)
+                    assert_top_matches(result, totals, 10)
+            expected_parents = reference.groupby(parent_column)['revenue'].sum()
+            parent_totals = drilldown.parent_totals(column, 'revenue')
+            np.testing.assert_allclose(parent_totals.to_numpy(),
+                                       expected_parents.loc[parent_totals.index].to_numpy(), rtol=RTOL)
+            assert_top_matches(get_top_performers(fast, parent_column), expected_parents, 10)
+
+    def test_insights(self, dataset):
+        """Insights iguais aos da referência (empates comparados pelo total)"""
+        _, _, fast, reference = dataset
+        insights = generate_insights(fast)
+
+        for key, column in (('best_category', 'category'), ('best_region', 'region'),
+                            ('best_product', 'product'), ('best_customer', 'customer')):
+            totals = reference.groupby(column)['revenue'].sum()
+            assert totals[insights[key]] == pytest.approx(totals.max(), rel=RTOL)
+        monthly = reference.groupby('month')['revenue'].sum()
+        assert monthly[insights['best_month']] == pytest.approx(monthly.max(), rel=RTOL)
+        assert insights['monthly_variation'] == pytest.approx(
+            (monthly.max() - monthly.min()) / monthly.min() * 100, rel=1e-6)
+
+    def test_forecast(self, dataset):
+        """Previsão igual ao ajuste linear por mínimos quadrados"""
+        _, _, fast, reference = dataset
+        history, forecast = forecast_revenue(fast)
+
+        monthly = reference.groupby(reference['order_date'].dt.to_period('M'))['revenue'].sum()
+        np.testing.assert_allclose(history.to_numpy(), monthly.to_numpy(), rtol=RTOL)
+        if len(monthly) < 3:
+            assert forecast.empty
+        else:
+            slope, intercept = np.polyfit(np.arange(len(monthly)), monthly.to_numpy(), 1)
+            expected = intercept + slope * np.arange(len(monthly), len(monthly) + 3)
+            np.testing.assert_allclose(forecast.to_numpy(), expected, rtol=1e-6)
+
+    def test_sketches_de_quantis(self, dataset):
+        """Quantis dos sketches dentro da tolerância de posto da distribuição exata"""
+        _, _, fast, _ = dataset
+        index = RevenueSketchIndex.build(fast)
+        qs = [0.01, 0.25, 0.5, 0.75, 0.9, 0.99]
+        slices = [{}, {'regions': ['Norte']}, {'categories': ['Categoria 0', 'Categoria 3']}]
+
+        for filters in slices:
+            mask = filter_mask(fast, filters)
+            values = np.sort(fast.loc[mask, 'revenue'].to_numpy())
+            if len(values) < 100:
+                continue
+            estimates = index.quantiles(qs, **filters)
+            for q, estimate in estimates.items():
+                # Maior centroide possível em q (escala k1): metade dele por digest,
+                # dobrado porque a consulta funde os digests de várias células
+                tolerance = 2 * np.pi * np.sqrt(q * (1 - q)) / index.compression + 1 / len(values)
+                lower = np.searchsorted(values, estimate, side='left') / len(values)
+                upper = np.searchsorted(values, estimate, side='right') / len(values)
+                assert lower - tolerance <= q <= upper + tolerance, (filters, q)
+
+    def test_amostra_estratificada(self, dataset):
+        """KPIs aproximados dentro do intervalo de confiança dos exatos"""
+        _, _, fast, _ = dataset
+        sample = StratifiedSample.build(fast, fraction=0.05, min_per_stratum=30, max_rows=200_000)
+
+        for spec in ({}, {'regions': ['Sul', 'Leste']}, {'categories': ['Categoria 2']}):
+            exact_frame = apply_filters(fast, spec)
+            if exact_frame.empty:
+                continue
+            exact = calculate_kpis(exact_frame)
+            kpis, intervals = approximate_kpis(sample, filter_mask(sample.frame, spec).to_numpy())
+            for key in ('total_revenue', 'total_profit', 'avg_ticket', 'avg_margin', 'avg_quantity'):
+                tolerance = CI_MULTIPLIER * intervals[key] + 1e-9 * abs(exact[key])
+                assert abs(kpis[key] - exact[key]) <= tolerance, (spec, key)
+            assert abs(kpis['total_orders'] - exact['total_orders']) <= \
+                CI_MULTIPLIER * intervals['total_orders'] + 1
+
+    def test_coortes_e_rfm(self, dataset):
+        """Matriz esparsa de atividade igual aos groupby de coorte e de cliente"""
+        _, _, fast, reference = dataset
+        activity = CustomerActivityMatrix.build(fast)
+
+        month = reference['order_date'].dt.to_period('M')
+        cohort = month.groupby(reference['customer']).transform('min')
+        offset = (month.dt.year - cohort.dt.year) * 12 + month.dt.month - cohort.dt.month
+        expected = (reference.groupby([cohort.astype(str), offset])['customer'].nunique()
+                    .unstack(fill_value=0))
+        table = activity.cohort_table()
+        np.testing.assert_array_equal(table.loc[expected.index, expected.columns].to_numpy(),
+                                      expected.to_numpy())
+        assert table.drop(columns=expected.columns).to_numpy().sum() == 0
+
+        rfm = activity.rfm()
+        by_customer = reference.groupby('customer').agg(
+            frequency=('order_id', 'size'), monetary=('revenue', 'sum'), last=('order_date', 'max'))
+        np.testing.assert_array_equal(rfm.loc[by_customer.index, 'frequency'], by_customer['frequency'])
+        np.testing.assert_allclose(rfm.loc[by_customer.index, 'monetary'], by_customer['monetary'], rtol=RTOL)
+        recency = (reference['order_date'].max() + pd.Timedelta(days=1) - by_customer['last']).dt.days
+        np.testing.assert_array_equal(rfm.loc[by_customer.index, 'recency_days'], recency)
+
+    def test_estruturas_em_fatia_vazia(self, dataset):
+        """Estruturas derivadas aceitam uma fatia sem pedidos"""
+        _, _, fast, _ = dataset
+        empty = apply_filters(fast, {'regions': ['Inexistente']})
+
+        assert DrillDownIndex.build(empty).top('product', 'Categoria 0').empty
+        assert get_top_performers(empty, 'customer', parent='Norte').empty
+        activity = CustomerActivityMatrix.build(empty)
+        assert activity.retention().empty and activity.retention_curve().empty
+        assert activity.rfm().empty and activity.repeat_purchase_rate() == 0.0
+        assert RevenueSketchIndex.build(empty).quantiles([0.5]).isna().all()
+        assert StreamingAlertEngine.build(empty).current_anomalies() == []
+        assert forecast_revenue(empty)[1].empty
+
+    def test_alertas_em_lote_e_em_fluxo(self, dataset):
+        """update_frame igual a update pedido a pedido (datasets pequenos)"""
+        name, _, fast, _ = dataset
+        if len(fast) > 10_000:
+            pytest.skip("atualização pedido a pedido apenas nos datasets pequenos")
+        batch = StreamingAlertEngine.build(fast)
+        stream = StreamingAlertEngine()
+        for order in fast.sort_values('order_date', kind='stable').to_dict('records'):
+            stream.update(order)
+
+        assert stream.last_closed_day == batch.last_closed_day
+        for key, state in batch._states.items():
+            assert stream._states[key].revenue_mean == pytest.approx(state.revenue_mean, rel=1e-6)
+        assert ([(a['date'], a['key'], a['kind']) for a in stream.current_anomalies()]
+                == [(a['date'], a['key'], a['kind']) for a in batch.current_anomalies()])
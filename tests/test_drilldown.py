@@ -0,0 +1,71 @@
+"""
+Testes para o cache hierárquico de drill-down
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from drilldown import DrillDownIndex
+from utils import get_top_performers
+
+
+class TestDrillDownIndex:
+
+    @pytest.fixture
+    def orders(self):
+        """Pedidos aleatórios com várias categorias, produtos, regiões e clientes"""
+        rng = np.random.default_rng(3)
+        n = 2000
+        product = rng.integers(0, 60, n)
+        return pd.DataFrame({
+            'category': (product % 6).astype(str),
+            'product': product.astype(str),
+            'region': rng.choice(['Norte', 'Sul', 'Leste'], n),
+            'customer': rng.integers(0, 150, n).astype(str),
+            'revenue': rng.integers(1, 1000, n) * 10.0,
+            'profit': rng.random(n) * 100,
+            'quantity': rng.integers(1, 5, n)
+        })
+
+    def test_igual_ao_groupby(self, orders):
+        """Top-N dentro de cada pai igual ao filtro seguido de groupby"""
+        drilldown = DrillDownIndex.build(orders)
+
+        for column, parent_column in [('product', 'category'), ('customer', 'region')]:
+            for parent in orders[parent_column].unique():
+                for metric in ['revenue', 'quantity']:
+                    expected = (orders[orders[parent_column] == parent]
+                                .groupby(column)[metric].sum())
+                    result = get_top_performers(orders, column, metric, 5, parent=parent,
+                                                hierarchy=drilldown)
+                    assert len(result) == 5
+                    assert result.is_monotonic_decreasing
+                    np.testing.assert_allclose(result.to_numpy(),
+                                               expected.sort_values(ascending=False).head(5))
+                    pd.testing.assert_series_equal(result, expected.loc[result.index],
+                                                   check_names=False, check_index_type=False)
+
+    def test_pai_inexistente_e_totais(self, orders):
+        """Pai ausente retorna vazio; totais dos pais somam os filhos"""
+        drilldown = DrillDownIndex.build(orders)
+
+        assert drilldown.top('product', 'X', 'revenue').empty
+        assert len(drilldown.top('product', '0', 'revenue', None)) == 10
+        totals = drilldown.parent_totals('customer', 'revenue')
+        pd.testing.assert_series_equal(
+            totals, orders.groupby('region')['revenue'].sum().sort_values(ascending=False),
+            check_index_type=False)
+
+    def test_sem_cache_filtra_o_pai(self, orders):
+        """Sem hierarquia, o parent filtra os dados antes do agrupamento"""
+        result = get_top_performers(orders, 'product', 'revenue', 3, parent='2')
+
+        assert set(result.index) <= set(orders.loc[orders['category'] == '2', 'product'])
+        assert len(result) == 3
@@ -0,0 +1,112 @@
+"""
+Testes para a tabela dinâmica esparsa
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from pivot import SparsePivot, OTHERS_LABEL
+
+
+class TestSparsePivot:
+
+    @pytest.fixture
+    def sample_data(self):
+        """Pedidos aleatórios com muitos clientes e produtos"""
+        rng = np.random.default_rng(7)
+        n = 2000
+        return pd.DataFrame({
+            'order_date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 200, n), 'D'),
+            'customer': rng.choice([f'Cliente {i:03d}' for i in range(300)], n),
+            'product': rng.choice([f'Produto {i:02d}' for i in range(40)], n),
+            'category': rng.choice(['Cat A', 'Cat B', 'Cat C'], n),
+            'region': pd.Categorical(rng.choice(['Norte', 'Sul', 'Leste'], n),
+                                     categories=['Leste', 'Norte', 'Oeste', 'Sul']),
+            'quantity': rng.integers(1, 5, n),
+            'revenue': rng.uniform(10, 1000, n).round(2)
+        })
+
+    @pytest.mark.parametrize('aggfunc', ['sum', 'count', 'mean'])
+    def test_igual_pivot_table(self, sample_data, aggfunc):
+        """Tabela completa igual ao pivot_table do pandas"""
+        pivot = SparsePivot.build(sample_data, 'customer', 'product', 'revenue', aggfunc)
+        expected = sample_data.pivot_table(index='customer', columns='product', values='revenue',
+                                           aggfunc=aggfunc, fill_value=None if aggfunc == 'mean' else 0)
+
+        dense = pivot.to_dense(max_rows=pivot.shape[0], max_cols=pivot.shape[1])
+        pd.testing.assert_frame_equal(dense, expected.astype(float), check_names=False)
+        assert pivot.nnz == sample_data.groupby(['customer', 'product']).ngroups
+        assert len(pivot.to_frame()) == pivot.nnz
+
+    def test_codigos_categoricos_e_mes(self, sample_data):
+        """Categorias sem pedidos viram linhas vazias; year_month em ordem cronológica"""
+        pivot = SparsePivot.build(sample_data, 'region', 'year_month', 'quantity')
+
+        assert list(pivot.rows) == ['Leste', 'Norte', 'Oeste', 'Sul']
+        assert list(pivot.columns) == [f'2025-{m:02d}' for m in range(1, 8)]
+        assert pivot.row_totals()['Oeste'] == 0
+        monthly = sample_data.groupby(sample_data['order_date'].dt.strftime('%Y-%m'))['quantity'].sum()
+        np.testing.assert_allclose(pivot.column_totals().to_numpy(), monthly.to_numpy())
+
+    def test_truncamento_top_k(self, sample_data):
+        """Top-K por total, com 'Outros' preservando totais e médias"""
+        pivot = SparsePivot.build(sample_data, 'customer', 'product')
+        top = pivot.truncate(top_rows=5, top_cols=3, others=True)
+
+        expected_rows = sample_data.groupby('customer')['revenue'].sum().nlargest(5)
+        assert list(top.rows[:5]) == list(expected_rows.index)
+        assert top.rows[-1] == OTHERS_LABEL and top.shape == (6, 4)
+        assert top.sums.sum() == pytest.approx(sample_data['revenue'].sum())
+
+        mean = SparsePivot.build(sample_data, 'category', 'product', aggfunc='mean')
+        others = mean.truncate(top_cols=3, others=True).to_dense()[OTHERS_LABEL]
+        rest = ~sample_data['product'].isin(mean.truncate(top_cols=3).columns)
+        expected = sample_data[rest].groupby('category')['revenue'].mean()
+        np.testing.assert_allclose(others.to_numpy(), expected.to_numpy())
+
+    def test_truncamento_meses_recentes(self, sample_data):
+        """year_month mantém os últimos meses em ordem cronológica, nas linhas e nas colunas"""
+        pivot = SparsePivot.build(sample_data, 'region', 'year_month', 'quantity')
+        top = pivot.truncate(top_rows=2, top_cols=3, others=True)
+
+        assert list(top.columns) == ['2025-05', '2025-06', '2025-07', OTHERS_LABEL]
+        assert top.to_dense(max_cols=3).shape == (3, 3)
+        by_month = SparsePivot.build(sample_data, 'year_month', 'product')
+        assert list(by_month.truncate(2).rows) == ['2025-06', '2025-07']
+        assert list(by_month.truncate(10).rows) == [f'2025-{m:02d}' for m in range(1, 8)]
+
+    def test_parte_exibida_e_vazio(self, sample_data):
+        """to_dense converte só o bloco pedido; frame vazio não quebra"""
+        pivot = SparsePivot.build(sample_data, 'customer', 'product').truncate(10, 10)
+        assert pivot.to_dense(max_rows=4, max_cols=3).shape == (4, 3)
+
+        empty = SparsePivot.build(sample_data.iloc[:0], 'customer', 'year_month', aggfunc='mean')
+        assert empty.shape == (0, 0) and empty.density == 0.0
+        assert empty.truncate(5, 5).to_dense().empty
+
+        with pytest.raises(ValueError):
+            SparsePivot.build(sample_data, 'customer', 'product', aggfunc='median')
+
+    def test_outros_com_soma_zero(self):
+        """Lucros que se anulam em 'Outros' continuam como célula ativa"""
+        df = pd.DataFrame({
+            'customer': ['Cliente A', 'Cliente B', 'Cliente C', 'Cliente C'],
+            'product': ['Produto X', 'Produto X', 'Produto X', 'Produto Y'],
+            'profit': [500.0, 100.0, -100.0, 50.0]
+        })
+        for aggfunc in ('sum', 'mean'):
+            pivot = SparsePivot.build(df, 'customer', 'product', 'profit', aggfunc)
+            top = pivot.truncate(top_rows=1, others=True)
+            frame = top.to_frame().set_index(['customer', 'product'])['profit']
+
+            assert top.sums.nnz == top.counts.nnz
+            assert len(frame) == 3
+            assert frame[(OTHERS_LABEL, 'Produto X')] == 0.0
+            assert frame[(OTHERS_LABEL, 'Produto Y')] == 50.0
@@ -0,0 +1,91 @@
+"""
+Testes para a instrumentação de etapas
+"""
+
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from profiling import Profiler, get_active_profiler, instrument, profiling, span
+from utils import prepare_data, calculate_kpis
+
+
+@instrument('filtrar_norte')
+def filtrar_norte(df):
+    return df[df['region'] == 'Norte']
+
+
+class TestProfiling:
+
+    @pytest.fixture
+    def sample_data(self):
+        """Dados de exemplo para testes"""
+        data = {
+            'order_id': ['ORD-001', 'ORD-002', 'ORD-003'],
+            'order_date': ['2025-01-01', '2025-01-02', '2025-01-03'],
+            'customer': ['Cliente A', 'Cliente B', 'Cliente A'],
+            'product': ['Produto X', 'Produto Y', 'Produto X'],
+            'category': ['Cat A', 'Cat B', 'Cat A'],
+            'region': ['Norte', 'Sul', 'Norte'],
+            'quantity': [2, 1, 3],
+            'price': [100.0, 200.0, 100.0],
+            'revenue': [200.0, 200.0, 300.0],
+            'profit': [40.0, 50.0, 60.0]
+        }
+        return pd.DataFrame(data)
+
+    def test_desativado_nao_registra(self, sample_data):
+        """Sem profiler ativo, funções instrumentadas apenas executam"""
+        assert get_active_profiler() is None
+        assert len(filtrar_norte(sample_data)) == 2
+        with span('etapa') as record:
+            record['rows_out'] = 1
+
+    def test_spans_com_linhas_e_aninhamento(self, sample_data):
+        """Registra linhas de entrada/saída e a profundidade dos spans"""
+        with profiling() as profiler:
+            with span('pipeline', len(sample_data)):
+                df = prepare_data(sample_data)
+                filtrar_norte(df)
+                calculate_kpis(df)
+
+        summary = profiler.summary()
+        assert list(summary['name']) == ['pipeline', 'prepare_data', 'filtrar_norte', 'calculate_kpis']
+        assert list(summary['depth']) == [0, 1, 1, 1]
+        row = summary.set_index('name').loc['filtrar_norte']
+        assert (row['rows_in'], row['rows_out']) == (3, 2)
+        assert get_active_profiler() is None
+
+    def test_memoria_e_exportacao(self, sample_data):
+        """Exporta JSON e Chrome Trace com a variação de memória"""
+        with profiling(track_memory=True) as profiler:
+            prepare_data(sample_data)
+
+        assert profiler.spans[0]['memory_delta'] is not None
+        spans = json.loads(profiler.to_json())['spans']
+        events = json.loads(profiler.to_chrome_trace())['traceEvents']
+        assert spans[0]['name'] == 'prepare_data'
+        assert events[0]['ph'] == 'X'
+        assert events[0]['args']['rows_in'] == 3
+
+    def test_rastreamento_compartilhado(self, sample_data):
+        """Um profiler que fecha não desliga a memória de outro ainda ativo"""
+        first = Profiler(track_memory=True)
+        second = Profiler(track_memory=True)
+        first.close()
+        first.close()
+
+        with second.span('depois') as record:
+            prepare_data(sample_data)
+        assert tracemalloc.is_tracing()
+        assert record['memory_delta'] is not None
+
+        second.close()
+        assert not tracemalloc.is_tracing()
@@ -0,0 +1,118 @@
+"""
+Testes para a atualização de dados em segundo plano
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from refresh import DataRefresher
+
+
+def wait_for(condition, timeout=5.0):
+    """Espera até a condição ser verdadeira ou o tempo acabar"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestDataRefresher:
+
+    @pytest.fixture
+    def counter_loader(self):
+        """Loader que devolve um DataFrame diferente a cada chamada"""
+        calls = {'n': 0}
+
+        def loader():
+            calls['n'] += 1
+            return pd.DataFrame({'revenue': [float(calls['n'])]})
+        return loader
+
+    def test_snapshot_inicial_e_derivados(self, counter_loader):
+        """start publica a versão 1 com as estruturas derivadas"""
+        refresher = DataRefresher(
+            counter_loader, {'total': lambda df: df['revenue'].sum()}, interval=0).start()
+        snapshot = refresher.current()
+
+        assert snapshot.version == 1
+        assert snapshot.derived['total'] == 1.0
+
+    def test_troca_atomica_sem_bloquear_leitores(self):
+        """Leitores seguem com a versão antiga enquanto a nova é construída"""
+        release = threading.Event()
+        calls = {'n': 0}
+
+        def slow_loader():
+            calls['n'] += 1
+            if calls['n'] > 1:
+                release.wait(5)
+            return pd.DataFrame({'revenue': [float(calls['n'])]})
+
+        refresher = DataRefresher(slow_loader, interval=60).start()
+        try:
+            refresher.refresh_now()
+            assert wait_for(lambda: calls['n'] == 2)
+            # Reconstrução em curso: a leitura devolve o snapshot anterior
+            assert refresher.current().version == 1
+
+            release.set()
+            assert wait_for(lambda: refresher.current().version == 2)
+            assert refresher.current().data['revenue'].iloc[0] == 2.0
+        finally:
+            release.set()
+            refresher.stop()
+
+    def test_falha_mantem_versao_atual(self, counter_loader):
+        """Erro na reconstrução preserva o snapshot e registra last_error"""
+        def builder(df):
+            if df['revenue'].iloc[0] > 1:
+                raise ValueError("falha")
+            return None
+
+        refresher = DataRefresher(counter_loader, {'x': builder}, interval=0).start()
+        refresher.refresh_now(wait=True)
+
+        assert refresher.current().version == 1
+        assert isinstance(refresher.last_error, ValueError)
+
+    def test_origem_inalterada_nao_recarrega(self, counter_loader, tmp_path):
+        """A atualização periódica ignora arquivos sem modificação"""
+        source = tmp_path / "sales.csv"
+        source.write_text("revenue\n1\n")
+        refresher = DataRefresher(counter_loader, interval=0.01, source=source).start()
+        try:
+            time.sleep(0.1)
+            assert refresher.current().version == 1
+        finally:
+            refresher.stop()
+
+    def test_atualizar_sem_thread_nao_bloqueia(self):
+        """Com interval=0, refresh_now reconstrói numa thread avulsa"""
+        release = threading.Event()
+        calls = {'n': 0}
+
+        def slow_loader():
+            calls['n'] += 1
+            if calls['n'] > 1:
+                release.wait(5)
+            return pd.DataFrame({'revenue': [float(calls['n'])]})
+
+        refresher = DataRefresher(slow_loader, interval=0).start()
+        try:
+            assert refresher.refresh_now().version == 1
+            assert wait_for(lambda: calls['n'] == 2)
+            refresher.refresh_now()
+            assert calls['n'] == 2
+
+            release.set()
+            assert wait_for(lambda: refresher.current().version == 2)
+        finally:
+            release.set()
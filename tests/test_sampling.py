@@ -0,0 +1,78 @@
+"""
+Testes para a amostragem estratificada do modo aproximado
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from sampling import StratifiedSample, approximate_kpis
+from utils import prepare_data, calculate_kpis, filter_mask
+
+
+class TestStratifiedSample:
+
+    @pytest.fixture
+    def sales(self):
+        """Pedidos preparados em 2 regiões × 3 categorias × 3 meses"""
+        rng = np.random.default_rng(3)
+        n = 60_000
+        data = {
+            'order_id': np.arange(n).astype(str),
+            'order_date': rng.choice(['2025-01-10', '2025-02-10', '2025-03-10'], n),
+            'customer': rng.choice([f'Cliente {i}' for i in range(50)], n),
+            'product': rng.choice(['Produto X', 'Produto Y'], n),
+            'category': rng.choice(['Cat A', 'Cat B', 'Cat C'], n),
+            'region': rng.choice(['Norte', 'Sul'], n),
+            'quantity': rng.integers(1, 10, n),
+            'price': rng.lognormal(6, 0.8, n),
+        }
+        df = pd.DataFrame(data)
+        df['revenue'] = df['quantity'] * df['price']
+        df['profit'] = df['revenue'] * rng.uniform(0.1, 0.3, n)
+        return prepare_data(df)
+
+    def test_amostra_por_estrato(self, sales):
+        """Cada estrato recebe ao menos o mínimo configurado"""
+        sample = StratifiedSample.build(sales, fraction=0.01, min_per_stratum=100)
+
+        assert len(sample.population) == 18
+        assert sample.population.sum() == len(sales)
+        assert (sample.sizes >= 100).all()
+        assert len(sample) == sample.sizes.sum()
+
+    def test_kpis_dentro_do_intervalo(self, sales):
+        """Estimativas ficam próximas do exato e o IC cobre o valor real"""
+        sample = StratifiedSample.build(sales, fraction=0.05)
+        spec = {'regions': ['Sul'], 'revenue_range': (200, 5000)}
+        kpis, intervals = approximate_kpis(sample, filter_mask(sample.frame, spec).to_numpy())
+        exact = calculate_kpis(sales[filter_mask(sales, spec)])
+
+        for key in ('total_revenue', 'total_profit', 'avg_ticket', 'avg_margin', 'avg_quantity'):
+            assert abs(kpis[key] - exact[key]) <= 2 * intervals[key]
+        assert abs(kpis['total_orders'] - exact['total_orders']) <= 2 * intervals['total_orders']
+        assert kpis['unique_customers'] <= exact['unique_customers']
+
+    def test_amostra_completa_e_exata(self, sales):
+        """Com todos os estratos inteiros, a estimativa é exata e sem incerteza"""
+        sample = StratifiedSample.build(sales, fraction=1.0)
+        kpis, intervals = approximate_kpis(sample, np.ones(len(sample), dtype=bool))
+
+        assert kpis['total_revenue'] == pytest.approx(sales['revenue'].sum())
+        assert intervals['total_revenue'] == pytest.approx(0)
+
+    def test_estimate_group_totals(self, sales):
+        """Ranking estimado por categoria ordenado pela receita"""
+        sample = StratifiedSample.build(sales, fraction=1.0)
+        totals = sample.estimate_group_totals(
+            'category', ['revenue', 'orders'], np.ones(len(sample), dtype=bool))
+        exact = sales.groupby('category')['revenue'].sum().sort_values(ascending=False)
+
+        assert list(totals.index) == list(exact.index)
+        assert totals['orders'].sum() == pytest.approx(len(sales))
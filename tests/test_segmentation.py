@@ -0,0 +1,57 @@
+"""
+Testes para a segmentação automática de clientes
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_blobs
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from segmentation import sweep_kmeans, best_k
+
+
+class TestSegmentation:
+
+    @pytest.fixture
+    def features(self):
+        """Clientes em 4 grupos bem separados"""
+        X, _ = make_blobs(n_samples=3000, centers=4, n_features=3, cluster_std=0.5, random_state=0)
+        return X
+
+    def test_sweep_encontra_k(self, features):
+        """A varredura pré-seleciona o número real de grupos"""
+        sweep = sweep_kmeans(features, range(2, 7), n_jobs=1, sample_size=500)
+
+        assert list(sweep['k']) == [2, 3, 4, 5, 6]
+        assert sweep['inertia'].is_monotonic_decreasing
+        assert best_k(sweep) == 4
+        assert len(sweep.set_index('k').loc[4, 'labels']) == len(features)
+
+    def test_paralelo_igual_ao_sequencial(self, features):
+        """Processos de trabalho produzem o mesmo resultado"""
+        sequential = sweep_kmeans(features, range(2, 5), n_jobs=1, sample_size=500)
+        parallel = sweep_kmeans(features, range(2, 5), n_jobs=2, sample_size=500)
+
+        pd.testing.assert_frame_equal(sequential.drop(columns='labels'),
+                                      parallel.drop(columns='labels'))
+
+    def test_poucos_clientes(self):
+        """k só vai até o número de clientes menos um"""
+        sweep = sweep_kmeans(np.arange(6, dtype=float).reshape(3, 2), range(2, 9), n_jobs=1)
+
+        assert list(sweep['k']) == [2]
+
+    def test_cotovelo_sem_silhueta(self):
+        """Sem silhueta válida, usa o cotovelo da inércia"""
+        sweep = pd.DataFrame({'k': [2, 3, 4, 5], 'inertia': [100.0, 30.0, 25.0, 22.0],
+                              'silhouette': [np.nan] * 4})
+
+        assert best_k(sweep) == 3
+        with pytest.raises(ValueError):
+            best_k(sweep.iloc[0:0])
@@ -0,0 +1,110 @@
+"""
+Testes para os sketches de quantis
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from sketches import TDigest, RevenueSketchIndex, ticket_bins_from_percentiles
+from utils import prepare_data
+
+
+def rank_error(sorted_values, estimates, qs):
+    """Distância, em rank normalizado, entre a estimativa e o quantil exato"""
+    return np.abs(np.searchsorted(sorted_values, estimates) / len(sorted_values) - qs)
+
+
+class TestTDigest:
+
+    @pytest.fixture
+    def values(self):
+        """Receitas com cauda longa"""
+        return np.random.default_rng(42).lognormal(8, 1, 100_000)
+
+    def test_quantile_precisao(self, values):
+        """Erro de rank pequeno da cauda à mediana"""
+        qs = np.array([0.01, 0.1, 0.5, 0.9, 0.99])
+        digest = TDigest.from_values(values)
+
+        assert len(digest) <= 200
+        assert rank_error(np.sort(values), digest.quantile(qs), qs).max() < 0.005
+        assert digest.quantile(0) == values.min()
+        assert digest.quantile(1) == values.max()
+
+    def test_merge_equivale_ao_total(self, values):
+        """Combinar sketches parciais preserva a precisão"""
+        qs = np.array([0.5, 0.9, 0.99])
+        merged = TDigest.merge_all([TDigest.from_values(c) for c in np.array_split(values, 20)])
+
+        assert merged.count == len(values)
+        assert rank_error(np.sort(values), merged.quantile(qs), qs).max() < 0.005
+
+    def test_sketch_vazio(self):
+        """Sketch vazio retorna NaN"""
+        assert np.isnan(TDigest.from_values([]).quantile(0.5))
+        assert np.isnan(TDigest.merge_all([]).quantile(0.5))
+
+
+class TestRevenueSketchIndex:
+
+    @pytest.fixture
+    def raw_sales(self):
+        """Pedidos brutos em duas regiões e dois meses"""
+        rng = np.random.default_rng(7)
+        n = 4000
+        data = {
+            'order_id': [f'ORD-{i:05d}' for i in range(n)],
+            'order_date': rng.choice(['2025-01-15', '2025-02-15'], n),
+            'customer': rng.choice(['Cliente A', 'Cliente B'], n),
+            'product': 'Produto X',
+            'category': rng.choice(['Cat A', 'Cat B'], n),
+            'region': rng.choice(['Norte', 'Sul'], n),
+            'quantity': 1,
+            'price': rng.lognormal(7, 1, n),
+        }
+        df = pd.DataFrame(data)
+        df['revenue'] = df['price']
+        df['profit'] = df['revenue'] * 0.2
+        return df
+
+    @pytest.fixture
+    def sales(self, raw_sales):
+        """Pedidos preparados"""
+        return prepare_data(raw_sales)
+
+    def test_quantis_por_fatia(self, sales):
+        """Quantis de uma fatia batem com os dados filtrados"""
+        index = RevenueSketchIndex.build(sales)
+        mask = (sales['region'] == 'Sul') & (sales['order_date'] < '2025-02-01')
+        exact = np.sort(sales.loc[mask, 'revenue'].to_numpy())
+        qs = np.array([0.5, 0.9])
+
+        estimates = index.quantiles(qs, regions=['Sul'], months=['2025-01'])
+
+        assert len(index.digests) == 8
+        assert rank_error(exact, estimates.to_numpy(), qs).max() < 0.02
+
+    def test_percentile_bands(self, sales):
+        """Faixas contíguas de P0 a P100"""
+        bands = RevenueSketchIndex.build(sales).percentile_bands((0, 50, 100))
+
+        assert list(bands['band']) == ['P0–P50', 'P50–P100']
+        assert bands['lower'].iloc[0] == sales['revenue'].min()
+        assert bands['upper'].iloc[0] == bands['lower'].iloc[1]
+
+    def test_ticket_bins_from_percentiles(self, raw_sales):
+        """Bins por percentis aplicados em prepare_data"""
+        bins = ticket_bins_from_percentiles(TDigest.from_values(raw_sales['revenue']))
+        df_prepared = prepare_data(raw_sales, ticket_bins=bins)
+
+        shares = df_prepared['ticket_category'].value_counts(normalize=True)
+        assert bins[0] == 0 and bins[-1] == float('inf')
+        assert shares['Baixo'] == pytest.approx(0.5, abs=0.02)
+        assert shares['Premium'] == pytest.approx(0.01, abs=0.01)
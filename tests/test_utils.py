@@ -2,7 +2,7 @@
 Testes para as funções utilitárias
 """
 
-from utils import prepare_data, calculate_kpis, get_top_performers, format_currency, format_percentage
+from utils import prepare_data, prepare_data_with_report, calculate_kpis, get_top_performers, format_currency, format_percentage
 import pytest
 import pandas as pd
 import numpy as np
@@ -50,6 +50,39 @@ class TestUtils:
             df_prepared['profit'] / df_prepared['revenue']).rename('margin')
         pd.testing.assert_series_equal(df_prepared['margin'], expected_margin)
 
+    def test_prepare_data_remove_nulos_e_duplicatas(self, sample_data):
+        """Testa a máscara combinada de nulos e duplicatas"""
+        dirty = pd.concat([sample_data, sample_data.iloc[[0]]])
+        dirty.loc[1, 'profit'] = np.nan
+        df_prepared = prepare_data(dirty)
+
+        assert len(df_prepared) == 2
+        assert list(df_prepared.index) == [0, 2]
+
+    def test_prepare_data_with_report(self, sample_data):
+        """Testa o relatório de alocação por etapa"""
+        df_prepared, report = prepare_data_with_report(sample_data)
+
+        assert list(report['step']) == ['mask', 'materialize', 'derive', 'assemble']
+        assert (report['rows'] == len(df_prepared)).all()
+        assert report.attrs['final_bytes'] > 0
+        pd.testing.assert_frame_equal(df_prepared, prepare_data(sample_data))
+
+    def test_prepare_data_with_report_pipeline_completo(self, sample_data):
+        """O relatório mede o mesmo pipeline do load_data (chave e quarentena)"""
+        from dedup import OrderDeduplicator
+
+        dirty = pd.concat([sample_data, sample_data.iloc[[0]]])
+        validation = {}
+        df_prepared, report = prepare_data_with_report(
+            dirty, deduplicator=OrderDeduplicator(policy='flag'), validation=validation)
+
+        expected = prepare_data(dirty, deduplicator=OrderDeduplicator(policy='flag'))
+        pd.testing.assert_frame_equal(df_prepared, expected)
+        assert 'dedup_conflict' in df_prepared
+        assert 'quarantine' in validation
+        assert report['rows'].iloc[-1] == len(df_prepared)
+
     def test_calculate_kpis(self, sample_data):
         """Testa o cálculo de KPIs"""
         df_prepared = prepare_data(sample_data)
@@ -0,0 +1,83 @@
+"""
+Testes para a validação de qualidade dos dados
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from validation import RULES, validate_orders, quarantine_frame, write_quarantine, reason_labels
+from utils import prepare_data
+
+
+class TestValidation:
+
+    @pytest.fixture
+    def raw_data(self):
+        """Um pedido válido e um por regra violada (o último viola duas)"""
+        data = {
+            'order_id': ['ORD-001', 'ORD-002', 'ORD-003', 'ORD-004', 'ORD-005', 'ORD-006', 'ORD-007'],
+            'order_date': ['2025-01-01', '2025-01-02', 'ontem', '2025-01-04', '2025-01-05',
+                           '2025-01-06', '2025-01-07'],
+            'customer': ['Cliente A', None, 'Cliente A', 'Cliente B', 'Cliente B', 'Cliente C', 'Cliente C'],
+            'product': ['Produto X'] * 7,
+            'category': ['Cat A'] * 7,
+            'region': ['Norte'] * 7,
+            'quantity': [2, 1, 1, 0, 2, 1, 3],
+            'price': [100.0, 200.0, 100.0, 100.0, 100.0, 100.0, 0.0],
+            'revenue': [200.0, 200.0, 100.0, 0.0, 250.0, 100.0, 0.0],
+            'profit': [40.0, 50.0, 20.0, 0.0, 50.0, 150.0, 10.0]
+        }
+        return pd.DataFrame(data)
+
+    def test_regras_e_contagens(self, raw_data):
+        """Cada regra sinaliza suas linhas com o bit correspondente"""
+        result = validate_orders(raw_data)
+
+        assert list(result.valid) == [True, False, False, False, False, False, False]
+        assert result.counts.to_dict() == {
+            'missing_value': 1, 'invalid_date': 1, 'non_positive_quantity': 1,
+            'non_positive_revenue': 2, 'revenue_mismatch': 1, 'profit_exceeds_revenue': 2}
+        assert result.codes[6] == RULES['non_positive_revenue'][0] | RULES['profit_exceeds_revenue'][0]
+        assert reason_labels(result.codes[[0, 6]]).tolist() == [
+            '', 'non_positive_revenue;profit_exceeds_revenue']
+
+    def test_quarentena(self, raw_data, tmp_path):
+        """Linhas reprovadas vão para a quarentena com os motivos"""
+        result = validate_orders(raw_data)
+        quarantine = quarantine_frame(raw_data, result)
+        path = tmp_path / 'quarentena.csv'
+        write_quarantine(quarantine, path)
+
+        assert list(quarantine['order_id']) == ['ORD-002', 'ORD-003', 'ORD-004', 'ORD-005',
+                                                'ORD-006', 'ORD-007']
+        assert quarantine.loc[3, 'reasons'] == 'non_positive_quantity;non_positive_revenue'
+        assert pd.read_csv(path)['reason_code'].tolist() == quarantine['reason_code'].tolist()
+
+    def test_quarentena_vazia_substitui_arquivo(self, raw_data, tmp_path):
+        """Carga limpa sobrescreve a quarentena anterior com um arquivo só de cabeçalho"""
+        path = tmp_path / 'quarentena.csv'
+        write_quarantine(quarantine_frame(raw_data, validate_orders(raw_data)), path)
+        clean = raw_data.iloc[[0]]
+        write_quarantine(quarantine_frame(clean, validate_orders(clean)), path)
+
+        reloaded = pd.read_csv(path)
+        assert reloaded.empty
+        assert list(reloaded.columns) == list(raw_data.columns) + ['reason_code', 'reasons']
+
+    def test_prepare_data_exclui_e_reporta(self, raw_data):
+        """prepare_data usa a validação e devolve o relatório"""
+        validation = {}
+        df = prepare_data(raw_data, validation=validation)
+
+        assert list(df['order_id']) == ['ORD-001']
+        assert np.isfinite(df['margin']).all()
+        assert validation['counts']['revenue_mismatch'] == 1
+        assert len(validation['quarantine']) == 6
+        assert validation['summary'].set_index('rule').loc['invalid_date', 'rows'] == 1